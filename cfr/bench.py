@@ -0,0 +1,307 @@
+"""
+Micro-benchmarks for the cfr package hot paths.
+
+Every benchmark builds its inputs from fixed seeds and decks, so two runs
+on the same machine time exactly the same work. Results are operations
+per second (best of `repeats` timed runs).
+
+Usage:
+    python bench.py                          # run everything, print a table
+    python bench.py --filter evaluate        # only names containing "evaluate"
+    python bench.py --save baseline.json     # write a baseline file
+    python bench.py --compare baseline.json  # exit 1 on a regression
+    python bench.py --compare baseline.json --tolerance 0.2
+
+A benchmark regresses when its ops/s falls more than `tolerance` (default
+10%) below the baseline. Baselines are only comparable on the same
+machine and Python / NumPy versions, which the file records.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+
+from game_state import GameState, Phase, make_deck, legal_actions
+from game_engine import deal_hand, apply_action, resolve_trick, random_rollout
+from cfr_solver import (
+    BidWhistCFR, compute_hand_features, abstract_bid_key, heuristic_discard,
+    evaluate_play_heuristic, evaluate_play_random, evaluate_trump_choices,
+)
+
+BASELINE_VERSION = 1
+SEED = 1234
+
+
+# ── Fixtures ──────────────────────────────────────────────────────────
+
+def _seed(seed: int = SEED) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def fixed_deck(seed: int = SEED) -> list:
+    deck = make_deck()
+    random.Random(seed).shuffle(deck)
+    return deck
+
+
+def state_in_phase(phase: Phase, seed: int = SEED) -> GameState:
+    """First state of `phase` reached from a fixed deal by seeded random play."""
+    rng = random.Random(seed)
+    for attempt in range(100):
+        gs = deal_hand(dealer=0, deck=fixed_deck(seed + attempt))
+        while gs.phase != phase and gs.phase in (Phase.BIDDING, Phase.TRUMP_SELECTION,
+                                                 Phase.DISCARDING, Phase.PLAY):
+            actions = legal_actions(gs)
+            # Bid something so the auction does not redeal
+            gs = apply_action(gs, actions[-1] if gs.phase == Phase.BIDDING
+                              else rng.choice(actions))
+        if gs.phase == phase:
+            return gs
+    raise RuntimeError(f"could not reach {phase}")
+
+
+# ── Benchmarks ────────────────────────────────────────────────────────
+#
+# Each factory builds its inputs (untimed) and returns the operation to
+# time. Factories are re-run before every timed run, so stateful
+# operations (a growing solver) start from the same state each time.
+
+def _bench_copy() -> Callable:
+    gs = state_in_phase(Phase.PLAY)
+    return gs.copy
+
+
+def _bench_apply(phase: Phase) -> Callable[[], Callable]:
+    def factory() -> Callable:
+        gs = state_in_phase(phase)
+        action = legal_actions(gs)[0]
+        return lambda: apply_action(gs, action)
+    return factory
+
+
+def _bench_legal_actions() -> Callable:
+    gs = state_in_phase(Phase.PLAY)
+    return lambda: legal_actions(gs)
+
+
+def _bench_resolve_trick() -> Callable:
+    gs = state_in_phase(Phase.PLAY)
+    trick = [(p, gs.hands[p][0]) for p in range(4)]
+    return lambda: resolve_trick(trick, gs.trump_suit, gs.direction)
+
+
+def _bench_random_rollout() -> Callable:
+    _seed()
+    deck = fixed_deck()
+    return lambda: random_rollout(dealer=0, deck=deck)
+
+
+def _bench_hand_features() -> Callable:
+    hand = state_in_phase(Phase.BIDDING).hands[0]
+    return lambda: compute_hand_features(hand)
+
+
+def _bench_bid_key() -> Callable:
+    gs = state_in_phase(Phase.BIDDING)
+    return lambda: abstract_bid_key(gs, gs.current_bidder)
+
+
+def _bench_heuristic_discard() -> Callable:
+    gs = state_in_phase(Phase.DISCARDING)
+    return lambda: heuristic_discard(gs)
+
+
+def _bench_evaluate_heuristic() -> Callable:
+    gs = state_in_phase(Phase.PLAY)
+    return lambda: evaluate_play_heuristic(gs)
+
+
+def _bench_evaluate_random() -> Callable:
+    _seed()
+    gs = state_in_phase(Phase.PLAY)
+    return lambda: evaluate_play_random(gs, 1)
+
+
+def _bench_trump_choices() -> Callable:
+    gs = state_in_phase(Phase.TRUMP_SELECTION)
+    return lambda: evaluate_trump_choices(gs)
+
+
+def _bench_cfr_iterate(**solver_kwargs) -> Callable[[], Callable]:
+    """One traversal per op, alternating the updating team, fresh solver."""
+    def factory() -> Callable:
+        _seed()
+        solver = BidWhistCFR(play_rollouts=0, **solver_kwargs)
+        deals = [deal_hand(dealer=i % 4, deck=fixed_deck(SEED + i)) for i in range(8)]
+        counter = [0]
+
+        def op():
+            i = counter[0]
+            counter[0] += 1
+            solver._traverse(deals[(i // 2) % len(deals)], updating_team=i % 2)
+        return op
+    return factory
+
+
+BENCHMARKS: dict[str, Callable[[], Callable]] = {
+    "GameState.copy": _bench_copy,
+    "apply_action[bidding]": _bench_apply(Phase.BIDDING),
+    "apply_action[trump]": _bench_apply(Phase.TRUMP_SELECTION),
+    "apply_action[discard]": _bench_apply(Phase.DISCARDING),
+    "apply_action[play]": _bench_apply(Phase.PLAY),
+    "legal_actions[play]": _bench_legal_actions,
+    "resolve_trick": _bench_resolve_trick,
+    "random_rollout": _bench_random_rollout,
+    "compute_hand_features": _bench_hand_features,
+    "abstract_bid_key": _bench_bid_key,
+    "heuristic_discard": _bench_heuristic_discard,
+    "evaluate_play_heuristic": _bench_evaluate_heuristic,
+    "evaluate_play_random": _bench_evaluate_random,
+    "evaluate_trump_choices": _bench_trump_choices,
+    "cfr_iterate[external]": _bench_cfr_iterate(),
+    "cfr_iterate[external,iterative]": _bench_cfr_iterate(iterative=True),
+    "cfr_iterate[outcome]": _bench_cfr_iterate(sampling="outcome"),
+}
+
+
+# ── Timing ────────────────────────────────────────────────────────────
+
+def _time_run(factory: Callable[[], Callable], n: int) -> float:
+    op = factory()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        op()
+    return time.perf_counter() - t0
+
+
+def measure(factory: Callable[[], Callable], min_time: float = 0.2,
+            repeats: int = 3) -> tuple[float, int]:
+    """
+    Best-of-`repeats` ops/s. The op count per run is calibrated so one
+    run takes at least min_time / repeats seconds.
+    Returns (ops per second, ops per run).
+    """
+    target = min_time / repeats
+    n = 1
+    while True:
+        elapsed = _time_run(factory, n)
+        if elapsed >= target:
+            break
+        n = max(n + 1, int(n * min(10.0, 1.5 * target / max(elapsed, 1e-9))))
+    best = elapsed
+    for _ in range(repeats - 1):
+        best = min(best, _time_run(factory, n))
+    return n / best, n
+
+
+def run_benchmarks(names: list[str] | None = None, min_time: float = 0.2,
+                   repeats: int = 3, verbose: bool = True) -> dict[str, float]:
+    """Run the selected benchmarks; returns {name: ops per second}."""
+    results = {}
+    for name in names if names is not None else list(BENCHMARKS):
+        ops, n = measure(BENCHMARKS[name], min_time, repeats)
+        results[name] = ops
+        if verbose:
+            print(f"  {name:34s} {ops:14,.1f} ops/s  (n={n})")
+    return results
+
+
+# ── Baselines ─────────────────────────────────────────────────────────
+
+def save_baseline(results: dict[str, float], path: str) -> None:
+    data = {
+        "version": BASELINE_VERSION,
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_baseline(path: str) -> dict[str, float]:
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {data.get('version')}")
+    return data["results"]
+
+
+def compare_results(current: dict[str, float], baseline: dict[str, float],
+                    tolerance: float = 0.10) -> list[str]:
+    """Names whose ops/s dropped more than `tolerance` below the baseline."""
+    return [name for name, ops in current.items()
+            if name in baseline and ops < baseline[name] * (1.0 - tolerance)]
+
+
+def print_comparison(current: dict[str, float], baseline: dict[str, float],
+                     tolerance: float) -> None:
+    regressions = set(compare_results(current, baseline, tolerance))
+    print(f"\n  {'Benchmark':34s} {'Baseline':>14s} {'Current':>14s} {'Ratio':>7s}")
+    for name, ops in current.items():
+        if name not in baseline:
+            print(f"  {name:34s} {'-':>14s} {ops:14,.1f}     new")
+            continue
+        ratio = ops / baseline[name]
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"  {name:34s} {baseline[name]:14,.1f} {ops:14,.1f} {ratio:6.2f}x{flag}")
+
+
+# ── Main ──────────────────────────────────────────────────────────────
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="cfr hot-path micro-benchmarks")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list benchmark names")
+    parser.add_argument("--min-time", type=float, default=0.3,
+                        help="seconds spent timing each benchmark (default 0.3)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed fractional slowdown before flagging (default 0.10)")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if not args.filter or any(f in n for f in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    print("=" * 60)
+    print("  CFR MICRO-BENCHMARKS")
+    print("=" * 60)
+    results = run_benchmarks(names, args.min_time, args.repeats)
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"\n  Baseline written to {args.save}")
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        print_comparison(results, baseline, args.tolerance)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n  {len(regressions)} regression(s) beyond {args.tolerance:.0%}: "
+                  + ", ".join(regressions))
+            return 1
+        print(f"\n  No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
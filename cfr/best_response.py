@@ -0,0 +1,265 @@
+"""
+Best response and exploitability for the abstract bidding + trump game.
+
+A trained BidWhistCFR only tells us how its strategy looks, not how good
+it is. This module measures the best-response gap of the average
+strategy on a fixed, seeded sample of deals:
+
+  1. Every deal's full auction + trump tree is expanded once (about 120
+     bidding and 300 trump nodes per deal). Trump choices are scored
+     with evaluate_trump_choices, i.e. the same heuristic play values as
+     training with play_rollouts=0. Trees do not depend on the strategy,
+     so they are built once and reused for every evaluation.
+  2. For each team, a best response is computed by backward induction
+     over the abstract info sets, deepest first (trump selection, then
+     bid positions 3..0). Each info set picks the action maximizing the
+     opponent-reach-weighted value summed over all its histories.
+  3. The value of that best response against the average strategy, and
+     of the average strategy against itself, are exact expectations over
+     the sampled deals (profile_value evaluates any pair of policies).
+
+    gap[team]       how much the team gains by switching to the best response
+    exploitability  (gap[0] + gap[1]) / 2, in points per hand
+
+Teammates hold private hands, so a team's true best response is a joint
+policy over both players' info sets; backward induction weights each
+info set by opponent reach only and ignores the teammate's earlier
+choices. The resulting policy is still a valid strategy whose value is
+evaluated exactly, so the reported gaps are lower bounds on the true
+best-response gaps.
+
+The best response sees every deal in the sample, so on small samples it
+also exploits the sample itself; compare curves on one fixed deal set
+(same n_deals and seed) rather than absolute numbers across sets.
+
+Tree building dominates the cost and can be spread over `n_workers`
+processes.
+"""
+
+from __future__ import annotations
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from game_state import BidState, GameState, Phase, make_deck, legal_bid_amounts
+from game_engine import deal_hand, apply_bid, complete_auction
+from cfr_solver import (
+    bid_hand_bins, bid_key, trump_hand_bins, trump_key, evaluate_trump_choices,
+)
+
+TRUMP_DEPTH = 4  # bid positions are depths 0-3
+
+
+# ── Deal trees ────────────────────────────────────────────────────────
+
+@dataclass
+class DealTree:
+    """
+    Auction + trump tree of one deal, nodes in preorder (parents first).
+
+    children[i] lists child node ids of a bidding node, with -1 for the
+    redeal leaf (everyone passed, value 0). Trump nodes have no children;
+    trump_values[i] holds the team-0 values of their 12 choices.
+    """
+    keys: list[str] = field(default_factory=list)
+    teams: list[int] = field(default_factory=list)
+    depths: list[int] = field(default_factory=list)
+    children: list[list[int]] = field(default_factory=list)
+    trump_values: dict[int, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def sample_deals(n_deals: int, seed: int = 0) -> list[GameState]:
+    """A reproducible deal set: seeded decks, dealers rotating 0..3."""
+    rng = random.Random(seed)
+    deals = []
+    for i in range(n_deals):
+        deck = make_deck()
+        rng.shuffle(deck)
+        deals.append(deal_hand(dealer=i % 4, deck=deck))
+    return deals
+
+
+def build_tree(gs: GameState) -> DealTree:
+    """Expand the full auction and trump-selection tree of a fresh deal."""
+    tree = DealTree()
+    bins = [bid_hand_bins(h) for h in gs.hands]
+    trump_bins: dict[int, str] = {}
+    # Trump values depend only on who declares and for how much
+    contract_values: dict[tuple[int, int], np.ndarray] = {}
+
+    def add(key: str, team: int, depth: int) -> int:
+        tree.keys.append(key)
+        tree.teams.append(team)
+        tree.depths.append(depth)
+        tree.children.append([])
+        return len(tree.keys) - 1
+
+    def expand(bs: BidState) -> int:
+        if bs.bid_count >= 4:
+            child = complete_auction(gs, bs)
+            if child.phase != Phase.TRUMP_SELECTION:
+                return -1  # redeal
+            player = child.declarer
+            if player not in trump_bins:
+                trump_bins[player] = trump_hand_bins(child.hands[player])
+            i = add(trump_key(trump_bins[player], player, child.bids), player % 2, TRUMP_DEPTH)
+            contract = (player, child.high_bid)
+            if contract not in contract_values:
+                contract_values[contract] = evaluate_trump_choices(child)[1]
+            tree.trump_values[i] = contract_values[contract]
+            return i
+
+        player = bs.current_bidder
+        i = add(bid_key(bins[player], player, bs.dealer, bs.bid_count, bs.high_bid, bs.bids),
+                player % 2, bs.bid_count)
+        tree.children[i] = [expand(apply_bid(bs, amount)) for amount in legal_bid_amounts(bs)]
+        return i
+
+    expand(BidState.from_game_state(gs))
+    return tree
+
+
+def build_trees(deals: list[GameState], n_workers: int = 1) -> list[DealTree]:
+    """build_tree for every deal, across `n_workers` processes."""
+    if n_workers <= 1:
+        return [build_tree(gs) for gs in deals]
+    chunk = max(1, len(deals) // (4 * n_workers))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(build_tree, deals, chunksize=chunk))
+
+
+# ── Backward induction ────────────────────────────────────────────────
+
+def _strategy(policy: dict[str, np.ndarray], key: str, n: int) -> np.ndarray:
+    probs = policy.get(key)
+    return probs if probs is not None else np.full(n, 1.0 / n)
+
+
+def _action_values(tree: DealTree, i: int, values: np.ndarray) -> np.ndarray:
+    """Team-0 values of node i's actions, given values of deeper nodes."""
+    if i in tree.trump_values:
+        return tree.trump_values[i]
+    return np.array([values[c] if c >= 0 else 0.0 for c in tree.children[i]])
+
+
+def _opponent_reach(tree: DealTree, policy: dict[str, np.ndarray], team: int) -> np.ndarray:
+    """Probability the opponents of `team` play to each node (preorder pass)."""
+    reach = np.ones(len(tree))
+    for i, kids in enumerate(tree.children):
+        if not kids:
+            continue
+        if tree.teams[i] == team:
+            for c in kids:
+                if c >= 0:
+                    reach[c] = reach[i]
+        else:
+            probs = _strategy(policy, tree.keys[i], len(kids))
+            for c, p in zip(kids, probs):
+                if c >= 0:
+                    reach[c] = reach[i] * p
+    return reach
+
+
+def _by_depth(trees: list[DealTree]) -> list[list[tuple[int, int]]]:
+    """(tree index, node id) pairs grouped by depth."""
+    levels: list[list[tuple[int, int]]] = [[] for _ in range(TRUMP_DEPTH + 1)]
+    for t, tree in enumerate(trees):
+        for i, d in enumerate(tree.depths):
+            levels[d].append((t, i))
+    return levels
+
+
+def best_response(trees: list[DealTree], policy: dict[str, np.ndarray],
+                  team: int) -> tuple[dict[str, int], float]:
+    """
+    Best response of `team` to `policy` on the sampled deals.
+
+    Returns (info set key -> best action index, mean team-0 value of the
+    best response against `policy`).
+    """
+    sign = 1.0 if team == 0 else -1.0
+    reach = [_opponent_reach(tree, policy, team) for tree in trees]
+    values = [np.zeros(len(tree)) for tree in trees]
+    br: dict[str, int] = {}
+
+    for level in reversed(_by_depth(trees)):
+        action_values: dict[tuple[int, int], np.ndarray] = {}
+        q: dict[str, np.ndarray] = {}
+        for t, i in level:
+            tree = trees[t]
+            av = action_values[t, i] = _action_values(tree, i, values[t])
+            if tree.teams[i] == team:
+                key = tree.keys[i]
+                if key in q:
+                    q[key] += reach[t][i] * sign * av
+                else:
+                    q[key] = reach[t][i] * sign * av
+            else:
+                values[t][i] = float(np.dot(_strategy(policy, tree.keys[i], len(av)), av))
+        for key, qv in q.items():
+            br[key] = int(np.argmax(qv))
+        for (t, i), av in action_values.items():
+            if trees[t].teams[i] == team:
+                values[t][i] = av[br[trees[t].keys[i]]]
+
+    return br, float(np.mean([v[0] for v in values])) if trees else 0.0
+
+
+def profile_value(trees: list[DealTree], policies: tuple[dict[str, np.ndarray],
+                                                      dict[str, np.ndarray]]) -> float:
+    """
+    Mean team-0 value when team 0 plays policies[0] and team 1 plays
+    policies[1] (abstract keys are seat-relative, so the same key can
+    belong to either team depending on the dealer).
+    """
+    total = 0.0
+    for tree in trees:
+        values = np.zeros(len(tree))
+        for i in reversed(range(len(tree))):
+            av = _action_values(tree, i, values)
+            probs = _strategy(policies[tree.teams[i]], tree.keys[i], len(av))
+            values[i] = float(np.dot(probs, av))
+        total += values[0] if len(tree) else 0.0
+    return float(total / len(trees)) if trees else 0.0
+
+
+def policy_value(trees: list[DealTree], policy: dict[str, np.ndarray]) -> float:
+    """Mean team-0 value of `policy` played by both teams."""
+    return profile_value(trees, (policy, policy))
+
+
+# ── Exploitability ───────────────────────────────────────────────────
+
+def average_policy(nodes: dict) -> dict[str, np.ndarray]:
+    """Average strategy of every node (BidWhistCFR.nodes)."""
+    return {key: node.get_average_strategy() for key, node in nodes.items()}
+
+
+def exploitability(nodes: dict, n_deals: int = 100, seed: int = 0, n_workers: int = 1,
+                   trees: Optional[list[DealTree]] = None) -> dict:
+    """
+    Best-response gaps of the average strategy in `nodes`.
+
+    Pass `trees` (from build_trees) to reuse a deal set across calls;
+    otherwise `n_deals` deals are sampled with `seed`.
+
+    Returns {"value": team-0 value of the average strategy,
+             "br_value": [team-0 value when team 0 / team 1 best-responds],
+             "gap": [team 0 gap, team 1 gap],
+             "exploitability": mean gap}.
+    """
+    if trees is None:
+        trees = build_trees(sample_deals(n_deals, seed), n_workers)
+    policy = average_policy(nodes)
+    value = policy_value(trees, policy)
+    br_values = [best_response(trees, policy, team)[1] for team in (0, 1)]
+    gaps = [br_values[0] - value, value - br_values[1]]
+    return {"value": value, "br_value": br_values, "gap": gaps,
+            "exploitability": (gaps[0] + gaps[1]) / 2}
@@ -12,35 +12,44 @@ Key design: ABSTRACT INFORMATION SETS.
   This reduces the info set space to ~10-50K reachable states.
 
 Architecture:
-  - External sampling MCCFR (Monte Carlo CFR)
+  - External (default) or outcome sampling MCCFR (Monte Carlo CFR)
   - Bidding + Trump selection are solved by CFR
   - Discard phase uses a heuristic
   - Play phase evaluated by random rollouts
-  - Regret matching for strategy updates
+  - Regret matching for strategy updates (vanilla, CFR+, Linear, DCFR)
   - Average strategy converges to Nash equilibrium
 """
 
 from __future__ import annotations
 
+import functools
+import json
+import math
 import random
 import sys
 import time
 import numpy as np
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Callable, Optional
 
 from game_state import (
     Card, Suit, Rank, Direction, Phase,
-    GameState, InfoSet, Action, TrumpChoice,
+    GameState, InfoSet, Action, TrumpChoice, BidState,
     BID_PASS, BID_TAKE,
     card_strength, make_deck,
     legal_actions, acting_player, legal_play_actions,
-    legal_bid_actions, legal_trump_actions,
+    legal_bid_actions, legal_trump_actions, legal_bid_amounts,
 )
 from game_engine import (
     deal_hand, apply_action, resolve_trick,
-    hand_payoff, is_terminal, needs_redeal,
+    hand_payoff, is_terminal, needs_redeal, play_out,
+    apply_bid, complete_auction, with_dealer,
+)
+from match_equity import MatchEquity, hand_utility, score_tag
+from strategy_file import export_strategy
+from strategy_table import (
+    StrategyTable, BID_COLUMNS, TAKE_COLUMN, TRUMP_COLUMNS, group_mean,
 )
 
 
@@ -103,18 +112,8 @@ def _bin(val: int, thresholds: list[int]) -> int:
     return len(thresholds)
 
 
-def abstract_bid_key(gs: GameState, player: int) -> str:
-    """
-    Abstract information set key for BIDDING decisions.
-
-    Features:
-      - Binned hand features (ace, king_ace, deuce_trey, max_suit, high-low)
-      - Bidding position (seat: 0-3 from first bidder)
-      - Current high bid (0-6)
-      - Partner's bid (0-6, 0 if not yet bid)
-      - Is dealer
-    """
-    hand = gs.hands[player]
+def bid_hand_bins(hand: list[Card]) -> str:
+    """Hand-feature part of the bidding key (fixed for a player within a deal)."""
     f = compute_hand_features(hand)
 
     # Bin hand features
@@ -124,32 +123,45 @@ def abstract_bid_key(gs: GameState, player: int) -> str:
     suit_bin = _bin(f["max_suit"], [4, 5, 7])           # <=4, 5, 6-7, 8+
     hl_bin = 0 if f["high"] > f["low"] + 2 else (2 if f["low"] > f["high"] + 2 else 1)  # high/balanced/low
 
+    return f"a{ace_bin}ka{ka_bin}dt{dt_bin}ms{suit_bin}hl{hl_bin}"
+
+
+def bid_key(hand_bins: str, player: int, dealer: int, bid_count: int,
+            high_bid: int, bids) -> str:
+    """Bidding key from precomputed hand bins plus the auction context."""
     # Bidding context
     partner = (player + 2) % 4
     partner_bid = 0
-    for p, amt in gs.bids:
+    for p, amt in bids:
         if p == partner and amt > 0:
             partner_bid = amt
             break
 
-    is_dealer = 1 if player == gs.dealer else 0
-    seat = gs.bid_count  # 0=first, 1=second, 2=third, 3=dealer
+    is_dealer = 1 if player == dealer else 0
+    seat = bid_count  # 0=first, 1=second, 2=third, 3=dealer
 
     return (f"B|s{seat}|d{is_dealer}|"
-            f"a{ace_bin}ka{ka_bin}dt{dt_bin}ms{suit_bin}hl{hl_bin}|"
-            f"hb{gs.high_bid}pb{partner_bid}")
+            f"{hand_bins}|"
+            f"hb{high_bid}pb{partner_bid}")
 
 
-def abstract_trump_key(gs: GameState, player: int) -> str:
+def abstract_bid_key(gs: GameState, player: int) -> str:
     """
-    Abstract information set key for TRUMP SELECTION decisions.
+    Abstract information set key for BIDDING decisions.
 
     Features:
-      - Binned hand features (per-suit strength matters more here)
-      - Partner's bid (signal)
-      - Best suit for uptown vs downtown
+      - Binned hand features (ace, king_ace, deuce_trey, max_suit, high-low)
+      - Bidding position (seat: 0-3 from first bidder)
+      - Current high bid (0-6)
+      - Partner's bid (0-6, 0 if not yet bid)
+      - Is dealer
     """
-    hand = gs.hands[player]  # 16 cards at this point
+    return bid_key(bid_hand_bins(gs.hands[player]), player, gs.dealer,
+                   gs.bid_count, gs.high_bid, gs.bids)
+
+
+def trump_hand_bins(hand: list[Card]) -> str:
+    """Hand-feature part of the trump key (fixed for a declarer within a deal)."""
     f = compute_hand_features(hand)
 
     ace_bin = min(f["aces"], 3)
@@ -162,10 +174,16 @@ def abstract_trump_key(gs: GameState, player: int) -> str:
     # Downtown: most low cards + aces
     best_down = max(range(4), key=lambda s: (f["suit_low"][s] + f["suit_aces"][s], f["suit_counts"][s]))
 
+    return (f"a{ace_bin}hl{hl_bin}ms{suit_bin}|"
+            f"bu{best_up}bd{best_down}")
+
+
+def trump_key(hand_bins: str, player: int, bids) -> str:
+    """Trump key from precomputed hand bins plus the auction signals."""
     # Partner's bid
     partner = (player + 2) % 4
     partner_bid = 0
-    for p, amt in gs.bids:
+    for p, amt in bids:
         if p == partner and amt > 0:
             partner_bid = min(amt, 3)  # cap at 3 (signal range)
             break
@@ -173,18 +191,40 @@ def abstract_trump_key(gs: GameState, player: int) -> str:
     # Enemy bids
     enemies = [(player + 1) % 4, (player + 3) % 4]
     enemy_bid = 0
-    for p, amt in gs.bids:
+    for p, amt in bids:
         if p in enemies and 1 <= amt <= 2:  # only signal bids
             enemy_bid = amt
             break
 
-    return (f"T|a{ace_bin}hl{hl_bin}ms{suit_bin}|"
-            f"bu{best_up}bd{best_down}|"
+    return (f"T|{hand_bins}|"
             f"pb{partner_bid}eb{enemy_bid}")
 
 
+def abstract_trump_key(gs: GameState, player: int) -> str:
+    """
+    Abstract information set key for TRUMP SELECTION decisions.
+
+    Features:
+      - Binned hand features (per-suit strength matters more here)
+      - Partner's bid (signal)
+      - Best suit for uptown vs downtown
+    """
+    return trump_key(trump_hand_bins(gs.hands[player]), player, gs.bids)  # 16-card hand
+
+
 # ── CFR Node ──────────────────────────────────────────────────────────
 
+_SCRATCH: dict[int, np.ndarray] = {}
+
+
+def _scratch(n: int) -> np.ndarray:
+    """Shared length-n work vector; contents are only valid until the next call."""
+    buf = _SCRATCH.get(n)
+    if buf is None:
+        buf = _SCRATCH[n] = np.empty(n, dtype=np.float64)
+    return buf
+
+
 @dataclass
 class CFRNode:
     """A node in the CFR decision tree, indexed by abstract info set."""
@@ -192,23 +232,42 @@ class CFRNode:
     regret_sum: np.ndarray = field(init=False)
     strategy_sum: np.ndarray = field(init=False)
     visit_count: int = 0
+    last_iter: int = 0  # iteration of the last regret update (DCFR lazy discount)
+    strategy: np.ndarray = field(init=False, repr=False)  # current_strategy output buffer
+    baseline: Optional[np.ndarray] = field(default=None, repr=False)  # VR-MCCFR, team-0 values
 
     def __post_init__(self):
         self.regret_sum = np.zeros(self.num_actions, dtype=np.float64)
         self.strategy_sum = np.zeros(self.num_actions, dtype=np.float64)
+        self.strategy = np.empty(self.num_actions, dtype=np.float64)
 
-    def get_strategy(self, realization_weight: float = 1.0) -> np.ndarray:
-        """Regret-matching: proportional to positive regrets."""
-        positive = np.maximum(self.regret_sum, 0)
-        total = positive.sum()
+    def current_strategy(self, realization_weight: float = 1.0) -> np.ndarray:
+        """
+        Regret matching written into the node's own buffer (no allocation).
+
+        The returned array is overwritten by the node's next call. The
+        traversals hold it across their children safely because an info
+        set never recurs below itself (bid keys carry the bid count).
+        A zero realization weight skips the strategy-sum update.
+        """
+        strategy = self.strategy
+        np.maximum(self.regret_sum, 0.0, out=strategy)
+        total = strategy.sum()
         if total > 0:
-            strategy = positive / total
+            np.divide(strategy, total, out=strategy)
         else:
-            strategy = np.ones(self.num_actions) / self.num_actions
-        self.strategy_sum += realization_weight * strategy
+            strategy.fill(1.0 / self.num_actions)
+        if realization_weight != 0.0:
+            scratch = _scratch(self.num_actions)
+            np.multiply(strategy, realization_weight, out=scratch)
+            np.add(self.strategy_sum, scratch, out=self.strategy_sum)
         self.visit_count += 1
         return strategy
 
+    def get_strategy(self, realization_weight: float = 1.0) -> np.ndarray:
+        """Regret-matching: proportional to positive regrets."""
+        return self.current_strategy(realization_weight).copy()
+
     def get_average_strategy(self) -> np.ndarray:
         """Converged strategy (Nash equilibrium)."""
         total = self.strategy_sum.sum()
@@ -217,6 +276,55 @@ class CFRNode:
         return np.ones(self.num_actions) / self.num_actions
 
 
+# ── Action sampling ──────────────────────────────────────────────────
+
+class UniformBuffer:
+    """
+    Pre-generated U[0, 1) draws, refilled in blocks from np.random.
+
+    One np.random.random(4096) call costs about as much as a handful of
+    np.random.choice calls, so drawing from the buffer makes sampling an
+    action mostly a list index. Draws stay reproducible under
+    np.random.seed as long as the buffer is reset after seeding.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop buffered draws (call after reseeding np.random)."""
+        self._draws: list[float] = []
+        self._i = 0
+
+    def next(self) -> float:
+        if self._i == len(self._draws):
+            self._draws = np.random.random(self.size).tolist()
+            self._i = 0
+        u = self._draws[self._i]
+        self._i += 1
+        return u
+
+
+def sample_index(probs: np.ndarray, u: float) -> int:
+    """
+    Inverse-CDF draw from a small probability vector, given u ~ U[0, 1).
+
+    A plain Python scan beats np.random.choice by ~20x for the 2-12
+    actions a Bid Whist node has. Zero-probability actions are never
+    returned, even when rounding leaves the cumulative sum below u.
+    """
+    cumulative = 0.0
+    last = 0
+    for i, p in enumerate(probs.tolist()):
+        if p > 0.0:
+            cumulative += p
+            last = i
+            if u < cumulative:
+                return i
+    return last
+
+
 # ── Heuristic discard ─────────────────────────────────────────────────
 
 def heuristic_discard(gs: GameState) -> Action:
@@ -332,28 +440,498 @@ def evaluate_play_heuristic(gs: GameState) -> float:
     return points if declarer_team == 0 else -points
 
 
-def evaluate_play_random(gs: GameState, n_rollouts: int = 1) -> float:
+def _random_playout(gs: GameState,
+                    play_policy: Optional[Callable[[GameState], Action]] = None) -> tuple[float, bool]:
+    """One playout (uniform random or play_policy): (team-0 payoff, declarer made the contract)."""
+    sim = play_out(gs, play_policy)
+    payoff = hand_payoff(sim)
+    return payoff[0] - payoff[1], payoff[gs.declarer % 2] > 0
+
+
+def evaluate_play_random(gs: GameState, n_rollouts: int = 1,
+                         se_target: Optional[float] = None, batch_size: int = 4,
+                         stats: Optional[dict] = None,
+                         play_policy: Optional[Callable[[GameState], Action]] = None,
+                         utility: Optional[Callable[[float], float]] = None) -> float:
     """
     Evaluate a play-phase state by random rollouts.
     Returns utility from team 0 perspective (positive = team 0 wins).
     Slower but more accurate than heuristic.
+
+    `play_policy` (GameState -> Action, e.g. playout_policy.heuristic_play)
+    replaces uniform random card choice in the playouts. `utility` maps
+    each playout's team-0 delta (e.g. to match equity) before averaging,
+    so the result is E[u(delta)] rather than u(E[delta]); se_target is
+    then on the utility scale.
+
+    Adaptive mode (`se_target` set): n_rollouts becomes a cap. Rollouts
+    run in batches of `batch_size` and stop once the standard error of
+    the mean is at most se_target, or once two batches have all landed
+    on the same side of the contract (all made / all set).
+
+    `stats` (a dict) accumulates "leaves", "rollouts" and "budget", the
+    rollouts a fixed n_rollouts evaluation would have spent.
     """
+    if stats is not None:
+        stats["leaves"] = stats.get("leaves", 0) + 1
+        stats["budget"] = stats.get("budget", 0) + n_rollouts
     total = 0.0
-    for _ in range(n_rollouts):
-        sim = gs.copy()
-        while not is_terminal(sim):
-            player = acting_player(sim)
-            actions = legal_play_actions(sim, player)
-            if not actions:
-                break
-            sim = apply_action(sim, random.choice(actions))
-        payoff = hand_payoff(sim)
-        total += payoff[0] - payoff[1]
-    return total / n_rollouts
+    if se_target is None:
+        for _ in range(n_rollouts):
+            value = _random_playout(gs, play_policy)[0]
+            total += value if utility is None else utility(value)
+        if stats is not None:
+            stats["rollouts"] = stats.get("rollouts", 0) + n_rollouts
+        return total / n_rollouts
+
+    total_sq = 0.0
+    made = k = 0
+    while k < n_rollouts:
+        for _ in range(min(batch_size, n_rollouts - k)):
+            value, made_contract = _random_playout(gs, play_policy)
+            if utility is not None:
+                value = utility(value)
+            total += value
+            total_sq += value * value
+            made += made_contract
+            k += 1
+        if k < 2:
+            continue
+        var = max(total_sq - total * total / k, 0.0) / (k - 1)
+        if var <= se_target * se_target * k:
+            break
+        if k >= 2 * batch_size and made in (0, k):
+            break
+    if stats is not None:
+        stats["rollouts"] = stats.get("rollouts", 0) + k
+    return total / k
+
+
+# ── Batched play evaluation ──────────────────────────────────────────
+
+_DIRECTIONS = list(Direction)
+_CARD_SUITS = np.array([s for s in Suit for _ in range(2, 15)], dtype=np.int64)
+_CARD_RANKS = np.array([r for _ in Suit for r in range(2, 15)], dtype=np.int64)
+
+
+def _card_index(card: Card) -> int:
+    """Position of a card in make_deck() order."""
+    return card.suit * 13 + card.rank - 2
+
+
+def _side_winner_value(ws: float) -> float:
+    """Expected side-suit tricks for a non-trump card (evaluate_play_heuristic)."""
+    if ws >= 0.9:
+        return 0.7
+    elif ws >= 0.7:
+        return 0.35
+    elif ws >= 0.5:
+        return 0.1
+    return 0.0
+
+
+# [direction index, card index] -> per-card heuristic trick contribution
+_WS_BY_CARD = np.array([[_winner_score(r, d) for r in _CARD_RANKS] for d in _DIRECTIONS])
+_TRUMP_VALUE_BY_CARD = 0.45 + 0.3 * _WS_BY_CARD
+_SIDE_VALUE_BY_CARD = np.vectorize(_side_winner_value)(_WS_BY_CARD)
+
+
+def evaluate_play_heuristic_batch(states: list[GameState]) -> np.ndarray:
+    """
+    Vectorized evaluate_play_heuristic over many play-phase states.
+
+    Encodes every state as a 52-card owner row and evaluates the whole
+    batch with a handful of array operations. Returns utilities from
+    team 0's perspective, one per state (equal to the scalar version up
+    to floating-point summation order).
+    """
+    b = len(states)
+    if b == 0:
+        return np.zeros(0)
+
+    owner = np.full((b, 52), -1, dtype=np.int64)
+    trump = np.full(b, -1, dtype=np.int64)
+    dir_idx = np.zeros(b, dtype=np.int64)
+    declarer_team = np.zeros(b, dtype=np.int64)
+    high_bid = np.zeros(b, dtype=np.float64)
+    for i, gs in enumerate(states):
+        assert gs.declarer is not None
+        row = owner[i]
+        for player, hand in enumerate(gs.hands):
+            for card in hand:
+                row[_card_index(card)] = player
+        if gs.trump_suit is not None:
+            trump[i] = gs.trump_suit
+        dir_idx[i] = _DIRECTIONS.index(gs.direction)
+        declarer_team[i] = gs.declarer % 2
+        high_bid[i] = gs.high_bid
+
+    is_trump = _CARD_SUITS[None, :] == trump[:, None]
+    contrib = np.where(is_trump, _TRUMP_VALUE_BY_CARD[dir_idx], _SIDE_VALUE_BY_CARD[dir_idx])
+    held = owner >= 0
+    team0 = (contrib * (held & (owner % 2 == 0))).sum(axis=1)
+    team1 = (contrib * (held & (owner % 2 == 1))).sum(axis=1)
+    return _heuristic_points(team0, team1, declarer_team, high_bid)
+
+
+def _heuristic_points(team0: np.ndarray, team1: np.ndarray,
+                      declarer_team: np.ndarray, high_bid: np.ndarray) -> np.ndarray:
+    """Raw team trick estimates -> team-0 utility (evaluate_play_heuristic scoring)."""
+    # Normalize to 12 tricks
+    total = team0 + team1
+    scale = np.where(total > 0, 12.0 / np.where(total > 0, total, 1.0), 1.0)
+    team_tricks = np.stack(np.broadcast_arrays(team0 * scale, team1 * scale), axis=-1)
+
+    # Add kitty book for declarer
+    declarer_books = np.take_along_axis(
+        team_tricks, np.broadcast_to(declarer_team, team_tricks.shape[:-1])[..., None], axis=-1)[..., 0] + 1
+    contract = high_bid + 6
+    points = np.where(declarer_books >= contract,
+                      high_bid + (declarer_books - contract) / 2,
+                      -(high_bid + (contract - declarer_books) / 2))
+    return np.where(declarer_team == 0, points, -points)
+
+
+# ── Shared trump-choice evaluation ───────────────────────────────────
+
+# [direction index, card index] -> card_strength rank value
+_RANK_VAL_BY_CARD = np.array([[card_strength(Card(Suit(int(su)), int(r)), None, d)[1]
+                               for su, r in zip(_CARD_SUITS, _CARD_RANKS)]
+                              for d in _DIRECTIONS])
+_TRUMP_ACTIONS = legal_trump_actions()
+_TRUMP_SUIT_IDX = np.array([a.trump.suit for a in _TRUMP_ACTIONS])
+_TRUMP_DIR_IDX = np.array([_DIRECTIONS.index(a.trump.direction) for a in _TRUMP_ACTIONS])
+
+
+def trump_discards(gs: GameState) -> tuple[list[Action], np.ndarray]:
+    """
+    heuristic_discard for all 12 trump choices of a TRUMP_SELECTION state
+    in one pass.
+
+    Suit counts and per-direction card strengths of the 16-card declarer
+    hand are computed once; each choice only re-ranks the keep scores.
+    Returns (discard actions in legal_trump_actions() order, boolean
+    keep mask of shape (12, 16) over gs.hands[declarer]).
+    """
+    assert gs.declarer is not None
+    hand = gs.hands[gs.declarer]
+    idx = np.array([_card_index(c) for c in hand])
+    suits = _CARD_SUITS[idx]
+    suit_count = np.bincount(suits, minlength=4)[suits]
+
+    # keep_score = is_trump * 100 + rank_value + suit_count * 5, per choice
+    is_trump = suits[None, :] == _TRUMP_SUIT_IDX[:, None]
+    scores = is_trump * 100 + _RANK_VAL_BY_CARD[_TRUMP_DIR_IDX][:, idx] + suit_count * 5
+    order = np.argsort(scores, axis=1, kind="stable")  # stable, like sorted()
+
+    keep = np.ones((len(_TRUMP_ACTIONS), len(hand)), dtype=bool)
+    np.put_along_axis(keep, order[:, :4], False, axis=1)
+    discards = [Action(discard=frozenset(hand[j] for j in row[:4])) for row in order]
+    return discards, keep
+
+
+def evaluate_trump_choices(gs: GameState) -> tuple[list[Action], np.ndarray]:
+    """
+    Heuristic discard + evaluate_play_heuristic for all 12 trump choices
+    of a TRUMP_SELECTION state, sharing work across choices.
+
+    The three other hands do not change with the choice, so their
+    per-(direction, suit) trump and side-suit sums are computed once and
+    indexed; only the declarer's kept 12 cards are re-scored per choice.
+    Returns (discard actions, team-0 values), both in
+    legal_trump_actions() order.
+    """
+    discards, keep = trump_discards(gs)
+    declarer = gs.declarer
+    n_choices = len(_TRUMP_ACTIONS)
+
+    # Declarer: per-choice contribution of the kept cards
+    idx = np.array([_card_index(c) for c in gs.hands[declarer]])
+    is_trump = _CARD_SUITS[idx][None, :] == _TRUMP_SUIT_IDX[:, None]
+    contrib = np.where(is_trump, _TRUMP_VALUE_BY_CARD[_TRUMP_DIR_IDX][:, idx],
+                       _SIDE_VALUE_BY_CARD[_TRUMP_DIR_IDX][:, idx])
+    team_est = np.zeros((n_choices, 2))
+    team_est[:, declarer % 2] += (contrib * keep).sum(axis=1)
+
+    # Other players: [direction, suit] sums, then pick per choice
+    for player in range(4):
+        if player == declarer:
+            continue
+        pidx = np.array([_card_index(c) for c in gs.hands[player]], dtype=np.int64)
+        suit_onehot = np.eye(4)[_CARD_SUITS[pidx]]               # (cards, 4)
+        trump_by_suit = _TRUMP_VALUE_BY_CARD[:, pidx] @ suit_onehot  # (3 dirs, 4 suits)
+        side_by_suit = _SIDE_VALUE_BY_CARD[:, pidx] @ suit_onehot
+        side_total = side_by_suit.sum(axis=1, keepdims=True)
+        est = trump_by_suit + (side_total - side_by_suit)
+        team_est[:, player % 2] += est[_TRUMP_DIR_IDX, _TRUMP_SUIT_IDX]
+
+    values = _heuristic_points(team_est[:, 0], team_est[:, 1],
+                               np.int64(declarer % 2), np.float64(gs.high_bid))
+    return discards, values
+
+
+def evaluate_play_random_batch(states: list[GameState], n_rollouts: int = 1,
+                               weights: Optional[np.ndarray] = None,
+                               se_target: Optional[float] = None, batch_size: int = 4,
+                               stats: Optional[dict] = None,
+                               play_policy: Optional[Callable[[GameState], Action]] = None,
+                               utility: Optional[Callable[[float], float]] = None) -> np.ndarray:
+    """
+    evaluate_play_random over a list of states (no vectorization possible).
+
+    `weights` gives each state's relative importance (1 = normal) in
+    adaptive mode: state i stops at standard error se_target / sqrt(w_i),
+    so important leaves get more of the n_rollouts budget.
+    """
+    if se_target is None or weights is None:
+        return np.array([evaluate_play_random(gs, n_rollouts, se_target, batch_size, stats,
+                                              play_policy, utility)
+                         for gs in states], dtype=np.float64)
+    targets = se_target / np.sqrt(np.maximum(weights, 1e-6))
+    return np.array([evaluate_play_random(gs, n_rollouts, float(target), batch_size, stats,
+                                          play_policy, utility)
+                     for gs, target in zip(states, targets)], dtype=np.float64)
+
+
+def leaf_importance(strategy: np.ndarray) -> np.ndarray:
+    """
+    Relative importance of the children of an updating-team node: an
+    action's value enters the node value with weight sigma(a), and every
+    action's regret needs its own value. (n * sigma + 1) / 2 has mean 1
+    over the actions.
+    """
+    return (len(strategy) * strategy + 1.0) / 2.0
+
+
+# ── Leaf value cache ─────────────────────────────────────────────────
+
+class LeafCache:
+    """
+    Bounded LRU cache of play-phase leaf values.
+
+    Keyed by (deal_id, declarer, high_bid, trump_suit, direction): once
+    the auction and trump choice are fixed, the heuristic discard and the
+    play evaluation depend on nothing else, so every bidding path (and
+    both updating-team traversals) that reaches the same contract on the
+    same deal can share one evaluation.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: OrderedDict[tuple, float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[float]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: float) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate()}
+
+
+# ── Estimator variance ───────────────────────────────────────────────
+
+class RunningStats:
+    """Welford running mean / variance of a stream of floats."""
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 until two values have been seen)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+# ── Convergence monitoring ───────────────────────────────────────────
+
+class ConvergenceMonitor:
+    """
+    Online convergence metrics for BidWhistCFR.train, with early stopping.
+
+    Every `check_every` iterations, each node visited since the previous
+    check is compared with a snapshot of its average strategy taken at
+    that check. Nodes that were not visited cannot have moved: the scan
+    still walks every node, but skips those with an unchanged visit
+    count after one dict lookup and an integer comparison, so the
+    strategy and regret work is proportional to the touched nodes:
+
+        mean_l1       visit-weighted mean L1 change of the average strategy
+        moving_frac   fraction of touched nodes whose change exceeds
+                      `move_tol` (new nodes count as moving)
+        regret_norm   visit-weighted mean of sum(R+) / T, the average
+                      positive regret, which bounds the nodes' regret
+
+    Training stops once every set target (`l1_target`, `moving_target`,
+    `regret_target`) has been met at `patience` consecutive checks. Each
+    check is appended as one JSON line to `curve_path` when given.
+    """
+
+    def __init__(self, check_every: int = 100, l1_target: Optional[float] = None,
+                 moving_target: Optional[float] = None,
+                 regret_target: Optional[float] = None, move_tol: float = 0.01,
+                 patience: int = 2, curve_path: Optional[str] = None):
+        self.check_every = check_every
+        self.l1_target = l1_target
+        self.moving_target = moving_target
+        self.regret_target = regret_target
+        self.move_tol = move_tol
+        self.patience = patience
+        self.curve_path = curve_path
+        self.curve: list[dict] = []
+        self._snapshot: dict[str, tuple[int, np.ndarray]] = {}
+        self._streak = 0
+
+    def start(self, nodes: dict[str, CFRNode]) -> None:
+        """Snapshot the current tables (e.g. when resuming a trained solver)."""
+        self._snapshot = {k: (n.visit_count, n.get_average_strategy()) for k, n in nodes.items()}
+        self._streak = 0
+        if self.curve_path is not None:
+            open(self.curve_path, "w").close()
+
+    def check(self, nodes: dict[str, CFRNode], iterations: int, seconds: float) -> dict:
+        """Compute metrics since the previous check and record them."""
+        touched = moving = weight = 0
+        l1_sum = regret_sum = 0.0
+        t = max(iterations, 1)
+        for key, node in nodes.items():
+            prev = self._snapshot.get(key)
+            if prev is not None and prev[0] == node.visit_count:
+                continue
+            avg = node.get_average_strategy()
+            visits = node.visit_count - (prev[0] if prev is not None else 0)
+            touched += 1
+            weight += visits
+            if prev is None:
+                moving += 1
+            else:
+                l1 = float(np.abs(avg - prev[1]).sum())
+                l1_sum += visits * l1
+                moving += l1 > self.move_tol
+            regret_sum += visits * float(np.maximum(node.regret_sum, 0.0).sum()) / t
+            self._snapshot[key] = (node.visit_count, avg)
+
+        row = {
+            "iteration": iterations,
+            "seconds": round(seconds, 3),
+            "nodes": len(nodes),
+            "touched": touched,
+            "mean_l1": l1_sum / weight if weight else 0.0,
+            "moving_frac": moving / touched if touched else 0.0,
+            "regret_norm": regret_sum / weight if weight else 0.0,
+        }
+        self.curve.append(row)
+        if self.curve_path is not None:
+            with open(self.curve_path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+
+        targets = [(name, target) for name, target in
+                   (("mean_l1", self.l1_target), ("moving_frac", self.moving_target),
+                    ("regret_norm", self.regret_target)) if target is not None]
+        if targets and all(row[name] <= target for name, target in targets):
+            self._streak += 1
+        else:
+            self._streak = 0
+        return row
+
+    def converged(self) -> bool:
+        """Have the targets held for `patience` consecutive checks?"""
+        return self._streak >= self.patience
+
+
+# ── Traversal stack frame ────────────────────────────────────────────
+
+class _TraversalFrame:
+    """
+    One level of the explicit traversal stack. Frames are preallocated
+    and reused, so iterative traversals allocate no per-level objects
+    beyond the action-value buffer.
+    """
+    __slots__ = ("state", "actions", "node", "strategy", "team", "pruned",
+                 "values", "n", "i", "updating", "reach_other")
+
+    def __init__(self):
+        self.state = None
+        self.i = -1
+        self.n = 0
+
+    def push(self, state, actions, node, strategy, team, pruned) -> None:
+        """External sampling: an updating-team node whose children are walked in order."""
+        self.state = state
+        self.actions = actions
+        self.node = node
+        self.strategy = strategy
+        self.team = team
+        self.pruned = pruned
+        self.n = len(actions)
+        self.values = np.zeros(self.n)
+        self.i = -1
+
+    def push_sample(self, node, strategy, idx, updating, reach_other) -> None:
+        """Outcome sampling: the sampled action at a node on the path."""
+        self.node = node
+        self.strategy = strategy
+        self.i = idx
+        self.updating = updating
+        self.reach_other = reach_other
+
+    def next_action(self) -> int:
+        """Advance to the next non-pruned action (returns n when exhausted)."""
+        i = self.i + 1
+        pruned = self.pruned
+        if pruned is not None:
+            while i < self.n and pruned[i]:
+                i += 1
+        self.i = i
+        return i
 
 
 # ── CFR Solver ────────────────────────────────────────────────────────
 
+# Regret / averaging update rules:
+#   vanilla  regrets summed, uniform strategy averaging
+#   cfr+     regrets floored at 0 after every update, linear averaging
+#   linear   regrets and strategy contributions weighted by iteration t
+#   dcfr     positive regrets discounted by t^a/(t^a+1), negative by
+#            t^b/(t^b+1), strategy contributions weighted by t^g
+CFR_SCHEMES = ("vanilla", "cfr+", "linear", "dcfr")
+
+# Traversal sampling:
+#   external  traverse every updating-team action, sample opponents
+#   outcome   sample one action everywhere (epsilon-exploration for the
+#             updating team), importance-weighted regrets
+SAMPLING_SCHEMES = ("external", "outcome")
+
+
 class BidWhistCFR:
     """
     External-sampling MCCFR for Bid Whist bidding + trump selection.
@@ -363,18 +941,535 @@ class BidWhistCFR:
 
     Teammates share an interest but have private information (their own hand).
     Each player has their own info sets and strategies.
+
+    `scheme` selects the regret update rule (see CFR_SCHEMES); alpha, beta
+    and gamma are the DCFR discount exponents (defaults from Brown &
+    Sandholm 2019). `sampling` selects external or outcome sampling (see
+    SAMPLING_SCHEMES); `exploration` is the outcome-sampling epsilon.
+
+    Regret-based pruning (external sampling): once `prune_after`
+    iterations have run, updating-team actions with zero probability and
+    regret below `prune_threshold` are not traversed. Every
+    `prune_revisit`-th iteration traverses everything so pruned actions
+    can recover. None disables pruning.
+
+    `leaf_cache_size` > 0 memoizes discard + play evaluation per (deal,
+    contract) in an LRU LeafCache shared by both traversals of a deal.
+
+    `batch_leaves` switches external sampling to cfr_iterate_batched,
+    which collects every play leaf of a traversal and evaluates them in a
+    single call to `leaf_batch_evaluator` (list of states -> array of
+    team-0 values). By default that is evaluate_play_heuristic_batch, or
+    evaluate_play_random_batch when play_rollouts > 0. A custom
+    `leaf_batch_evaluator` (e.g. value_net.ValueNetEvaluator, or a
+    rollout_store.RolloutStore reusing rollouts across runs) replaces
+    the play evaluator in every traversal; unbatched traversals pass
+    single leaves as one-state batches.
+
+    `rollout_se` makes rollout leaves adaptive (evaluate_play_random):
+    play_rollouts becomes a per-leaf cap, rollouts run in batches of
+    `rollout_batch` and stop at standard error rollout_se (in points) or
+    once the contract result is clear (it needs play_rollouts > 0 and
+    no leaf_batch_evaluator). The 12 trump choices of an
+    updating-team node are weighted by leaf_importance of the current
+    strategy, so likely choices are evaluated more precisely.
+    rollout_stats counts leaves, rollouts run and the fixed-count budget.
+    `play_policy` (e.g. playout_policy.heuristic_play) plays the rollout
+    leaves instead of uniform random cards (also only with rollout
+    leaves; evaluators such as RolloutStore take their own play_policy).
+
+    `iterative` runs external and outcome sampling with the explicit-stack
+    traversals (cfr_iterate_iterative / cfr_iterate_outcome_iterative),
+    which give the same updates as the recursive ones.
+
+    Variance reduction (VR-MCCFR, Schmid et al. 2019): wherever an action
+    is sampled, the node's value estimate becomes
+    sum_a sigma(a) b(a) + (u - b(a*)) * sigma(a*) / q(a*), which stays
+    unbiased for any baseline b but has lower variance the closer b is to
+    the true action values. `baselines` learns b per abstract info set and
+    action as an exponential moving average (rate `baseline_decay`) of the
+    observed child values. `control_variate` uses evaluate_play_heuristic
+    of all 12 contracts as b at trump-selection nodes instead, a control
+    variate for the rollout leaves (with heuristic leaves the sampled
+    trump choice is replaced by its exact expectation). Both use the
+    recursive traversals. `track_variance` reports sampling_variance()
+    at every train() progress line.
+
+    `rotate_dealer` makes train() reuse each dealt set of cards for four
+    consecutive iterations, with dealers 0-3. Abstract keys hold only
+    seat-relative features (bid position, dealer flag, partner / enemy
+    bids), so a rotated state lands on the same nodes as the equivalent
+    original one, and each rotation puts every hand in a different bid
+    position: four distinct auctions for one deal. Hand bins and trump
+    evaluations are cached per deal (also without rotation, where the two
+    team traversals share them), and leaf-cache entries are shared by
+    the rotations.
+
+    `match_equity` (match_equity.MatchEquity) switches to score-aware
+    utilities. train() gives every deal a match score drawn from the
+    table's reach distribution, and each leaf's point delta becomes
+    2 * P(team 0 wins the match) - 1 through one interpolated lookup in
+    the root state's hand_values row. Rollout leaves map every playout
+    before averaging, so they keep the score-dependent risk preference
+    (E[u(delta)]); heuristic and custom-evaluator leaves only give an
+    expected delta, so their values are certainty-equivalent
+    approximations u(E[delta]). Info set keys get a score_tag suffix, so
+    strategies can differ by score. Utilities then lie in [-1, 1];
+    prune_threshold and rollout_se are on that scale. eval_every is
+    unavailable, since best_response measures raw points.
     """
 
-    def __init__(self, play_rollouts: int = 1):
+    def __init__(self, play_rollouts: int = 1, scheme: str = "vanilla",
+                 alpha: float = 1.5, beta: float = 0.0, gamma: float = 2.0,
+                 sampling: str = "external", exploration: float = 0.6,
+                 prune_threshold: Optional[float] = None, prune_after: int = 100,
+                 prune_revisit: int = 20, leaf_cache_size: int = 0,
+                 batch_leaves: bool = False,
+                 leaf_batch_evaluator: Optional[Callable[[list[GameState]], np.ndarray]] = None,
+                 iterative: bool = False, baselines: bool = False,
+                 baseline_decay: float = 0.05, control_variate: bool = False,
+                 track_variance: bool = False, rotate_dealer: bool = False,
+                 match_equity: Optional[MatchEquity] = None,
+                 rollout_se: Optional[float] = None, rollout_batch: int = 4,
+                 play_policy: Optional[Callable[[GameState], Action]] = None):
+        if scheme not in CFR_SCHEMES:
+            raise ValueError(f"Unknown CFR scheme {scheme!r}, expected one of {CFR_SCHEMES}")
+        if sampling not in SAMPLING_SCHEMES:
+            raise ValueError(f"Unknown sampling {sampling!r}, expected one of {SAMPLING_SCHEMES}")
+        if (baselines or control_variate) and (iterative or batch_leaves):
+            raise ValueError("baselines / control_variate use the recursive traversals; "
+                             "they cannot be combined with iterative or batch_leaves")
+        if rollout_se is not None and (play_rollouts == 0 or leaf_batch_evaluator is not None):
+            raise ValueError("rollout_se applies to rollout leaves; it needs play_rollouts > 0 "
+                             "and no leaf_batch_evaluator")
+        if play_policy is not None and (play_rollouts == 0 or leaf_batch_evaluator is not None):
+            raise ValueError("play_policy plays rollout leaves; it needs play_rollouts > 0 "
+                             "and no leaf_batch_evaluator (pass it to the evaluator instead)")
         self.nodes: dict[str, CFRNode] = {}
         self.play_rollouts = play_rollouts
         self.iterations = 0
+        self.scheme = scheme
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.sampling = sampling
+        self.exploration = exploration
+        self.prune_threshold = prune_threshold
+        self.prune_after = prune_after
+        self.prune_revisit = prune_revisit
+        self.prune_stats = {"pruned": 0, "traversed": 0}
+        self.leaf_cache = LeafCache(leaf_cache_size) if leaf_cache_size > 0 else None
+        self._deal_id: Optional[int] = None  # identifies the deal being traversed
+        # Per-deal work shared by all traversals of the same cards (train only)
+        self._deal_work: Optional[dict] = None
+        self.rotate_dealer = rotate_dealer
+        self.batch_leaves = batch_leaves
+        self.leaf_batch_evaluator = leaf_batch_evaluator
+        self.rollout_se = rollout_se
+        self.rollout_batch = rollout_batch
+        self.rollout_stats = {"leaves": 0, "rollouts": 0, "budget": 0}
+        self.play_policy = play_policy
+        self.match_equity = match_equity
+        # Match-mode context of the traversal root: hand_values row,
+        # passed-out hand utility and per-team key suffixes.
+        self._match_row: Optional[np.ndarray] = None
+        self._redeal_value = 0.0
+        self._score_tags: Optional[tuple[str, str]] = None
+        # Per-traversal context: the auction is traversed as BidState
+        # tuples against this root, with hand bins computed once.
+        self._bid_root: Optional[GameState] = None
+        self._bid_bins: list[str] = []
+        self._trump_bins: dict[int, str] = {}
+        self.iterative = iterative
+        self._uniform = UniformBuffer()
+        self.baselines = baselines
+        self.baseline_decay = baseline_decay
+        self.control_variate = control_variate
+        self.track_variance = track_variance
+        self._frozen = False  # sampling_variance probes: traverse without updating
+        self._probe_views: dict[str, CFRNode] = {}  # probe node views (get_node while frozen)
+        self.profiler = None  # profiling.Profiler while attached
+        self._frames: list[_TraversalFrame] = [_TraversalFrame() for _ in range(8)]
+        # Cumulative log discount factors for DCFR: _log_disc_*[j] is
+        # sum_{k=1..j} log d(k), so a node untouched since iteration m
+        # owes exp(L[t-1] - L[m-1]) at iteration t.
+        self._log_disc_pos = [0.0]
+        self._log_disc_neg = [0.0]
 
     def get_node(self, key: str, n_actions: int) -> CFRNode:
+        if self._frozen:
+            return self._node_view(key, n_actions)
         if key not in self.nodes:
             self.nodes[key] = CFRNode(num_actions=n_actions)
         return self.nodes[key]
 
+    def _node_view(self, key: str, n_actions: int) -> CFRNode:
+        """
+        Probe-private node sharing the trained node's regrets and baseline
+        (read only while frozen), with its own strategy buffer and visit
+        count; unseen keys get a fresh node that is not registered.
+        """
+        view = self._probe_views.get(key)
+        if view is None:
+            view = self._probe_views[key] = CFRNode(num_actions=n_actions)
+            node = self.nodes.get(key)
+            if node is not None:
+                view.regret_sum = node.regret_sum
+                view.baseline = node.baseline
+        return view
+
+    # ── Update rules ──
+
+    def _current_iteration(self) -> int:
+        """1-based index of the iteration being traversed."""
+        return self.iterations + 1
+
+    def _strategy_weight(self) -> float:
+        """Weight of this iteration's contribution to the average strategy."""
+        if self._frozen:
+            return 0.0
+        if self.scheme == "vanilla":
+            return 1.0
+        t = self._current_iteration()
+        if self.scheme == "dcfr":
+            return float(t) ** self.gamma
+        return float(t)  # cfr+ and linear
+
+    def _pruning_active(self) -> bool:
+        """Is regret-based pruning in effect for the current iteration?"""
+        if self.prune_threshold is None:
+            return False
+        t = self._current_iteration()
+        return t > self.prune_after and t % self.prune_revisit != 0
+
+    def _extend_discounts(self, t: int) -> None:
+        """Grow the DCFR cumulative discount tables to cover iteration t."""
+        while len(self._log_disc_pos) <= t:
+            k = len(self._log_disc_pos)
+            ka, kb = float(k) ** self.alpha, float(k) ** self.beta
+            self._log_disc_pos.append(self._log_disc_pos[-1] + math.log(ka / (ka + 1)))
+            self._log_disc_neg.append(self._log_disc_neg[-1] + math.log(kb / (kb + 1)))
+
+    def _accumulate_regret(self, node: CFRNode, deltas: np.ndarray) -> None:
+        """Add instantaneous regrets to a node under the selected scheme."""
+        if self._frozen:
+            return
+        if self.scheme == "vanilla":
+            node.regret_sum += deltas
+        elif self.scheme == "cfr+":
+            node.regret_sum += deltas
+            np.maximum(node.regret_sum, 0.0, out=node.regret_sum)
+        elif self.scheme == "linear":
+            node.regret_sum += self._current_iteration() * deltas
+        else:  # dcfr
+            t = self._current_iteration()
+            m = node.last_iter
+            if 0 < m < t:
+                # Apply the end-of-iteration discounts for m..t-1 lazily;
+                # discounting preserves sign, so nothing changed in between.
+                self._extend_discounts(t)
+                pos = math.exp(self._log_disc_pos[t - 1] - self._log_disc_pos[m - 1])
+                neg = math.exp(self._log_disc_neg[t - 1] - self._log_disc_neg[m - 1])
+                r = node.regret_sum
+                r *= np.where(r > 0, pos, neg)
+            node.regret_sum += deltas
+            node.last_iter = t
+
+    def rollouts_saved(self) -> float:
+        """Fraction of the fixed play_rollouts budget adaptive rollouts skipped."""
+        budget = self.rollout_stats["budget"]
+        return 1.0 - self.rollout_stats["rollouts"] / budget if budget else 0.0
+
+    def export_strategy(self, path: str) -> int:
+        """Write average strategies to a memory-mappable file (see strategy_file)."""
+        return export_strategy(self.nodes, path)
+
+    # ── Traversal helpers ──
+
+    def _begin_traversal(self, gs: GameState) -> GameState | BidState:
+        """
+        Set up per-traversal context and return the state to traverse.
+
+        A BIDDING state is converted to a BidState: the auction subtree is
+        then walked with small tuples, and the full GameState is rebuilt
+        only when the auction ends (complete_auction).
+        """
+        if self.match_equity is not None:
+            s0, s1 = gs.team_scores
+            self._match_row = self.match_equity.values_row(gs.team_scores, gs.dealer)
+            self._redeal_value = self.match_equity.redeal_value(gs.team_scores, gs.dealer)
+            self._score_tags = (score_tag(s0, s1), score_tag(s1, s0))
+        work = self._deal_work
+        self._trump_bins = {} if work is None else work.setdefault("trump_bins", {})
+        if gs.phase != Phase.BIDDING:
+            self._bid_root = None
+            return gs
+        self._bid_root = gs
+        if work is None:
+            self._bid_bins = [bid_hand_bins(h) for h in gs.hands]
+        else:
+            if "bid_bins" not in work:
+                work["bid_bins"] = [bid_hand_bins(h) for h in gs.hands]
+            self._bid_bins = work["bid_bins"]
+        return BidState.from_game_state(gs)
+
+    def _child(self, state: GameState | BidState, action) -> GameState | BidState:
+        """Successor state; bidding actions on a BidState are bid amounts."""
+        if type(state) is BidState:
+            nxt = apply_bid(state, action)
+            if nxt.bid_count >= 4:
+                return complete_auction(self._bid_root, nxt)
+            return nxt
+        return apply_action(state, action)
+
+    def _leaf_value(self, gs: GameState | BidState) -> Optional[float]:
+        """
+        Team-0 value of a non-decision state (terminal, discard or play),
+        or None if `gs` is a BIDDING / TRUMP_SELECTION decision node.
+        """
+        if type(gs) is BidState:
+            return None
+
+        # ── Terminal ──
+        if is_terminal(gs):
+            return self._terminal_value(gs)
+
+        # ── Discard: heuristic (memoized per deal + contract) ──
+        if gs.phase == Phase.DISCARDING:
+            if self.leaf_cache is None or self._deal_id is None:
+                leaf = apply_action(gs, heuristic_discard(gs))
+                return self._leaf_utility(self._play_value(leaf))
+            key = self._contract_key(gs)
+            value = self.leaf_cache.get(key)
+            if value is None:
+                value = self._play_value(apply_action(gs, heuristic_discard(gs)))
+                self.leaf_cache.put(key, value)
+            return self._leaf_utility(value)
+
+        if gs.phase == Phase.PLAY:
+            return self._leaf_utility(self._play_value(gs))
+
+        return None
+
+    def _terminal_value(self, gs: GameState) -> float:
+        """Team-0 value of a finished or passed-out hand."""
+        if needs_redeal(gs):
+            return self._redeal_value
+        payoff = hand_payoff(gs)
+        return self._utility(payoff[0] - payoff[1])
+
+    def _utility(self, delta):
+        """
+        Team-0 utility of a team-0 point delta (a float or an array of
+        them): the delta itself, or its match-equity value in match mode.
+        Memos and leaf caches hold raw deltas (except per-playout
+        utilities, see _leaf_utility); this is applied on use.
+        """
+        if self._match_row is None:
+            return delta
+        return hand_utility(self._match_row, delta)
+
+    def _playout_utility(self) -> Optional[Callable[[float], float]]:
+        """
+        Per-playout utility for rollout leaves in match mode, None
+        otherwise. Mapping every playout before averaging keeps the
+        score-dependent risk preference (E[u(delta)], not u(E[delta])).
+        """
+        if (self._match_row is None or self.leaf_batch_evaluator is not None
+                or self.play_rollouts == 0):
+            return None
+        return functools.partial(hand_utility, self._match_row)
+
+    def _leaf_utility(self, value: float) -> float:
+        """Utility of a _play_value / _evaluate_leaf_batch result (already one per playout)."""
+        if self._playout_utility() is not None:
+            return value
+        return self._utility(value)
+
+    def _sample(self, strategy: np.ndarray) -> int:
+        """On-policy action index from the buffered uniform stream."""
+        return sample_index(strategy, self._uniform.next())
+
+    def _sample_explore(self, strategy: np.ndarray) -> tuple[int, float]:
+        """
+        Action index from the epsilon-greedy mix used by outcome sampling,
+        and its probability under that mix. One uniform draw picks both the
+        branch (explore vs. on-policy) and the action.
+        """
+        n = len(strategy)
+        eps = self.exploration
+        u = self._uniform.next()
+        if u < eps:
+            idx = min(int(u / eps * n), n - 1)
+        else:
+            idx = sample_index(strategy, (u - eps) / (1.0 - eps))
+        return idx, eps / n + (1.0 - eps) * float(strategy[idx])
+
+    # ── Variance reduction ──
+
+    def _variance_reduced(self) -> bool:
+        return self.baselines or self.control_variate
+
+    def _baseline(self, node: CFRNode, gs: GameState | BidState) -> np.ndarray:
+        """Team-0 action baselines at a decision node (zeros when disabled)."""
+        if self.control_variate and gs.phase == Phase.TRUMP_SELECTION:
+            return self._heuristic_trump_values(gs)
+        if not self.baselines:
+            return np.zeros(node.num_actions)
+        if node.baseline is None:
+            node.baseline = np.zeros(node.num_actions)
+        return node.baseline
+
+    def _update_baseline(self, node: CFRNode, gs: GameState | BidState,
+                         idx: int, value: float) -> None:
+        """Move the learned baseline of action idx toward an observed team-0 value."""
+        if (not self.baselines or self._frozen
+                or (self.control_variate and gs.phase == Phase.TRUMP_SELECTION)):
+            return
+        node.baseline[idx] += self.baseline_decay * (value - node.baseline[idx])
+
+    def _learn_baselines(self, node: CFRNode, gs: GameState | BidState,
+                         action_values: np.ndarray, pruned: Optional[np.ndarray]) -> None:
+        """EMA update of every traversed action's baseline (external sampling)."""
+        if self._frozen or (self.control_variate and gs.phase == Phase.TRUMP_SELECTION):
+            return
+        baseline = self._baseline(node, gs)
+        step = self.baseline_decay * (action_values - baseline)
+        if pruned is not None:
+            step[pruned] = 0.0
+        baseline += step
+
+    def _pruned_actions(self, node: CFRNode, strategy: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Boolean mask of actions to skip under regret-based pruning, or None.
+
+        A pruned action has zero probability, so skipping it leaves the
+        node value unchanged; its regret is left alone. (Under DCFR the
+        comparison uses the not-yet-discounted regret.)
+        """
+        n = node.num_actions
+        if not self._pruning_active():
+            self.prune_stats["traversed"] += n
+            return None
+        pruned = (strategy == 0.0) & (node.regret_sum < self.prune_threshold)
+        n_pruned = int(pruned.sum())
+        self.prune_stats["pruned"] += n_pruned
+        self.prune_stats["traversed"] += n - n_pruned
+        return pruned if n_pruned else None
+
+    def _trump_values(self, gs: GameState, skip: Optional[np.ndarray] = None,
+                      strategy: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Team-0 values of all 12 trump choices at a TRUMP_SELECTION state.
+
+        With heuristic leaves this is one evaluate_trump_choices pass. With
+        rollouts or a custom batch evaluator the discards are still shared,
+        cached contracts are reused and the remaining play states go to
+        the evaluator in one batch. Skipped (pruned) choices are left at 0.
+        `strategy` (the node's current strategy) weights adaptive rollouts.
+        """
+        if self.play_rollouts == 0 and self.leaf_batch_evaluator is None:
+            values = self._heuristic_trump_values(gs)
+            if skip is not None:
+                values[skip] = 0.0
+            return values
+
+        discards, _ = trump_discards(gs)
+        values = np.zeros(len(_TRUMP_ACTIONS))
+        weights = None if strategy is None else leaf_importance(strategy)
+        todo, keys, states = [], [], []
+        for i, (trump, discard) in enumerate(zip(_TRUMP_ACTIONS, discards)):
+            if skip is not None and skip[i]:
+                continue
+            child = apply_action(gs, trump)
+            key = self._contract_key(child)
+            if key is not None and self.leaf_cache is not None:
+                cached = self.leaf_cache.get(key)
+                if cached is not None:
+                    values[i] = self._leaf_utility(cached)
+                    continue
+            todo.append(i)
+            keys.append(key)
+            states.append(apply_action(child, discard))
+        if states:
+            batch_weights = None if weights is None else weights[todo]
+            for i, key, value in zip(todo, keys, self._evaluate_leaf_batch(states, batch_weights)):
+                values[i] = self._leaf_utility(float(value))
+                if key is not None and self.leaf_cache is not None:
+                    self.leaf_cache.put(key, float(value))
+        return values
+
+    def _heuristic_trump_values(self, gs: GameState) -> np.ndarray:
+        """
+        evaluate_trump_choices values as utilities (a fresh array). They
+        depend only on the cards, the declarer and the high bid, so during
+        train they are computed once per deal and contract and shared by
+        every traversal (and dealer rotation) of the deal.
+        """
+        if self._deal_work is None:
+            return self._utility(evaluate_trump_choices(gs)[1])
+        memo = self._deal_work.setdefault("trump_values", {})
+        key = (gs.declarer, gs.high_bid)
+        values = memo.get(key)
+        if values is None:
+            values = memo[key] = evaluate_trump_choices(gs)[1]
+        return self._utility(values.copy())
+
+    def _contract_key(self, gs: GameState) -> Optional[tuple]:
+        """
+        Leaf identity (deal, contract) at the discard step, None outside
+        train. Per-playout match utilities depend on the root's
+        hand_values row, so they are also keyed by the dealer (the score
+        is fixed per deal).
+        """
+        if self._deal_id is None:
+            return None
+        dealer = gs.dealer if self._playout_utility() is not None else None
+        return (self._deal_id, gs.declarer, gs.high_bid, gs.trump_suit, gs.direction, dealer)
+
+    def _play_value(self, gs: GameState) -> float:
+        """
+        Play-phase evaluation: custom evaluator, rollouts or heuristic
+        (fast). A team-0 delta, or already a utility for match-mode
+        rollouts (_playout_utility); _leaf_utility converts either.
+        """
+        if self.leaf_batch_evaluator is not None:
+            return float(self.leaf_batch_evaluator([gs])[0])
+        if self.play_rollouts > 0:
+            return evaluate_play_random(gs, self.play_rollouts, self.rollout_se,
+                                        self.rollout_batch, self.rollout_stats, self.play_policy,
+                                        self._playout_utility())
+        return evaluate_play_heuristic(gs)
+
+    def _decision_node(self, gs: GameState | BidState) -> tuple[int, list, CFRNode]:
+        """
+        Acting player, legal actions and abstract CFR node at a decision state.
+
+        For a BidState the actions are bid amounts (legal_bid_amounts);
+        otherwise they are Action objects.
+        """
+        # Abstract info set, from hand bins cached for this traversal
+        if type(gs) is BidState:
+            player = gs.current_bidder
+            actions = legal_bid_amounts(gs)
+            key = bid_key(self._bid_bins[player], player, gs.dealer,
+                          gs.bid_count, gs.high_bid, gs.bids)
+        elif gs.phase == Phase.BIDDING:
+            player = acting_player(gs)
+            actions = legal_actions(gs)
+            key = abstract_bid_key(gs, player)
+        else:
+            player = acting_player(gs)
+            actions = legal_actions(gs)
+            bins = self._trump_bins.get(player)
+            if bins is None:
+                bins = self._trump_bins[player] = trump_hand_bins(gs.hands[player])
+            key = trump_key(bins, player, gs.bids)
+        if self._score_tags is not None:
+            key += self._score_tags[player % 2]
+
+        return player, actions, self.get_node(key, len(actions))
+
     def cfr_iterate(self, gs: GameState, updating_team: int) -> float:
         """
         External-sampling MCCFR traversal.
@@ -390,219 +1485,726 @@ class BidWhistCFR:
         Returns:
             Expected utility for TEAM 0 from this state.
         """
-        # ── Terminal ──
-        if is_terminal(gs):
-            if needs_redeal(gs):
-                return 0.0
-            payoff = hand_payoff(gs)
-            return payoff[0] - payoff[1]
+        return self._cfr_external(self._begin_traversal(gs), updating_team)
 
-        # ── Discard: heuristic ──
-        if gs.phase == Phase.DISCARDING:
-            action = heuristic_discard(gs)
-            return self.cfr_iterate(apply_action(gs, action), updating_team)
-
-        # ── Play: heuristic evaluation (fast) ──
-        if gs.phase == Phase.PLAY:
-            if self.play_rollouts > 0:
-                return evaluate_play_random(gs, self.play_rollouts)
-            return evaluate_play_heuristic(gs)
+    def _cfr_external(self, gs: GameState | BidState, updating_team: int) -> float:
+        """Recursive body of cfr_iterate."""
+        value = self._leaf_value(gs)
+        if value is not None:
+            return value
 
         # ── Decision node (BIDDING or TRUMP_SELECTION) ──
-        player = acting_player(gs)
+        player, actions, node = self._decision_node(gs)
         team = player % 2
-
-        actions = legal_actions(gs)
         n = len(actions)
 
-        # Abstract info set
-        if gs.phase == Phase.BIDDING:
-            key = abstract_bid_key(gs, player)
-        else:
-            key = abstract_trump_key(gs, player)
-
-        node = self.get_node(key, n)
-        strategy = node.get_strategy()
+        strategy = node.current_strategy(self._strategy_weight())
 
         if team != updating_team:
             # OPPONENT: sample one action from strategy
-            idx = np.random.choice(n, p=strategy)
-            return self.cfr_iterate(apply_action(gs, actions[idx]), updating_team)
+            idx = self._sample(strategy)
+            if self._variance_reduced():
+                return self._opponent_estimate(gs, actions, node, strategy, idx, updating_team)
+            return self._cfr_external(self._child(gs, actions[idx]), updating_team)
+
+        # UPDATING TEAM: traverse all actions, except deeply negative ones
+        # when pruning. Trump nodes evaluate all 12 choices in one shared pass.
+        pruned = self._pruned_actions(node, strategy)
+        if gs.phase == Phase.TRUMP_SELECTION:
+            action_values = self._trump_values(gs, pruned, strategy)
+        else:
+            action_values = np.zeros(n)
+            for i, action in enumerate(actions):
+                if pruned is None or not pruned[i]:
+                    action_values[i] = self._cfr_external(self._child(gs, action), updating_team)
+        if self.baselines:
+            self._learn_baselines(node, gs, action_values, pruned)
+
+        return self._finish_external(node, strategy, team, action_values, pruned)
 
-        # UPDATING TEAM: traverse all actions
-        action_values = np.zeros(n)
-        for i, action in enumerate(actions):
-            action_values[i] = self.cfr_iterate(apply_action(gs, action), updating_team)
+    def _opponent_estimate(self, gs: GameState | BidState, actions: list, node: CFRNode,
+                           strategy: np.ndarray, idx: int, updating_team: int) -> float:
+        """
+        Baseline-corrected value of an opponent node in external sampling.
 
+        Opponents sample on-policy (q = sigma), so the correction reduces
+        to sigma . b + u - b(a*).
+        """
+        baseline = self._baseline(node, gs)
+        if (self.control_variate and self.play_rollouts == 0
+                and gs.phase == Phase.TRUMP_SELECTION):
+            # Heuristic leaves: the baseline IS the value, no sample needed
+            value = float(baseline[idx])
+        else:
+            value = self._cfr_external(self._child(gs, actions[idx]), updating_team)
+        estimate = float(np.dot(strategy, baseline)) + value - float(baseline[idx])
+        self._update_baseline(node, gs, idx, value)
+        return estimate
+
+    def _finish_external(self, node: CFRNode, strategy: np.ndarray, team: int,
+                         action_values: np.ndarray, pruned: Optional[np.ndarray]) -> float:
+        """Node value and regret update at an updating-team node (external sampling)."""
         # Node value
         node_value = float(np.dot(strategy, action_values))
 
         # Update regrets (team 0 maximizes, team 1 minimizes)
         sign = 1.0 if team == 0 else -1.0
-        for i in range(n):
-            node.regret_sum[i] += sign * (action_values[i] - node_value)
+        regrets = sign * (action_values - node_value)
+        if pruned is not None:
+            regrets[pruned] = 0.0
+        self._accumulate_regret(node, regrets)
 
         return node_value
 
+    def cfr_iterate_outcome(self, gs: GameState, updating_team: int,
+                            reach_self: float = 1.0, reach_other: float = 1.0,
+                            sample_prob: float = 1.0) -> tuple[float, float]:
+        """
+        Outcome-sampling MCCFR traversal (Lanctot et al. 2009).
+
+        Samples ONE action at every decision node, so a traversal costs a
+        single leaf evaluation instead of one per updating-team branch.
+        The updating team samples from an epsilon-greedy mix of its
+        strategy (`self.exploration`) so every action keeps being tried;
+        regrets are importance-weighted by 1 / sample_prob.
+
+        Parameters:
+            gs: current game state
+            updating_team: which team (0 or 1) we are updating regrets for
+            reach_self: updating team's reach probability to gs
+            reach_other: opponents' reach probability to gs
+            sample_prob: probability the sampling policy reached gs
+
+        Returns:
+            (sampled utility for updating_team divided by the sample
+             probability of the terminal, tail reach probability pi(z|gs))
+        """
+        return self._cfr_outcome(self._begin_traversal(gs), updating_team,
+                                 reach_self, reach_other, sample_prob)
+
+    def _cfr_outcome(self, gs: GameState | BidState, updating_team: int,
+                     reach_self: float, reach_other: float,
+                     sample_prob: float) -> tuple[float, float]:
+        """Recursive body of cfr_iterate_outcome."""
+        value = self._leaf_value(gs)
+        if value is not None:
+            sign = 1.0 if updating_team == 0 else -1.0
+            return sign * value / sample_prob, 1.0
+
+        player, actions, node = self._decision_node(gs)
+        team = player % 2
+
+        if team != updating_team:
+            # OPPONENT: sample on-policy, no averaging contribution
+            strategy = node.current_strategy(0.0)
+            idx = self._sample(strategy)
+            p = float(strategy[idx])
+            u, tail = self._cfr_outcome(
+                self._child(gs, actions[idx]), updating_team,
+                reach_self, reach_other * p, sample_prob * p)
+            return u, tail * p
+
+        # UPDATING TEAM: stochastically-weighted averaging, explore with epsilon
+        strategy = node.current_strategy(self._strategy_weight() * reach_self / sample_prob)
+        idx, q = self._sample_explore(strategy)
+        u, tail = self._cfr_outcome(
+            self._child(gs, actions[idx]), updating_team,
+            reach_self * strategy[idx], reach_other, sample_prob * q)
+
+        self._outcome_regret(node, strategy, idx, u, tail, reach_other)
+        return u, tail * strategy[idx]
+
+    def _outcome_regret(self, node: CFRNode, strategy: np.ndarray, idx: int,
+                        u: float, tail: float, reach_other: float) -> None:
+        """Importance-weighted regret update at an updating-team node (outcome sampling)."""
+        # Sampled action: W * pi(z|ha) * (1 - sigma(a)); others: -W * pi(z|h)
+        w = u * reach_other
+        regrets = np.full(node.num_actions, -w * tail * strategy[idx])
+        regrets[idx] += w * tail
+        self._accumulate_regret(node, regrets)
+
+    def cfr_iterate_outcome_vr(self, gs: GameState, updating_team: int) -> float:
+        """
+        Outcome sampling with baseline-corrected value estimates (VR-MCCFR).
+
+        Every node on the sampled path returns u~(h) = sum_a sigma(a) u~(h, a)
+        with u~(h, a) = b(a) + (u~(ha) - b(a)) / q(a) for the sampled action
+        and b(a) for the others; the updating team's regrets are
+        pi_-i(h) / q(h) * (u~(h, a) - u~(h)). With zero baselines this is
+        exactly cfr_iterate_outcome's update.
+
+        Returns u~ at the root for updating_team.
+        """
+        return self._cfr_outcome_vr(self._begin_traversal(gs), updating_team, 1.0, 1.0, 1.0)
+
+    def _cfr_outcome_vr(self, gs: GameState | BidState, updating_team: int,
+                        reach_self: float, reach_other: float, sample_prob: float) -> float:
+        """Recursive body of cfr_iterate_outcome_vr."""
+        sign = 1.0 if updating_team == 0 else -1.0
+        value = self._leaf_value(gs)
+        if value is not None:
+            return sign * value
+
+        player, actions, node = self._decision_node(gs)
+        team = player % 2
+        if team != updating_team:
+            strategy = node.current_strategy(0.0)
+            idx = self._sample(strategy)
+            q = float(strategy[idx])
+            u = self._cfr_outcome_vr(self._child(gs, actions[idx]), updating_team,
+                                     reach_self, reach_other * q, sample_prob * q)
+        else:
+            strategy = node.current_strategy(self._strategy_weight() * reach_self / sample_prob)
+            idx, q = self._sample_explore(strategy)
+            u = self._cfr_outcome_vr(self._child(gs, actions[idx]), updating_team,
+                                     reach_self * strategy[idx], reach_other, sample_prob * q)
+
+        action_values = sign * self._baseline(node, gs)
+        action_values[idx] += (u - action_values[idx]) / q
+        node_value = float(np.dot(strategy, action_values))
+        self._update_baseline(node, gs, idx, sign * u)
+
+        if team == updating_team:
+            self._accumulate_regret(node, (reach_other / sample_prob) * (action_values - node_value))
+        return node_value
+
+    # ── Iterative traversal ──
+
+    def _frame(self, depth: int) -> _TraversalFrame:
+        """Preallocated stack frame for `depth`, growing the stack if needed."""
+        if depth == len(self._frames):
+            self._frames.append(_TraversalFrame())
+        return self._frames[depth]
+
+    def cfr_iterate_iterative(self, gs: GameState, updating_team: int) -> float:
+        """
+        External-sampling traversal with an explicit stack (no recursion).
+
+        Visits nodes, draws samples and applies regret updates in exactly
+        the order of cfr_iterate, so the two produce identical results;
+        this one avoids a Python frame per tree level and reuses
+        preallocated stack frames across traversals.
+
+        Returns the expected utility for TEAM 0 from `gs`.
+        """
+        state = self._begin_traversal(gs)
+        depth = 0
+        while True:
+            # ── Descend until a value is known ──
+            value = self._leaf_value(state)
+            if value is None:
+                player, actions, node = self._decision_node(state)
+                team = player % 2
+                strategy = node.current_strategy(self._strategy_weight())
+
+                if team != updating_team:
+                    # OPPONENT: the node's value is its sampled child's value
+                    idx = self._sample(strategy)
+                    state = self._child(state, actions[idx])
+                    continue
+
+                pruned = self._pruned_actions(node, strategy)
+                if state.phase == Phase.TRUMP_SELECTION:
+                    value = self._finish_external(node, strategy, team,
+                                                  self._trump_values(state, pruned, strategy),
+                                                  pruned)
+                else:
+                    frame = self._frame(depth)
+                    depth += 1
+                    frame.push(state, actions, node, strategy, team, pruned)
+                    state = self._child(state, actions[frame.next_action()])
+                    continue
+
+            # ── Ascend: hand the value to parents until one has children left ──
+            while depth > 0:
+                frame = self._frames[depth - 1]
+                frame.values[frame.i] = value
+                i = frame.next_action()
+                if i < frame.n:
+                    state = self._child(frame.state, frame.actions[i])
+                    break
+                value = self._finish_external(frame.node, frame.strategy, frame.team,
+                                              frame.values, frame.pruned)
+                frame.state = None
+                depth -= 1
+            else:
+                return value
+
+    def cfr_iterate_outcome_iterative(self, gs: GameState, updating_team: int) -> tuple[float, float]:
+        """
+        Outcome-sampling traversal with an explicit stack (no recursion).
+
+        Samples the single path down to a leaf, then walks the recorded
+        frames back up applying the same updates, in the same order, as
+        cfr_iterate_outcome.
+
+        Returns (sampled utility for updating_team / sample probability,
+        tail reach probability from `gs`).
+        """
+        state = self._begin_traversal(gs)
+        reach_self = reach_other = sample_prob = 1.0
+        depth = 0
+        while True:
+            value = self._leaf_value(state)
+            if value is not None:
+                break
+            player, actions, node = self._decision_node(state)
+            team = player % 2
+            frame = self._frame(depth)
+            depth += 1
+
+            if team != updating_team:
+                strategy = node.current_strategy(0.0)
+                idx = self._sample(strategy)
+                frame.push_sample(node, strategy, idx, False, reach_other)
+                p = float(strategy[idx])
+                reach_other *= p
+                sample_prob *= p
+            else:
+                strategy = node.current_strategy(self._strategy_weight() * reach_self / sample_prob)
+                idx, q = self._sample_explore(strategy)
+                frame.push_sample(node, strategy, idx, True, reach_other)
+                reach_self *= strategy[idx]
+                sample_prob *= q
+            state = self._child(state, actions[idx])
+
+        sign = 1.0 if updating_team == 0 else -1.0
+        u, tail = sign * value / sample_prob, 1.0
+        while depth > 0:
+            depth -= 1
+            frame = self._frames[depth]
+            if frame.updating:
+                self._outcome_regret(frame.node, frame.strategy, frame.i, u, tail, frame.reach_other)
+            tail *= frame.strategy[frame.i]
+        return u, tail
+
+    def _evaluate_leaf_batch(self, states: list[GameState],
+                             weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """Team-0 values for a batch of play-phase states (weights: leaf_importance)."""
+        if self.leaf_batch_evaluator is not None:
+            return np.asarray(self.leaf_batch_evaluator(states), dtype=np.float64)
+        if self.play_rollouts > 0:
+            return evaluate_play_random_batch(states, self.play_rollouts, weights, self.rollout_se,
+                                              self.rollout_batch, self.rollout_stats,
+                                              self.play_policy, self._playout_utility())
+        return evaluate_play_heuristic_batch(states)
+
+    def cfr_iterate_batched(self, gs: GameState, updating_team: int) -> float:
+        """
+        External-sampling traversal with batched leaf evaluation.
+
+        Three passes over one deal:
+          1. Expand the bidding / trump tree exactly as cfr_iterate would
+             (same opponent sampling, same pruning), recording updating-team
+             nodes in post-order and collecting play leaves. Leaves reaching
+             the same contract are evaluated once.
+          2. Evaluate all collected leaves in one batched call.
+          3. Back values up in post-order and apply the regret updates.
+
+        Regret updates are applied after the whole traversal has been
+        expanded, so when one abstract node is reached twice in a
+        traversal both visits see the pre-traversal regrets (cfr_iterate
+        would let the second visit see the first visit's update).
+
+        Returns the expected utility for TEAM 0 from `gs`.
+        """
+        values: list[float] = []            # value slot per leaf / node
+        pending: dict[tuple, int] = {}      # contract key -> slot awaiting evaluation
+        pending_leaves: list[tuple[int, Optional[tuple]]] = []  # (slot, contract key)
+        pending_states: list[GameState] = []
+        pending_weights: list[float] = []   # leaf_importance (1 outside trump nodes)
+        post_order: list[tuple] = []        # (slot, node, strategy, team, child_slots, pruned)
+
+        def new_slot(value: float = 0.0) -> int:
+            values.append(value)
+            return len(values) - 1
+
+        def expand(gs: GameState | BidState) -> int:
+            # Auction states (BidState) are always decision nodes
+            if type(gs) is not BidState:
+                if is_terminal(gs):
+                    return new_slot(self._terminal_value(gs))
+
+                if gs.phase in (Phase.DISCARDING, Phase.PLAY):
+                    key = None
+                    if gs.phase == Phase.DISCARDING:
+                        key = self._contract_key(gs)
+                        if key is not None:
+                            if key in pending:
+                                return pending[key]
+                            if self.leaf_cache is not None:
+                                cached = self.leaf_cache.get(key)
+                                if cached is not None:
+                                    return new_slot(self._leaf_utility(cached))
+                        gs = apply_action(gs, heuristic_discard(gs))
+                    slot = new_slot()
+                    if key is not None:
+                        pending[key] = slot
+                    pending_leaves.append((slot, key))
+                    pending_states.append(gs)
+                    pending_weights.append(1.0)
+                    return slot
+
+            player, actions, node = self._decision_node(gs)
+            team = player % 2
+            strategy = node.current_strategy(self._strategy_weight())
+
+            if team != updating_team:
+                idx = self._sample(strategy)
+                return expand(self._child(gs, actions[idx]))
+
+            pruned = self._pruned_actions(node, strategy)
+            if gs.phase == Phase.TRUMP_SELECTION:
+                child_slots = expand_trump(gs, pruned, strategy)
+            else:
+                child_slots = [expand(self._child(gs, action))
+                               if pruned is None or not pruned[i] else new_slot(0.0)
+                               for i, action in enumerate(actions)]
+
+            slot = new_slot()
+            post_order.append((slot, node, strategy.copy(), team, child_slots, pruned))
+            return slot
+
+        def expand_trump(gs: GameState, pruned: Optional[np.ndarray],
+                         strategy: np.ndarray) -> list[int]:
+            # Heuristic leaves: all 12 values in one shared pass
+            if self.play_rollouts == 0 and self.leaf_batch_evaluator is None:
+                return [new_slot(v) for v in self._trump_values(gs, pruned)]
+            # Otherwise share the discards and queue the play states
+            discards, _ = trump_discards(gs)
+            weights = leaf_importance(strategy)
+            slots = []
+            for i, (trump, discard) in enumerate(zip(_TRUMP_ACTIONS, discards)):
+                if pruned is not None and pruned[i]:
+                    slots.append(new_slot(0.0))
+                    continue
+                child = apply_action(gs, trump)
+                key = self._contract_key(child)
+                if key is not None:
+                    if key in pending:
+                        slots.append(pending[key])
+                        continue
+                    if self.leaf_cache is not None:
+                        cached = self.leaf_cache.get(key)
+                        if cached is not None:
+                            slots.append(new_slot(self._leaf_utility(cached)))
+                            continue
+                slot = new_slot()
+                if key is not None:
+                    pending[key] = slot
+                pending_leaves.append((slot, key))
+                pending_states.append(apply_action(child, discard))
+                pending_weights.append(float(weights[i]))
+                slots.append(slot)
+            return slots
+
+        root = expand(self._begin_traversal(gs))
+
+        # ── Pass 2: one batched leaf evaluation ──
+        if pending_states:
+            leaf_values = self._evaluate_leaf_batch(pending_states, np.array(pending_weights))
+            for (slot, key), value in zip(pending_leaves, leaf_values):
+                values[slot] = self._leaf_utility(float(value))
+                if key is not None and self.leaf_cache is not None:
+                    self.leaf_cache.put(key, float(value))
+
+        # ── Pass 3: back up and update regrets ──
+        for slot, node, strategy, team, child_slots, pruned in post_order:
+            action_values = np.array([values[c] for c in child_slots])
+            values[slot] = self._finish_external(node, strategy, team, action_values, pruned)
+
+        return values[root]
+
+    def _traverse(self, gs: GameState, updating_team: int) -> None:
+        """One MCCFR traversal of `gs` with the configured sampling scheme."""
+        if self.sampling == "outcome":
+            if self._variance_reduced():
+                self.cfr_iterate_outcome_vr(gs, updating_team)
+            elif self.iterative:
+                self.cfr_iterate_outcome_iterative(gs, updating_team)
+            else:
+                self.cfr_iterate_outcome(gs, updating_team)
+        elif self.batch_leaves:
+            self.cfr_iterate_batched(gs, updating_team)
+        elif self.iterative:
+            self.cfr_iterate_iterative(gs, updating_team)
+        else:
+            self.cfr_iterate(gs, updating_team)
+
+    def _root_estimate(self, gs: GameState, updating_team: int) -> float:
+        """Team-0 value estimate a single traversal produces for `gs`."""
+        if self.sampling == "external":
+            if self.batch_leaves:
+                return self.cfr_iterate_batched(gs, updating_team)
+            if self.iterative:
+                return self.cfr_iterate_iterative(gs, updating_team)
+            return self.cfr_iterate(gs, updating_team)
+        sign = 1.0 if updating_team == 0 else -1.0
+        if self._variance_reduced():
+            return sign * self.cfr_iterate_outcome_vr(gs, updating_team)
+        u, tail = self.cfr_iterate_outcome(gs, updating_team)
+        return sign * u * tail
+
+    def _variance_probe(self) -> BidWhistCFR:
+        """
+        Frozen solver with the same settings for sampling_variance.
+
+        The probe reads this solver's node dict without copying it
+        (get_node hands out private views) and shares the evaluators, but
+        has its own per-traversal state and statistics and no leaf cache,
+        so repeated traversals redraw their rollouts. Instance attributes
+        that shadow methods (profiling wrappers bound to self) are left out.
+        """
+        cls = type(self)
+        probe = cls.__new__(cls)
+        probe.__dict__.update((k, v) for k, v in vars(self).items() if not hasattr(cls, k))
+        probe._frozen = True
+        probe._probe_views = {}
+        probe.profiler = None
+        probe.leaf_cache = None
+        probe._deal_id = None
+        probe._deal_work = None
+        probe._uniform = UniformBuffer()
+        probe._frames = [_TraversalFrame() for _ in range(8)]
+        probe.prune_stats = {"pruned": 0, "traversed": 0}
+        probe.rollout_stats = {"leaves": 0, "rollouts": 0, "budget": 0}
+        probe._log_disc_pos = list(self._log_disc_pos)
+        probe._log_disc_neg = list(self._log_disc_neg)
+        return probe
+
+    def sampling_variance(self, n_deals: int = 16, repeats: int = 8, seed: int = 7) -> float:
+        """
+        Mean variance of the root value estimate over repeated traversals
+        of the same deals, with the current strategy held fixed.
+
+        Deal-to-deal (chance) variance is excluded, so this isolates the
+        noise that sampling and rollouts add to the values feeding the
+        regrets -- the quantity baselines and control variates reduce.
+        Runs on a light frozen probe (_variance_probe); training state
+        and the RNG streams are left untouched.
+        """
+        probe = self._variance_probe()
+        saved = random.getstate(), np.random.get_state()
+        random.seed(seed)
+        np.random.seed(seed)
+
+        total = 0.0
+        for d in range(n_deals):
+            gs = deal_hand(dealer=d % 4)
+            for team in (0, 1):
+                rs = RunningStats()
+                for _ in range(repeats):
+                    rs.push(probe._root_estimate(gs, team))
+                total += rs.variance
+
+        random.setstate(saved[0])
+        np.random.set_state(saved[1])
+        return total / (2 * n_deals)
+
     def train(self, n_iterations: int, seed: int = 42,
-              progress_every: int = 100) -> dict:
+              progress_every: int = 100, eval_every: int = 0,
+              eval_deals: int = 100, eval_workers: int = 1,
+              monitor: Optional[ConvergenceMonitor] = None,
+              time_budget: Optional[float] = None) -> dict:
         """
-        Train for n_iterations using external-sampling MCCFR.
+        Train for n_iterations using external- or outcome-sampling MCCFR
+        (see `sampling` in the constructor).
 
         Each iteration deals a random hand and traverses for both teams
         (alternating the updating team).
+
+        eval_every > 0 measures the average strategy's exploitability
+        (best_response.exploitability) every eval_every iterations on a
+        fixed set of `eval_deals` deals, built once with `eval_workers`
+        processes; the curve is returned as stats["exploitability"].
+
+        While a profiling.Profiler is attached, every progress line also
+        writes a timing snapshot.
+
+        With `match_equity` set, every deal starts from a match score
+        drawn from the table's reach distribution.
+
+        n_iterations is an upper bound: training also stops when
+        `monitor` reports convergence or after `time_budget` seconds.
+        stats["stopped"] says which ("iterations", "converged" or
+        "time_budget"); stats["convergence"] holds the monitor's curve.
         """
+        if eval_every > 0 and self.match_equity is not None:
+            raise ValueError("eval_every measures raw points; it cannot be used with match_equity")
         random.seed(seed)
         np.random.seed(seed)
+        self._uniform.reset()
 
         t0 = time.time()
         stats = {"node_counts": []}
+        if self.track_variance:
+            stats["sampling_variance"] = []
+        eval_trees = None
+        if eval_every > 0:
+            from best_response import build_trees, exploitability, sample_deals
+            stats["exploitability"] = []
+        if monitor is not None:
+            monitor.start(self.nodes)
+        stopped = "iterations"
+        done = 0
+        cards = None
 
         for t in range(n_iterations):
-            gs = deal_hand(dealer=t % 4)
+            if not self.rotate_dealer or t % 4 == 0 or cards is None:
+                scores = (0, 0)
+                if self.match_equity is not None:
+                    scores = self.match_equity.sample_scores(np.random.random())
+                cards = deal_hand(dealer=t % 4, team_scores=scores)
+                self._deal_id = self.iterations
+                self._deal_work = {}
+            gs = cards if cards.dealer == t % 4 else with_dealer(cards, t % 4)
 
             # Update both teams each iteration
             for team in (0, 1):
-                self.cfr_iterate(gs, updating_team=team)
+                self._traverse(gs, updating_team=team)
 
             self.iterations += 1
+            done = t + 1
 
             if (t + 1) % progress_every == 0:
                 elapsed = time.time() - t0
                 rate = (t + 1) / elapsed
-                print(f"  [{t+1:6d}/{n_iterations}] "
-                      f"{len(self.nodes):6d} info sets | "
-                      f"{rate:.0f} iter/s | "
-                      f"{elapsed:.1f}s")
+                line = (f"  [{t+1:6d}/{n_iterations}] "
+                        f"{len(self.nodes):6d} info sets | "
+                        f"{rate:.0f} iter/s | "
+                        f"{elapsed:.1f}s")
+                if self.prune_threshold is not None:
+                    line += f" | {self.prune_stats['pruned']} pruned"
+                if self.leaf_cache is not None:
+                    line += f" | leaf hits {self.leaf_cache.hit_rate():.0%}"
+                if self.rollout_se is not None:
+                    line += f" | {self.rollouts_saved():.0%} rollouts saved"
+                if self.track_variance:
+                    variance = self.sampling_variance()
+                    stats["sampling_variance"].append(variance)
+                    line += f" | sample var {variance:.3f}"
+                if self.profiler is not None:
+                    self.profiler.snapshot(self.iterations, elapsed)
+                print(line)
                 stats["node_counts"].append(len(self.nodes))
 
+            if eval_every > 0 and (t + 1) % eval_every == 0:
+                if eval_trees is None:
+                    # Fixed deal set (independent of the training seed) so
+                    # curves from separate runs are comparable
+                    eval_trees = build_trees(sample_deals(eval_deals, seed=0), eval_workers)
+                result = exploitability(self.nodes, trees=eval_trees)
+                stats["exploitability"].append((self.iterations, result["exploitability"]))
+                print(f"  [{t+1:6d}/{n_iterations}] exploitability "
+                      f"{result['exploitability']:.3f} pts/hand "
+                      f"(gaps {result['gap'][0]:.3f} / {result['gap'][1]:.3f})")
+
+            if monitor is not None and (t + 1) % monitor.check_every == 0:
+                row = monitor.check(self.nodes, self.iterations, time.time() - t0)
+                if monitor.converged():
+                    print(f"  [{t+1:6d}/{n_iterations}] converged: "
+                          f"L1 {row['mean_l1']:.4f}, {row['moving_frac']:.1%} moving, "
+                          f"regret {row['regret_norm']:.4f}")
+                    stopped = "converged"
+                    break
+            if time_budget is not None and time.time() - t0 >= time_budget:
+                stopped = "time_budget"
+                break
+
         elapsed = time.time() - t0
-        print(f"\n  Done: {n_iterations} iterations, "
+        print(f"\n  Done: {done} iterations, "
               f"{len(self.nodes)} info sets, {elapsed:.1f}s")
+        self._deal_id = None
+        self._deal_work = None
+        if self.prune_threshold is not None:
+            stats["prune_stats"] = dict(self.prune_stats)
+        if self.leaf_cache is not None:
+            stats["leaf_cache"] = self.leaf_cache.stats()
+        if self.rollout_se is not None:
+            stats["rollout_stats"] = dict(self.rollout_stats, saved=self.rollouts_saved())
+        stats["stopped"] = stopped
+        if monitor is not None:
+            stats["convergence"] = monitor.curve
         return stats
 
     # ── Analysis methods ──────────────────────────────────────────────
 
-    def analyze_bidding(self):
+    def strategy_table(self) -> StrategyTable:
+        """Columnar view of the average strategy (see strategy_table.py)."""
+        return StrategyTable.from_nodes(self.nodes)
+
+    def analyze_bidding(self, table: Optional[StrategyTable] = None):
         """Analyze converged bidding strategies by abstract features."""
         print("\n" + "=" * 60)
         print("BIDDING STRATEGY ANALYSIS")
         print("=" * 60)
 
-        bid_nodes = {k: v for k, v in self.nodes.items() if k.startswith("B|")}
-        print(f"\n  Total bidding info sets: {len(bid_nodes)}")
+        bids = (table or self.strategy_table()).bid
+        print(f"\n  Total bidding info sets: {len(bids)}")
 
-        if not bid_nodes:
+        if not len(bids):
             return
 
         # Group by seat position
         for seat in range(4):
-            seat_nodes = {k: v for k, v in bid_nodes.items() if f"|s{seat}|" in k}
-            if not seat_nodes:
+            seat_rows = bids.select(bids.seat == seat)
+            if not len(seat_rows):
                 continue
 
             seat_label = ["1st bidder", "2nd bidder", "3rd bidder (hot seat)", "Dealer"][seat]
-            print(f"\n  --- {seat_label} ({len(seat_nodes)} info sets) ---")
-
-            # Find most-visited nodes for this seat
-            sorted_nodes = sorted(seat_nodes.items(),
-                                  key=lambda x: x[1].visit_count,
-                                  reverse=True)
-
-            for key, node in sorted_nodes[:8]:
-                if node.visit_count < 3:
-                    continue
-                avg = node.get_average_strategy()
-
-                # Parse key: B|s0|d0|a1ka2dt1ms0hl1|hb0pb0
-                parts = key.split("|")
-                hand_feat = parts[3] if len(parts) > 3 else "?"  # hand features
-                hb = int(key.split("hb")[1].split("pb")[0])
-                pb = int(key.split("pb")[1]) if "pb" in key else 0
-                is_dealer = "d1" in parts[2] if len(parts) > 2 else False
-
-                action_labels = ["Pass"]
-                for b in range(max(1, hb + 1), 7):
-                    action_labels.append(f"Bid {b}")
-                if is_dealer and hb > 0:
-                    action_labels.append("Take")
-
-                top_actions = [(action_labels[i] if i < len(action_labels) else f"a{i}", avg[i])
-                               for i in range(len(avg)) if avg[i] > 0.01]
-                top_actions.sort(key=lambda x: -x[1])
-
-                top_str = ", ".join(f"{name}:{prob:.0%}" for name, prob in top_actions[:4])
-                context = f"hb={hb}"
-                if pb > 0:
-                    context += f",pb={pb}"
-                print(f"    {hand_feat:28s} ({context}, n={node.visit_count:3d}) => {top_str}")
-
-    def analyze_trump(self):
+            print(f"\n  --- {seat_label} ({len(seat_rows)} info sets) ---")
+
+            # Most-visited info sets for this seat
+            top = seat_rows.top(8)
+            top = top.select(top.visits >= 3)
+            for i in range(len(top)):
+                probs = top.probs[i]
+                actions = [(BID_COLUMNS[j], probs[j]) for j in np.flatnonzero(probs > 0.01)]
+                actions.sort(key=lambda x: -x[1])
+
+                top_str = ", ".join(f"{name}:{prob:.0%}" for name, prob in actions[:4])
+                context = f"hb={top.high_bid[i]}"
+                if top.partner_bid[i] > 0:
+                    context += f",pb={top.partner_bid[i]}"
+                print(f"    {top.hand_labels[top.hand[i]]:28s} "
+                      f"({context}, n={top.visits[i]:3d}) => {top_str}")
+
+    def analyze_trump(self, table: Optional[StrategyTable] = None):
         """Analyze converged trump selection strategies."""
         print("\n" + "=" * 60)
         print("TRUMP SELECTION ANALYSIS")
         print("=" * 60)
 
-        trump_nodes = {k: v for k, v in self.nodes.items() if k.startswith("T|")}
-        print(f"\n  Total trump info sets: {len(trump_nodes)}")
+        trumps = (table or self.strategy_table()).trump
+        print(f"\n  Total trump info sets: {len(trumps)}")
 
-        if not trump_nodes:
+        if not len(trumps):
             return
 
-        # All trump actions (fixed order)
-        trump_actions = legal_trump_actions()
-        action_labels = [repr(a.trump) for a in trump_actions]
-
-        # Aggregate: what direction is preferred given partner bid?
-        dir_prefs = defaultdict(lambda: np.zeros(3))  # pb -> [uptown, downtown, noaces]
-        dir_counts = defaultdict(int)
-
-        for key, node in trump_nodes.items():
-            if node.visit_count < 2:
-                continue
-            avg = node.get_average_strategy()
-            pb = int(key.split("pb")[1].split("eb")[0])
-
-            # Sum probabilities by direction
-            for i, action in enumerate(trump_actions):
-                d = action.trump.direction
-                if d == Direction.UPTOWN:
-                    dir_prefs[pb][0] += avg[i]
-                elif d == Direction.DOWNTOWN:
-                    dir_prefs[pb][1] += avg[i]
-                else:
-                    dir_prefs[pb][2] += avg[i]
-            dir_counts[pb] += 1
+        # What direction is preferred given partner bid?
+        visited = trumps.select(trumps.visits >= 2)
+        pbs, counts, prefs = group_mean(visited.partner_bid, visited.direction_probs())
 
         print(f"\n  Direction preference by partner bid:")
         print(f"    {'PB':>4s}  {'N':>5s}  {'Uptown':>8s}  {'Downtown':>8s}  {'NoAces':>8s}")
-        for pb in sorted(dir_prefs):
-            n = dir_counts[pb]
-            if n > 0:
-                prefs = dir_prefs[pb] / n
-                print(f"    {pb:4d}  {n:5d}  {prefs[0]:8.1%}  {prefs[1]:8.1%}  {prefs[2]:8.1%}")
-
-        # Show most-visited trump nodes
-        sorted_nodes = sorted(trump_nodes.items(),
-                              key=lambda x: x[1].visit_count,
-                              reverse=True)
+        for pb, n, p in zip(pbs, counts, prefs):
+            print(f"    {pb:4d}  {n:5d}  {p[0]:8.1%}  {p[1]:8.1%}  {p[2]:8.1%}")
 
+        # Most-visited trump info sets
         print(f"\n  Top trump selection info sets:")
-        for key, node in sorted_nodes[:10]:
-            if node.visit_count < 3:
-                continue
-            avg = node.get_average_strategy()
-            features = key.split("|")[1]  # hand features
-            partner_info = key.split("|")[3]  # pb/eb
-
-            top = [(action_labels[i], avg[i])
-                   for i in range(len(avg)) if avg[i] > 0.02]
-            top.sort(key=lambda x: -x[1])
-            top_str = ", ".join(f"{name}:{prob:.0%}" for name, prob in top[:4])
-
-            print(f"    {features} {partner_info} (n={node.visit_count:3d}) => {top_str}")
-
-    def analyze_signal_optimality(self):
+        top = trumps.top(10)
+        top = top.select(top.visits >= 3)
+        for i in range(len(top)):
+            probs = top.probs[i]
+            actions = [(TRUMP_COLUMNS[j], probs[j]) for j in np.flatnonzero(probs > 0.02)]
+            actions.sort(key=lambda x: -x[1])
+            top_str = ", ".join(f"{name}:{prob:.0%}" for name, prob in actions[:4])
+            partner_info = f"pb{top.partner_bid[i]}eb{top.enemy_bid[i]}"
+
+            print(f"    {top.hand_labels[top.hand[i]]} {partner_info} "
+                  f"(n={top.visits[i]:3d}) => {top_str}")
+
+    def analyze_signal_optimality(self, table: Optional[StrategyTable] = None):
         """
         Key analysis: Is signal bidding (1/2/3) optimal?
 
@@ -614,52 +2216,118 @@ class BidWhistCFR:
         print("SIGNAL BID OPTIMALITY ANALYSIS")
         print("=" * 60)
 
-        bid_nodes = {k: v for k, v in self.nodes.items() if k.startswith("B|")}
+        bids = (table or self.strategy_table()).bid
 
         # Focus on early bidders (seat 0 and 1)
         for seat in range(2):
-            seat_nodes = {k: v for k, v in bid_nodes.items()
-                         if f"|s{seat}|d0|" in k and v.visit_count >= 5}
+            seat_rows = bids.select((bids.seat == seat) & (bids.dealer == 0)
+                                    & (bids.visits >= 5))
 
-            if not seat_nodes:
+            if not len(seat_rows):
                 print(f"\n  Seat {seat+1}: insufficient data")
                 continue
 
             print(f"\n  --- Seat {seat+1} early bidder ---")
 
-            # Group by hand feature pattern
-            signal_bid_pcts = defaultdict(lambda: np.zeros(7))  # feature -> [pass, b1, b2, b3, b4, b5, b6]
-            signal_counts = defaultdict(int)
+            # Only cases where signal bids are available (hb < 3), by hand pattern
+            signal_rows = seat_rows.select(seat_rows.high_bid <= 2)
+            hands, counts, means = group_mean(signal_rows.hand, signal_rows.probs)
 
-            for key, node in seat_nodes.items():
-                avg = node.get_average_strategy()
-                parts = key.split("|")
-                features = parts[3] if len(parts) > 3 else "?"
-                hb = int(key.split("hb")[1].split("pb")[0])
+            print(f"    {'Hand Features':30s} {'N':>4s}  {'Pass':>6s}  {'B1':>6s}  {'B2':>6s}  {'B3':>6s}  {'B4+':>6s}")
+            for g in np.argsort(-counts, kind="stable"):
+                probs = means[g]
+                b4plus = probs[4:TAKE_COLUMN].sum()
+                print(f"    {signal_rows.hand_labels[hands[g]]:30s} {counts[g]:4d}  "
+                      f"{probs[0]:6.1%}  {probs[1]:6.1%}  "
+                      f"{probs[2]:6.1%}  {probs[3]:6.1%}  {b4plus:6.1%}")
 
-                # Only look at cases where signal bids are available (hb < 3)
-                if hb > 2:
-                    continue
 
-                # Map strategy to bid amounts
-                bid_probs = np.zeros(7)  # pass, b1, b2, b3, b4, b5, b6
-                bid_probs[0] = avg[0]  # pass
-                for i in range(1, len(avg)):
-                    bid_amount = hb + i  # action i = bid (hb + i)
-                    if 1 <= bid_amount <= 6:
-                        bid_probs[bid_amount] = avg[i]
+# ── Update scheme comparison ─────────────────────────────────────────
 
-                signal_bid_pcts[features] += bid_probs
-                signal_counts[features] += 1
+def _strategy_movement(prev: dict[str, np.ndarray], nodes: dict[str, CFRNode]) -> float:
+    """Visit-weighted mean L1 change in average strategy since `prev`."""
+    total, weight = 0.0, 0
+    for key, avg in prev.items():
+        node = nodes.get(key)
+        if node is None:
+            continue
+        total += node.visit_count * float(np.abs(node.get_average_strategy() - avg).sum())
+        weight += node.visit_count
+    return total / weight if weight else 0.0
 
-            # Show signal bid preferences
-            print(f"    {'Hand Features':30s} {'N':>4s}  {'Pass':>6s}  {'B1':>6s}  {'B2':>6s}  {'B3':>6s}  {'B4+':>6s}")
-            for features in sorted(signal_counts, key=signal_counts.get, reverse=True):
-                n = signal_counts[features]
-                probs = signal_bid_pcts[features] / n
-                b4plus = probs[4:].sum()
-                print(f"    {features:30s} {n:4d}  {probs[0]:6.1%}  {probs[1]:6.1%}  "
-                      f"{probs[2]:6.1%}  {probs[3]:6.1%}  {b4plus:6.1%}")
+
+def compare_update_schemes(n_iterations: int, schemes: tuple[str, ...] = CFR_SCHEMES,
+                           checkpoints: int = 5, seed: int = 42,
+                           play_rollouts: int = 0) -> dict:
+    """
+    Train one solver per update scheme on the same deal sequence and
+    report how fast each one's average strategy settles down.
+
+    At every checkpoint we record the visit-weighted mean L1 change of
+    the average strategy since the previous checkpoint, plus CPU time.
+    A scheme that reaches a small movement in fewer iterations reaches
+    the same strategy quality in less time.
+
+    Returns {scheme: [(iterations, seconds, movement), ...]}.
+    """
+    chunk = max(1, n_iterations // checkpoints)
+    results: dict[str, list[tuple[int, float, float]]] = {}
+
+    for scheme in schemes:
+        solver = BidWhistCFR(play_rollouts=play_rollouts, scheme=scheme)
+        curve = []
+        elapsed = 0.0
+        prev: dict[str, np.ndarray] = {}
+        for c in range(checkpoints):
+            t0 = time.time()
+            # Same per-chunk seeds for every scheme -> identical deal sequences
+            solver.train(chunk, seed=seed + c, progress_every=chunk + 1)
+            elapsed += time.time() - t0
+            movement = _strategy_movement(prev, solver.nodes)
+            curve.append((solver.iterations, elapsed, movement))
+            prev = {k: n.get_average_strategy() for k, n in solver.nodes.items()}
+        results[scheme] = curve
+
+    print("\n" + "=" * 60)
+    print("UPDATE SCHEME CONVERGENCE")
+    print("=" * 60)
+    print(f"  {'Scheme':8s}  {'Iters':>7s}  {'Time':>7s}  {'L1 move':>8s}")
+    for scheme, curve in results.items():
+        for iters, secs, movement in curve[1:]:
+            print(f"  {scheme:8s}  {iters:7d}  {secs:6.1f}s  {movement:8.4f}")
+    return results
+
+
+# ── Traversal benchmark ──────────────────────────────────────────────
+
+def benchmark_traversals(n_iterations: int = 200, seed: int = 42,
+                         play_rollouts: int = 0) -> dict:
+    """
+    Time recursive vs explicit-stack traversals on the same deal sequence.
+
+    Both variants give identical updates, so the only difference is
+    interpreter overhead per tree level.
+
+    Returns {(sampling, "recursive" | "iterative"): iterations per second}.
+    """
+    results: dict[tuple[str, str], float] = {}
+    for sampling in SAMPLING_SCHEMES:
+        for iterative in (False, True):
+            solver = BidWhistCFR(play_rollouts=play_rollouts, sampling=sampling,
+                                 iterative=iterative)
+            t0 = time.time()
+            solver.train(n_iterations, seed=seed, progress_every=n_iterations + 1)
+            elapsed = time.time() - t0
+            label = "iterative" if iterative else "recursive"
+            results[(sampling, label)] = n_iterations / elapsed if elapsed > 0 else float("inf")
+
+    print("\n" + "=" * 60)
+    print("TRAVERSAL BENCHMARK")
+    print("=" * 60)
+    print(f"  {'Sampling':9s}  {'Traversal':10s}  {'iter/s':>8s}")
+    for (sampling, label), rate in results.items():
+        print(f"  {sampling:9s}  {label:10s}  {rate:8.1f}")
+    return results
 
 
 # ── Main ──────────────────────────────────────────────────────────────
@@ -667,23 +2335,28 @@ class BidWhistCFR:
 def main():
     n_iters = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
     rollouts = int(sys.argv[2]) if len(sys.argv) > 2 else 0  # 0 = heuristic (fast)
+    scheme = sys.argv[3] if len(sys.argv) > 3 else "vanilla"
+    sampling = sys.argv[4] if len(sys.argv) > 4 else "external"
 
     print("=" * 60)
     print("  BID WHIST CFR SOLVER")
     print("=" * 60)
     print(f"  Iterations:      {n_iters}")
     print(f"  Play rollouts:   {rollouts}")
+    print(f"  Update scheme:   {scheme}")
+    print(f"  Sampling:        {sampling}")
     print(f"  Phases solved:   Bidding + Trump Selection")
     print(f"  Play evaluator:  Random rollouts")
     print()
 
-    solver = BidWhistCFR(play_rollouts=rollouts)
+    solver = BidWhistCFR(play_rollouts=rollouts, scheme=scheme, sampling=sampling)
     solver.train(n_iterations=n_iters,
                  progress_every=max(1, n_iters // 10))
 
-    solver.analyze_bidding()
-    solver.analyze_trump()
-    solver.analyze_signal_optimality()
+    table = solver.strategy_table()
+    solver.analyze_bidding(table)
+    solver.analyze_trump(table)
+    solver.analyze_signal_optimality(table)
 
     # ── Example hand ──
     print("\n" + "=" * 60)
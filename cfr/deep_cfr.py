@@ -0,0 +1,469 @@
+"""
+Deep CFR (Brown et al. 2019) for the auction and trump selection.
+
+The tabular BidWhistCFR only stays small because abstract_bid_key and
+abstract_trump_key bin each hand into a few coarse features. Deep CFR
+replaces the regret table with function approximation, so info sets can
+be described by the raw cards instead:
+
+    bidding  own 12 cards (52 one-hot), hand counts, seat, dealer flag,
+             high bid, and the bid of each other seat so far
+    trump    declarer's 16 cards, hand counts, contract, other bids
+
+Each iteration runs external-sampling traversals for both teams (the
+same traversal as cfr_iterate: all actions at the traverser's nodes, one
+sampled action at the opponents', heuristic or rollout leaves):
+
+  * at traverser nodes the sampled instantaneous regrets go into the
+    phase's ADVANTAGE memory,
+  * at opponent nodes the current strategy goes into the phase's
+    STRATEGY memory,
+
+and the advantage networks are then retrained from scratch on their
+memories, weighting samples by iteration (Linear CFR). Strategies are
+regret matching on the predicted advantages (the best legal action when
+none is positive). At the end a strategy network per phase is distilled
+from the strategy memory; its output is the average strategy.
+
+Like the tabular keys, features are seat-relative, so both teams share
+one advantage and one strategy network per phase. Memories are
+fixed-size reservoir samples of every sample ever offered, held in
+NumPy (float16 features), so memory use is bounded by `capacity`
+whatever the info-set space.
+
+Action columns: bidding uses bid amounts (pass, bid 1-6, take), trump
+selection the legal_trump_actions() order. Networks are small MLPs
+trained on the CPU; traversal and memories only need NumPy, torch is
+imported when a network is trained or loaded.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+from game_state import (
+    BID_TAKE, Action, BidState, Card, GameState, Phase, legal_bid_amounts, legal_trump_actions,
+    acting_player,
+)
+from game_engine import deal_hand
+from cfr_solver import BidWhistCFR, compute_hand_features, sample_index
+
+PHASES = ("bid", "trump")
+N_ACTIONS = {"bid": 8, "trump": 12}
+TAKE_COLUMN = 7
+_TRUMP_ACTIONS = legal_trump_actions()
+
+_HAND_COUNTS = 10
+_BID_SLOTS = 9                     # per other seat: not yet, pass, bid 1-6, take
+N_FEATURES = {
+    "bid": 52 + _HAND_COUNTS + 4 + 1 + 7 + 3 * _BID_SLOTS,
+    "trump": 52 + _HAND_COUNTS + 6 + 3 * _BID_SLOTS,
+}
+
+
+def _torch():
+    try:
+        import torch
+    except ImportError as e:
+        raise ImportError("deep_cfr networks need torch (see requirements.txt)") from e
+    return torch
+
+
+# ── Features ──────────────────────────────────────────────────────────
+
+def _hand_block(x: np.ndarray, hand: list[Card]) -> int:
+    """Cards one-hot plus normalized counts at the start of x; returns the next offset."""
+    for card in hand:
+        x[card.suit * 13 + card.rank - 2] = 1.0
+    f = compute_hand_features(hand)
+    n = len(hand)
+    counts = sorted(f["suit_counts"], reverse=True)
+    x[52:52 + _HAND_COUNTS] = [f["aces"] / 4, f["kings"] / 4, f["deuce_trey"] / 8,
+                               f["high"] / n, f["low"] / n, f["max_suit"] / n,
+                               *(c / n for c in counts)]
+    return 52 + _HAND_COUNTS
+
+
+def _bids_block(x: np.ndarray, offset: int, player: int, bids) -> None:
+    """Bid of each other seat (left, partner, right), one-hot."""
+    made = {p: amount for p, amount in bids}
+    for rel in (1, 2, 3):
+        amount = made.get((player + rel) % 4)
+        if amount is None:
+            slot = 0
+        elif amount == BID_TAKE:
+            slot = 8
+        else:
+            slot = 1 + amount
+        x[offset + (rel - 1) * _BID_SLOTS + slot] = 1.0
+
+
+def bid_features(hand: list[Card], player: int, dealer: int, bid_count: int,
+                 high_bid: int, bids) -> np.ndarray:
+    x = np.zeros(N_FEATURES["bid"], dtype=np.float32)
+    off = _hand_block(x, hand)
+    x[off + bid_count] = 1.0
+    x[off + 4] = 1.0 if player == dealer else 0.0
+    x[off + 5 + high_bid] = 1.0
+    _bids_block(x, off + 12, player, bids)
+    return x
+
+
+def trump_features(hand: list[Card], player: int, high_bid: int, bids) -> np.ndarray:
+    x = np.zeros(N_FEATURES["trump"], dtype=np.float32)
+    off = _hand_block(x, hand)
+    x[off + high_bid - 1] = 1.0
+    _bids_block(x, off + 6, player, bids)
+    return x
+
+
+def bid_column(amount: int) -> int:
+    return TAKE_COLUMN if amount == BID_TAKE else amount
+
+
+def bid_amount(column: int) -> int:
+    return BID_TAKE if column == TAKE_COLUMN else column
+
+
+def regret_matching(advantages: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Strategy over legal columns; all mass on the best legal action if none is positive."""
+    positive = np.where(mask, np.maximum(advantages, 0.0), 0.0)
+    total = positive.sum()
+    if total > 0:
+        return positive / total
+    strategy = np.zeros(len(mask))
+    strategy[np.flatnonzero(mask)[np.argmax(advantages[mask])]] = 1.0
+    return strategy
+
+
+# ── Reservoir memory ──────────────────────────────────────────────────
+
+class ReservoirBuffer:
+    """
+    Fixed-capacity uniform sample of every (features, target, mask,
+    iteration) row ever added (reservoir sampling, Vitter's algorithm R).
+    """
+
+    def __init__(self, capacity: int, n_features: int, n_actions: int, seed: int = 0):
+        self.capacity = capacity
+        self.features = np.zeros((capacity, n_features), dtype=np.float16)
+        self.targets = np.zeros((capacity, n_actions), dtype=np.float32)
+        self.masks = np.zeros((capacity, n_actions), dtype=bool)
+        self.iterations = np.zeros(capacity, dtype=np.int32)
+        self.size = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, features: np.ndarray, target: np.ndarray, mask: np.ndarray,
+            iteration: int) -> None:
+        if self.size < self.capacity:
+            i = self.size
+            self.size += 1
+        else:
+            i = int(self.rng.integers(self.seen + 1))
+            if i >= self.capacity:
+                self.seen += 1
+                return
+        self.seen += 1
+        self.features[i] = features
+        self.targets[i] = target
+        self.masks[i] = mask
+        self.iterations[i] = iteration
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the filled rows: (features, targets, masks, iterations)."""
+        n = self.size
+        return self.features[:n], self.targets[:n], self.masks[:n], self.iterations[:n]
+
+    @property
+    def nbytes(self) -> int:
+        return (self.features.nbytes + self.targets.nbytes
+                + self.masks.nbytes + self.iterations.nbytes)
+
+    def save(self, path: str) -> None:
+        f, y, m, it = self.arrays()
+        np.savez_compressed(path, features=f, targets=y, masks=m, iterations=it,
+                            seen=np.array(self.seen), capacity=np.array(self.capacity))
+
+    @classmethod
+    def load(cls, path: str, seed: int = 0) -> ReservoirBuffer:
+        with np.load(path) as data:
+            buf = cls(int(data["capacity"]), data["features"].shape[1],
+                      data["targets"].shape[1], seed)
+            n = len(data["features"])
+            buf.features[:n] = data["features"]
+            buf.targets[:n] = data["targets"]
+            buf.masks[:n] = data["masks"]
+            buf.iterations[:n] = data["iterations"]
+            buf.size, buf.seen = n, int(data["seen"])
+        return buf
+
+
+# ── Networks ──────────────────────────────────────────────────────────
+
+def build_net(n_features: int, n_actions: int, hidden: tuple[int, ...] = (128, 128)):
+    torch = _torch()
+    layers, width = [], n_features
+    for h in hidden:
+        layers += [torch.nn.Linear(width, h), torch.nn.ReLU()]
+        width = h
+    layers.append(torch.nn.Linear(width, n_actions))
+    return torch.nn.Sequential(*layers)
+
+
+def _fit(buffer: ReservoirBuffer, hidden: tuple[int, ...], steps: int, batch_size: int,
+         lr: float, policy: bool, seed: int):
+    """
+    Train a fresh network on a memory, each row weighted by its iteration.
+    Advantage nets regress the legal regrets (MSE); policy nets fit the
+    stored strategies with a masked softmax (cross-entropy).
+    """
+    torch = _torch()
+    torch.manual_seed(seed)
+    features, targets, masks, iterations = buffer.arrays()
+    net = build_net(features.shape[1], targets.shape[1], hidden)
+    if len(features) == 0:
+        return net.eval(), 0.0
+    x = torch.from_numpy(features.astype(np.float32))
+    y = torch.from_numpy(targets)
+    m = torch.from_numpy(masks)
+    w = torch.from_numpy(iterations.astype(np.float32))
+    w = w / w.mean()
+    optimizer = torch.optim.Adam(net.parameters(), lr=lr)
+    gen = torch.Generator().manual_seed(seed)
+
+    loss_value = 0.0
+    for _ in range(steps):
+        idx = torch.randint(len(x), (min(batch_size, len(x)),), generator=gen)
+        out = net(x[idx])
+        if policy:
+            logits = out.masked_fill(~m[idx], -1e9)
+            per_row = -(y[idx] * torch.log_softmax(logits, dim=1)).sum(dim=1)
+        else:
+            per_row = (((out - y[idx]) ** 2) * m[idx]).sum(dim=1)
+        loss = (w[idx] * per_row).mean()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        loss_value = loss.item()
+    return net.eval(), loss_value
+
+
+def _forward(net, x: np.ndarray) -> np.ndarray:
+    torch = _torch()
+    with torch.inference_mode():
+        return net(torch.from_numpy(x[None, :])).double().numpy()[0]
+
+
+# ── Deep CFR ──────────────────────────────────────────────────────────
+
+class DeepCFR:
+    """
+    Deep CFR over bidding + trump selection.
+
+    `game` provides the leaves: its _leaf_value / _trump_values are used
+    exactly as in the tabular traversal (play_rollouts=0 means heuristic
+    leaves). `capacity` is the reservoir size of each of the four
+    memories. Every iteration runs `traversals` traversals per team, then
+    retrains each advantage network for `train_steps` minibatches.
+    """
+
+    def __init__(self, play_rollouts: int = 0, capacity: int = 200_000,
+                 hidden: tuple[int, ...] = (128, 128), traversals: int = 100,
+                 train_steps: int = 300, policy_steps: int = 1000, batch_size: int = 512,
+                 lr: float = 1e-3, seed: int = 0,
+                 game: Optional[BidWhistCFR] = None):
+        self.game = game if game is not None else BidWhistCFR(play_rollouts=play_rollouts)
+        self.hidden = tuple(hidden)
+        self.traversals = traversals
+        self.train_steps = train_steps
+        self.policy_steps = policy_steps
+        self.batch_size = batch_size
+        self.lr = lr
+        self.seed = seed
+        self.advantage_memory = {p: ReservoirBuffer(capacity, N_FEATURES[p], N_ACTIONS[p], seed + i)
+                                 for i, p in enumerate(PHASES)}
+        self.strategy_memory = {p: ReservoirBuffer(capacity, N_FEATURES[p], N_ACTIONS[p], seed + 2 + i)
+                                for i, p in enumerate(PHASES)}
+        self.advantage_nets: dict[str, object] = {}   # phase -> net, empty until trained
+        self.policy_nets: dict[str, object] = {}
+        self.iterations = 0
+        self.rng = np.random.default_rng(seed)
+
+    # ── Info sets ──
+
+    def info_set(self, state: GameState | BidState) -> tuple[int, str, np.ndarray, np.ndarray]:
+        """(player, phase, features, legal column mask) at a decision state."""
+        if type(state) is BidState or state.phase == Phase.BIDDING:
+            if type(state) is BidState:
+                player, hand = state.current_bidder, self.game._bid_root.hands[state.current_bidder]
+                amounts = legal_bid_amounts(state)
+            else:
+                player, hand = state.current_bidder, state.hands[state.current_bidder]
+                amounts = legal_bid_amounts(BidState.from_game_state(state))
+            x = bid_features(hand, player, state.dealer, state.bid_count,
+                             state.high_bid, state.bids)
+            mask = np.zeros(N_ACTIONS["bid"], dtype=bool)
+            mask[[bid_column(a) for a in amounts]] = True
+            return player, "bid", x, mask
+        player = acting_player(state)
+        x = trump_features(state.hands[player], player, state.high_bid, state.bids)
+        return player, "trump", x, np.ones(N_ACTIONS["trump"], dtype=bool)
+
+    def current_strategy(self, phase: str, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Regret matching on the advantage net (uniform before the first fit)."""
+        net = self.advantage_nets.get(phase)
+        if net is None:
+            return mask / mask.sum()
+        return regret_matching(_forward(net, x), mask)
+
+    def average_strategy(self, phase: str, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Masked softmax of the distilled policy net."""
+        net = self.policy_nets.get(phase)
+        if net is None:
+            raise RuntimeError("policy networks are trained at the end of train()")
+        logits = np.where(mask, _forward(net, x), -np.inf)
+        probs = np.exp(logits - logits.max())
+        return probs / probs.sum()
+
+    def strategy(self, gs: GameState, average: bool = True) -> tuple[list, np.ndarray]:
+        """(actions, probabilities) at a BIDDING or TRUMP_SELECTION GameState."""
+        _, phase, x, mask = self.info_set(gs)
+        probs = (self.average_strategy if average else self.current_strategy)(phase, x, mask)
+        cols = np.flatnonzero(mask)
+        if phase == "bid":
+            actions = [Action(bid=bid_amount(c)) for c in cols]
+        else:
+            actions = [_TRUMP_ACTIONS[c] for c in cols]
+        return actions, probs[cols]
+
+    # ── Traversal ──
+
+    def _child(self, state: GameState | BidState, phase: str, column: int):
+        action = bid_amount(column) if phase == "bid" else _TRUMP_ACTIONS[column]
+        if type(state) is not BidState and phase == "bid":
+            action = Action(bid=action)
+        return self.game._child(state, action)
+
+    def traverse(self, gs: GameState, team: int) -> float:
+        """One external-sampling traversal of a fresh deal for `team`."""
+        return self._traverse(self.game._begin_traversal(gs), team)
+
+    def _traverse(self, state: GameState | BidState, team: int) -> float:
+        value = self.game._leaf_value(state)
+        if value is not None:
+            return value
+
+        player, phase, x, mask = self.info_set(state)
+        strategy = self.current_strategy(phase, x, mask)
+        t = self.iterations + 1
+
+        if player % 2 != team:
+            self.strategy_memory[phase].add(x, strategy, mask, t)
+            column = sample_index(strategy, self.rng.random())
+            return self._traverse(self._child(state, phase, column), team)
+
+        if phase == "trump":
+            values = self.game._trump_values(state)
+        else:
+            values = np.zeros(N_ACTIONS[phase])
+            for column in np.flatnonzero(mask):
+                values[column] = self._traverse(self._child(state, phase, column), team)
+        node_value = float(np.dot(strategy, values))
+        sign = 1.0 if team == 0 else -1.0
+        self.advantage_memory[phase].add(x, sign * (values - node_value) * mask, mask, t)
+        return node_value
+
+    # ── Training ──
+
+    def train(self, n_iterations: int, seed: int = 42, verbose: bool = True) -> dict:
+        """
+        n_iterations rounds of traversals + advantage refits, then the
+        policy distillation. Returns per-iteration losses, memory sizes
+        and timings.
+        """
+        random.seed(seed)
+        t0 = time.time()
+        stats = {"advantage_loss": [], "memory": []}
+        for _ in range(n_iterations):
+            for team in (0, 1):
+                for _ in range(self.traversals):
+                    self.traverse(deal_hand(dealer=random.randrange(4)), team)
+            self.iterations += 1
+            losses = {}
+            for phase in PHASES:
+                self.advantage_nets[phase], losses[phase] = _fit(
+                    self.advantage_memory[phase], self.hidden, self.train_steps,
+                    self.batch_size, self.lr, policy=False, seed=self.seed + self.iterations)
+            stats["advantage_loss"].append(losses)
+            stats["memory"].append({p: len(self.advantage_memory[p]) for p in PHASES})
+            if verbose:
+                print(f"  [{self.iterations:4d}] advantage loss "
+                      + " ".join(f"{p} {losses[p]:.3f}" for p in PHASES)
+                      + f" | memory {sum(len(m) for m in self.advantage_memory.values())}"
+                      + f" | {time.time() - t0:.1f}s")
+
+        stats["policy_loss"] = self.fit_policy()
+        stats["seconds"] = time.time() - t0
+        if verbose:
+            print(f"  policy loss " + " ".join(f"{p} {v:.3f}" for p, v in stats["policy_loss"].items()))
+        return stats
+
+    def fit_policy(self) -> dict[str, float]:
+        """Distill the average strategy from the strategy memories."""
+        losses = {}
+        for phase in PHASES:
+            self.policy_nets[phase], losses[phase] = _fit(
+                self.strategy_memory[phase], self.hidden, self.policy_steps,
+                self.batch_size, self.lr, policy=True, seed=self.seed)
+        return losses
+
+    def memory_bytes(self) -> int:
+        return sum(m.nbytes for m in (*self.advantage_memory.values(),
+                                      *self.strategy_memory.values()))
+
+    # ── Persistence ──
+
+    def save_policy(self, path: str) -> None:
+        """Write the distilled policy networks."""
+        torch = _torch()
+        torch.save({"hidden": list(self.hidden),
+                    "policy": {p: net.state_dict() for p, net in self.policy_nets.items()}}, path)
+
+    def load_policy(self, path: str) -> None:
+        torch = _torch()
+        data = torch.load(path, map_location="cpu")
+        self.hidden = tuple(data["hidden"])
+        for phase, state_dict in data["policy"].items():
+            net = build_net(N_FEATURES[phase], N_ACTIONS[phase], self.hidden)
+            net.load_state_dict(state_dict)
+            self.policy_nets[phase] = net.eval()
+
+
+# ── Main ──────────────────────────────────────────────────────────────
+
+def main():
+    n_iters = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    traversals = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    path = sys.argv[3] if len(sys.argv) > 3 else "deep_cfr_policy.pt"
+
+    print("=" * 60)
+    print("  BID WHIST DEEP CFR")
+    print("=" * 60)
+    solver = DeepCFR(traversals=traversals)
+    solver.train(n_iters)
+    print(f"  Memories: {solver.memory_bytes() / 1e6:.1f} MB")
+    solver.save_policy(path)
+    print(f"  Policy written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,11 @@ Design principles:
 from __future__ import annotations
 
 import random
+from typing import Callable
+
 from game_state import (
     Card, Suit, Rank, Direction, Phase,
-    GameState, Action, TrumpChoice,
+    GameState, Action, TrumpChoice, BidState,
     BID_PASS, BID_TAKE,
     card_strength, make_deck,
     legal_actions, acting_player,
@@ -68,6 +70,36 @@ def deal_hand(dealer: int = 0, deck: list[Card] | None = None,
     return gs
 
 
+def with_dealer(gs: GameState, dealer: int) -> GameState:
+    """The same cards as a fresh BIDDING state with another dealer."""
+    return GameState(
+        hands=[list(h) for h in gs.hands],
+        kitty=list(gs.kitty),
+        dealer=dealer,
+        phase=Phase.BIDDING,
+        team_scores=gs.team_scores,
+    )
+
+
+def rotate_seats(gs: GameState, k: int) -> GameState:
+    """
+    A fresh deal moved k seats clockwise: player p's hand goes to player
+    p + k, and so does the deal. The rotated hand is the same game with
+    relabeled seats (and, for odd k, swapped teams).
+    """
+    hands: list[list[Card]] = [[], [], [], []]
+    for p in range(4):
+        hands[(p + k) % 4] = list(gs.hands[p])
+    scores = gs.team_scores if k % 2 == 0 else gs.team_scores[::-1]
+    return GameState(
+        hands=hands,
+        kitty=list(gs.kitty),
+        dealer=(gs.dealer + k) % 4,
+        phase=Phase.BIDDING,
+        team_scores=scores,
+    )
+
+
 # ── Apply action ──────────────────────────────────────────────────────
 
 def apply_action(gs: GameState, action: Action) -> GameState:
@@ -122,19 +154,60 @@ def _apply_bid(gs: GameState, action: Action) -> None:
 
     # Check if bidding is complete (all 4 have bid)
     if gs.bid_count >= 4:
-        if gs.high_bidder is not None:
-            # Someone won the bid
-            gs.declarer = gs.high_bidder
-            gs.phase = Phase.TRUMP_SELECTION
-            gs.current_player = gs.declarer
-
-            # Give kitty to declarer
-            gs.hands[gs.declarer].extend(gs.kitty)
-            gs.hands[gs.declarer].sort()
-        else:
-            # Everyone passed → redeal
-            # We signal this by moving to SCORING with special state
-            gs.phase = Phase.DEAL  # signals need to redeal
+        _finish_bidding(gs)
+
+
+def _finish_bidding(gs: GameState) -> None:
+    """Close a completed auction: declarer takes the kitty, or redeal (mutates gs)."""
+    if gs.high_bidder is not None:
+        # Someone won the bid
+        gs.declarer = gs.high_bidder
+        gs.phase = Phase.TRUMP_SELECTION
+        gs.current_player = gs.declarer
+
+        # Give kitty to declarer
+        gs.hands[gs.declarer].extend(gs.kitty)
+        gs.hands[gs.declarer].sort()
+    else:
+        # Everyone passed → redeal
+        # We signal this by moving to SCORING with special state
+        gs.phase = Phase.DEAL  # signals need to redeal
+
+
+# ── Lightweight bidding ───────────────────────────────────────────────
+
+def apply_bid(bs: BidState, amount: int) -> BidState:
+    """
+    Apply a bid to a BidState (same rules as _apply_bid, no hand copies).
+
+    The caller is expected to pass an amount from legal_bid_amounts(bs).
+    """
+    player = bs.current_bidder
+    high_bid, high_bidder = bs.high_bid, bs.high_bidder
+    if amount == BID_TAKE:
+        high_bidder = player            # high_bid stays the same
+    elif amount != BID_PASS:
+        high_bid, high_bidder = amount, player
+    return BidState(bs.dealer, (player + 1) % 4, bs.bid_count + 1,
+                    high_bid, high_bidder, bs.bids + ((player, amount),))
+
+
+def complete_auction(root: GameState, bs: BidState) -> GameState:
+    """
+    Full GameState for a finished auction `bs` played from `root`.
+
+    `root` is the BIDDING state the auction started from; the result is
+    identical to applying the same bids to it with apply_action.
+    """
+    assert bs.bid_count >= 4, "Auction not finished"
+    gs = root.copy()
+    gs.bids = list(bs.bids)
+    gs.current_bidder = bs.current_bidder
+    gs.bid_count = bs.bid_count
+    gs.high_bid = bs.high_bid
+    gs.high_bidder = None if bs.high_bidder < 0 else bs.high_bidder
+    _finish_bidding(gs)
+    return gs
 
 
 # ── Trump selection ───────────────────────────────────────────────────
@@ -360,9 +433,39 @@ def needs_redeal(gs: GameState) -> bool:
 
 # ── Full random rollout ──────────────────────────────────────────────
 
+def play_out(gs: GameState, play_policy: Callable[[GameState], Action] | None = None,
+             rng: random.Random | None = None) -> GameState:
+    """
+    Finish the play phase of `gs` and return the terminal state.
+
+    Every card is chosen by `play_policy` (GameState -> Action, e.g.
+    playout_policy.heuristic_play), or uniformly at random from the
+    legal plays with `rng` (default: the random module). This is the one
+    playout shared by the rollout evaluators and the table / dataset
+    builders, so a policy reaches all of them.
+
+    With an `rng`, a policy that has a with_rng method (HeuristicPlayout)
+    is bound to it, so seeded builds stay reproducible; other policies
+    must be deterministic or seed themselves.
+    """
+    choice = random.choice if rng is None else rng.choice
+    if rng is not None and play_policy is not None and hasattr(play_policy, "with_rng"):
+        play_policy = play_policy.with_rng(rng)
+    while not is_terminal(gs):
+        if play_policy is not None:
+            gs = apply_action(gs, play_policy(gs))
+            continue
+        actions = legal_play_actions(gs, acting_player(gs))
+        if not actions:
+            break
+        gs = apply_action(gs, choice(actions))
+    return gs
+
+
 def random_rollout(dealer: int = 0, deck: list[Card] | None = None,
                    team_scores: tuple[int, int] = (0, 0),
-                   max_redeals: int = 10) -> GameState:
+                   max_redeals: int = 10,
+                   play_policy: Callable[[GameState], Action] | None = None) -> GameState:
     """
     Play one complete hand with all players choosing uniformly at random
     from legal actions.
@@ -372,6 +475,9 @@ def random_rollout(dealer: int = 0, deck: list[Card] | None = None,
 
     For the discard phase, we use a random subset selection instead of
     enumerating all C(16,4) options (too expensive for random play).
+
+    `play_policy` (GameState -> Action, e.g. playout_policy.heuristic_play)
+    chooses the cards in the play phase instead.
     """
     for _ in range(max_redeals + 1):
         gs = deal_hand(dealer=dealer, deck=deck, team_scores=team_scores)
@@ -385,6 +491,8 @@ def random_rollout(dealer: int = 0, deck: list[Card] | None = None,
                 hand = gs.hands[gs.declarer]
                 discard_cards = frozenset(random.sample(hand, 4))
                 action = Action(discard=discard_cards)
+            elif gs.phase == Phase.PLAY and play_policy is not None:
+                action = play_policy(gs)
             else:
                 actions = legal_actions(gs)
                 assert len(actions) > 0, f"No legal actions in phase {gs.phase} for player {player}"
@@ -14,7 +14,7 @@ from __future__ import annotations
 import copy
 from dataclasses import dataclass, field
 from enum import IntEnum, Enum
-from typing import Optional
+from typing import NamedTuple, Optional
 
 # ── Cards ─────────────────────────────────────────────────────────────
 
@@ -378,6 +378,46 @@ def legal_bid_actions(gs: GameState) -> list[Action]:
     return actions
 
 
+class BidState(NamedTuple):
+    """
+    Compact, immutable auction-only state.
+
+    During bidding only the auction fields change, so tree search can
+    carry this tuple instead of copying a full GameState (four hands,
+    kitty, history lists) per bid. The full state is rebuilt once the
+    auction ends (see game_engine.complete_auction).
+    """
+    dealer: int
+    current_bidder: int
+    bid_count: int
+    high_bid: int
+    high_bidder: int                    # -1 = no bid yet
+    bids: tuple[tuple[int, int], ...]   # (player_id, amount)
+
+    phase = Phase.BIDDING               # class attribute, not a field
+
+    @staticmethod
+    def from_game_state(gs: GameState) -> BidState:
+        assert gs.phase == Phase.BIDDING
+        return BidState(
+            dealer=gs.dealer,
+            current_bidder=gs.current_bidder,
+            bid_count=gs.bid_count,
+            high_bid=gs.high_bid,
+            high_bidder=-1 if gs.high_bidder is None else gs.high_bidder,
+            bids=tuple(gs.bids),
+        )
+
+
+def legal_bid_amounts(bs: BidState) -> list[int]:
+    """Bid amounts in the same order as legal_bid_actions()."""
+    amounts = [BID_PASS]
+    amounts.extend(range(bs.high_bid + 1, 7))
+    if bs.current_bidder == bs.dealer and bs.high_bid > 0:
+        amounts.append(BID_TAKE)
+    return amounts
+
+
 def legal_trump_actions() -> list[Action]:
     """All 12 possible trump choices: 4 suits x 3 directions."""
     actions = []
@@ -412,6 +452,68 @@ def legal_play_actions(gs: GameState, player: int) -> list[Action]:
         return [Action(card=c) for c in hand]
 
 
+# ── Card equivalence ──────────────────────────────────────────────────
+
+# Ranks from strongest to weakest, per direction
+_RANK_ORDER = {d: sorted(range(2, 15), key=lambda r: -card_strength(Card(Suit.CLUBS, r), None, d)[1])
+               for d in Direction}
+
+
+def play_equivalence_classes(gs: GameState, player: int) -> list[list[Card]]:
+    """
+    The player's legal cards grouped into strategically identical classes.
+
+    Two cards of the same suit are equivalent when every card ranked
+    between them (in the current direction) is out of play: played in a
+    completed trick or discarded. Cards in the current trick still
+    separate sequences, since the trick's winner depends on them (with JC
+    led, QC wins it and TC does not). Either card of a class then wins or
+    loses exactly the same tricks. Each
+    class lists its cards from strongest to weakest; classes come in
+    suit order.
+    """
+    actions = legal_play_actions(gs, player)
+    if not actions:
+        return []
+    dead = {(c.suit, c.rank) for c in gs.played_cards}
+    dead.difference_update((c.suit, c.rank) for _, c in gs.current_trick)
+    dead.update((c.suit, c.rank) for c in gs.discards)
+    held = {(a.card.suit, a.card.rank): a.card for a in actions}
+
+    classes: list[list[Card]] = []
+    for suit in Suit:
+        current: list[Card] = []
+        for rank in _RANK_ORDER[gs.direction]:
+            card = held.get((suit, rank))
+            if card is not None:
+                current.append(card)
+            elif (suit, rank) not in dead and current:
+                # A live card held elsewhere separates the sequence
+                classes.append(current)
+                current = []
+        if current:
+            classes.append(current)
+    return classes
+
+
+def reduced_play_actions(gs: GameState, player: int) -> list[Action]:
+    """
+    One representative play per equivalence class (its strongest card).
+
+    A drop-in replacement for legal_play_actions in searches and rollout
+    policies; expand a chosen representative with equivalent_play_actions.
+    """
+    return [Action(card=cls[0]) for cls in play_equivalence_classes(gs, player)]
+
+
+def equivalent_play_actions(gs: GameState, player: int, action: Action) -> list[Action]:
+    """All legal plays equivalent to `action` (including itself)."""
+    for cls in play_equivalence_classes(gs, player):
+        if action.card in cls:
+            return [Action(card=c) for c in cls]
+    raise ValueError(f"{action!r} is not a legal play for player {player}")
+
+
 def legal_discard_actions(gs: GameState, player: int) -> list[Action]:
     """
     Legal discard actions: choose exactly 4 cards from hand to discard.
@@ -0,0 +1,299 @@
+"""
+Match-equity table: score-aware utilities for a game to 21.
+
+hand_payoff scores a hand in raw points, but what a hand is worth
+depends on the match score. Two points are worth little at 0-0 and decide
+the game at 19-19. _score_hand ends the game when a team reaches 21, or
+reaches 11 while the other team has 0 (mercy). A whisting hand scores as
+21 points (hand_payoff) and so always ends it.
+
+This module tabulates P(team 0 wins the match) for every state
+(score0, score1, dealer):
+
+  1. Simulate many hands (random_rollout by default) and record each one's
+     outcome relative to the dealer's team: which side scored and how
+     many points (1-21). Redeals are replayed inside the simulator, so
+     every recorded hand scores.
+  2. Solve the match by dynamic programming. Every hand adds at least one
+     point, so the states are ordered by total score. Each equity is the
+     outcome-weighted equity of its successors with the next dealer, and
+     the successors are already solved.
+
+The outcome distribution does not depend on the score. The table
+therefore values a score state under a fixed, score-blind way of playing
+each hand.
+
+From the equity table, MatchEquity.hand_values holds, per state, the team-0
+utility 2 * P(win) - 1 of every hand result -21..+21 (team-0 point
+delta). The solver's match mode (BidWhistCFR(match_equity=...)) converts
+each leaf value through this row with one interpolated lookup.
+
+Usage:
+    equity = build_equity(50_000, seed=0, n_workers=4)
+    equity.save("match_equity.npz")
+
+    solver = BidWhistCFR(match_equity=MatchEquity.load("match_equity.npz"))
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from game_state import GameState
+from game_engine import hand_payoff, random_rollout
+
+TABLE_VERSION = 1
+TARGET = 21                 # game target
+MERCY = 11                  # shutout: MERCY points while the other team has 0
+MAX_POINTS = 21             # largest single-hand score (whisting, as in hand_payoff)
+DELTA_GRID = np.arange(-MAX_POINTS, MAX_POINTS + 1, dtype=np.float64)
+_EXT = TARGET + MAX_POINTS  # score range reachable in one hand from a live state
+
+
+def game_winner(s0, s1):
+    """
+    Winning team (0 / 1) of a score state, or -1 while the game goes on
+    (_score_hand rules). Works elementwise on integer arrays.
+    """
+    s0, s1 = np.asarray(s0), np.asarray(s1)
+    win0 = (s0 >= TARGET) | ((s0 >= MERCY) & (s1 == 0))
+    win1 = (s1 >= TARGET) | ((s1 >= MERCY) & (s0 == 0))
+    return np.where(win0, 0, np.where(win1, 1, -1))
+
+
+def score_tag(own: int, opp: int) -> str:
+    """
+    Info set suffix for the match score, seat-relative: points still
+    needed by the acting team and by the opponents, each binned
+    near (<= 5) / mid (<= 12) / far.
+    """
+    def need(s: int) -> int:
+        left = TARGET - s
+        return 0 if left <= 5 else (1 if left <= 12 else 2)
+    return f"|m{need(own)}{need(opp)}"
+
+
+def hand_utility(row: np.ndarray, delta):
+    """
+    Team-0 utility of a hand with team-0 point delta `delta` (a float or
+    an array), read off a hand_values row with linear interpolation.
+    """
+    if type(delta) is np.ndarray:
+        return np.interp(delta, DELTA_GRID, row)
+    x = min(max(float(delta), -MAX_POINTS), MAX_POINTS) + MAX_POINTS
+    i = int(x)
+    if i >= 2 * MAX_POINTS:
+        return float(row[-1])
+    lo = float(row[i])
+    return lo + (x - i) * (float(row[i + 1]) - lo)
+
+
+# ── Hand outcomes ─────────────────────────────────────────────────────
+
+def hand_outcome(gs: GameState) -> tuple[int, int]:
+    """
+    (scoring side relative to the dealer's team, points) of a completed
+    hand: side 0 is the dealer's team, side 1 the first bidder's.
+    """
+    payoff = hand_payoff(gs)
+    team = 0 if payoff[0] > 0 else 1
+    return team ^ (gs.dealer % 2), int(max(payoff))
+
+
+def _simulate_chunk(args: tuple[int, int, Callable[..., GameState]]) -> np.ndarray:
+    n_hands, seed, play_hand = args
+    random.seed(seed)
+    counts = np.zeros((2, MAX_POINTS + 1))
+    for i in range(n_hands):
+        side, points = hand_outcome(play_hand(dealer=i % 4))
+        counts[side, points] += 1
+    return counts
+
+
+def simulate_outcomes(n_hands: int, seed: int = 0, n_workers: int = 1,
+                      chunk_size: int = 2000,
+                      play_hand: Callable[..., GameState] = random_rollout) -> np.ndarray:
+    """
+    Outcome distribution [side, points] of `n_hands` simulated hands.
+
+    `play_hand(dealer=d)` plays one complete hand and returns the final
+    state. It defaults to random_rollout, and any hand simulator (e.g. one
+    following a trained strategy) can be passed; it must be picklable
+    when n_workers > 1. Chunks are seeded individually, so the result
+    does not depend on n_workers.
+    """
+    chunks = [(min(chunk_size, n_hands - start), seed * 1_000_003 + start, play_hand)
+              for start in range(0, n_hands, chunk_size)]
+    if n_workers <= 1:
+        parts = [_simulate_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            parts = list(pool.map(_simulate_chunk, chunks))
+    counts = np.sum(parts, axis=0)
+    return counts / counts.sum()
+
+
+# ── Dynamic programming ──────────────────────────────────────────────
+
+def _terminal_values() -> tuple[np.ndarray, np.ndarray]:
+    """Winner per (s0, s1) over the one-hand-reachable range, and team-0 values."""
+    s = np.arange(_EXT)
+    winner = game_winner(s[:, None], s[None, :])
+    value = np.zeros((_EXT, _EXT, 4))
+    value[winner == 0] = 1.0
+    return winner, value
+
+
+def solve_equity(outcomes: np.ndarray) -> np.ndarray:
+    """
+    P(team 0 wins) for every (s0, s1, dealer) with scores 0..TARGET-1
+    (terminal states hold 1 or 0), given the per-hand outcome
+    distribution [side, points] relative to the dealer's team.
+    """
+    winner, value = _terminal_values()
+    points = np.arange(1, MAX_POINTS + 1)
+    p = np.asarray(outcomes, dtype=np.float64)[:, 1:]
+    for total in range(2 * (TARGET - 1), -1, -1):
+        for s0 in range(max(0, total - TARGET + 1), min(total, TARGET - 1) + 1):
+            s1 = total - s0
+            if winner[s0, s1] >= 0:
+                continue
+            for dealer in range(4):
+                nxt = (dealer + 1) % 4
+                v = 0.0
+                for side in (0, 1):
+                    if (dealer % 2) ^ side == 0:
+                        v += p[side] @ value[s0 + points, s1, nxt]
+                    else:
+                        v += p[side] @ value[s0, s1 + points, nxt]
+                value[s0, s1, dealer] = v
+    return value[:TARGET, :TARGET]
+
+
+def _hand_values(equity: np.ndarray) -> np.ndarray:
+    """[s0, s1, dealer, delta + MAX_POINTS] -> team-0 utility after the hand."""
+    _, value = _terminal_values()
+    value[:TARGET, :TARGET] = equity
+    s = np.arange(TARGET)
+    nxt = (np.arange(4) + 1) % 4
+    rows = np.empty((TARGET, TARGET, 4, len(DELTA_GRID)))
+    for g in range(MAX_POINTS + 1):
+        gain0 = value[s[:, None] + g, s[None, :]][:, :, nxt]
+        gain1 = value[s[:, None], s[None, :] + g][:, :, nxt]
+        rows[:, :, :, MAX_POINTS + g] = gain0
+        rows[:, :, :, MAX_POINTS - g] = gain1
+    return 2.0 * rows - 1.0
+
+
+# ── Table ─────────────────────────────────────────────────────────────
+
+class MatchEquity:
+    """
+    Match-equity table built from a per-hand outcome distribution.
+
+    `equity[s0, s1, dealer]` is P(team 0 wins the match). `hand_values`
+    and `reach` are derived from it on construction.
+    """
+
+    def __init__(self, outcomes: np.ndarray, equity: np.ndarray | None = None):
+        outcomes = np.asarray(outcomes, dtype=np.float64)
+        self.outcomes = outcomes / outcomes.sum()
+        self.equity = solve_equity(self.outcomes) if equity is None else np.asarray(equity)
+        self.hand_values = _hand_values(self.equity)
+        self.reach = self._reach()
+        cdf = np.cumsum(self.reach.sum(axis=2).ravel())
+        self._reach_cdf = cdf / cdf[-1]
+
+    def _reach(self) -> np.ndarray:
+        """P(a match from 0-0 with dealer 0 passes through each live state)."""
+        winner, _ = _terminal_values()
+        reach = np.zeros((TARGET, TARGET, 4))
+        reach[0, 0, 0] = 1.0
+        for total in range(2 * (TARGET - 1) + 1):
+            for s0 in range(max(0, total - TARGET + 1), min(total, TARGET - 1) + 1):
+                s1 = total - s0
+                if winner[s0, s1] >= 0:
+                    continue
+                for dealer in range(4):
+                    r = reach[s0, s1, dealer]
+                    if r == 0.0:
+                        continue
+                    nxt = (dealer + 1) % 4
+                    for side in (0, 1):
+                        team = (dealer % 2) ^ side
+                        for points in range(1, MAX_POINTS + 1):
+                            p = self.outcomes[side, points]
+                            a, b = (s0 + points, s1) if team == 0 else (s0, s1 + points)
+                            if p > 0 and a < TARGET and b < TARGET and winner[a, b] < 0:
+                                reach[a, b, nxt] += r * p
+        return reach
+
+    def win_probability(self, scores: tuple[int, int], dealer: int) -> float:
+        """P(team 0 wins) with the next hand dealt by `dealer`."""
+        winner = int(game_winner(*scores))
+        if winner >= 0:
+            return 1.0 - winner
+        return float(self.equity[scores[0], scores[1], dealer % 4])
+
+    def values_row(self, scores: tuple[int, int], dealer: int) -> np.ndarray:
+        """hand_values row of a live state (see hand_utility)."""
+        return self.hand_values[scores[0], scores[1], dealer % 4]
+
+    def redeal_value(self, scores: tuple[int, int], dealer: int) -> float:
+        """Team-0 utility of a passed-out hand: same scores, same dealer."""
+        return 2.0 * self.win_probability(scores, dealer) - 1.0
+
+    def sample_scores(self, u: float) -> tuple[int, int]:
+        """Live score state drawn in proportion to `reach`, given u ~ U[0, 1)."""
+        i = int(np.searchsorted(self._reach_cdf, u, side="right"))
+        i = min(i, len(self._reach_cdf) - 1)
+        return divmod(i, TARGET)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, version=TABLE_VERSION,
+                            outcomes=self.outcomes, equity=self.equity)
+
+    @classmethod
+    def load(cls, path: str) -> MatchEquity:
+        with np.load(path) as data:
+            if int(data["version"]) != TABLE_VERSION:
+                raise ValueError(f"{path}: unsupported match equity version {int(data['version'])}")
+            return cls(data["outcomes"], data["equity"])
+
+
+def build_equity(n_hands: int, seed: int = 0, n_workers: int = 1,
+                 chunk_size: int = 2000,
+                 play_hand: Callable[..., GameState] = random_rollout) -> MatchEquity:
+    """Simulate `n_hands` hands (simulate_outcomes) and solve the match."""
+    return MatchEquity(simulate_outcomes(n_hands, seed, n_workers, chunk_size, play_hand))
+
+
+# ── Main ──────────────────────────────────────────────────────────────
+
+def main():
+    n_hands = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    path = sys.argv[2] if len(sys.argv) > 2 else "match_equity.npz"
+
+    print(f"Simulating {n_hands} hands...")
+    t0 = time.time()
+    equity = build_equity(n_hands, seed=0)
+    equity.save(path)
+    print(f"  {time.time() - t0:.1f}s, saved to {path}")
+
+    for side, name in ((0, "dealer team"), (1, "first bidder team")):
+        mean = (equity.outcomes[side] * np.arange(MAX_POINTS + 1)).sum()
+        print(f"  {name:18s} scores {equity.outcomes[side].sum():.1%} of hands "
+              f"({mean:.2f} pts/hand)")
+    print("\n  P(team 0 wins), team 0 to deal next:")
+    for scores in ((0, 0), (10, 10), (15, 18), (18, 15), (20, 20), (0, 10)):
+        print(f"    {scores[0]:2d}-{scores[1]:<2d}  {equity.win_probability(scores, 0):.3f}")
+
+
+if __name__ == "__main__":
+    main()
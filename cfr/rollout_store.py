@@ -0,0 +1,278 @@
+"""
+Persistent rollout results shared across solver runs and sweeps.
+
+Every run that evaluates play leaves with random rollouts
+(evaluate_play_random) redraws them from scratch, even when a sweep over
+the same deal set (best_response.sample_deals) evaluates the same
+(deck, declarer, bid, trump, direction, discard) play states again. A
+RolloutStore keeps, per play state, the count, sum and sum of squares of
+its rollout results (hand_payoff team-0 deltas) in an SQLite database:
+
+    rollouts(key BLOB PRIMARY KEY, n, total, total_sq)
+
+where key is a 16-byte hash of everything the playout depends on:
+card owners, the trick in progress, books, contract, trump, direction,
+the player to act and the playout policy (policy_id; uniform random
+play adds nothing, so results of different policies never mix).
+
+Evaluating a state tops its stored samples up to `n_rollouts` and
+returns the mean of ALL stored samples. Earlier runs are reused, a run
+with a larger n_rollouts refines them, and the estimate only gets
+better.
+
+The database runs in WAL mode, so readers never block each other or a
+writer. New results are buffered and written in one transaction per
+`flush_every` states. Updates are additive upserts, so concurrent
+writers merge their samples instead of overwriting each other.
+
+Usage (the store is a leaf_batch_evaluator):
+    with RolloutStore("rollouts.db", n_rollouts=4) as store:
+        solver = BidWhistCFR(batch_leaves=True, leaf_batch_evaluator=store)
+        solver.train(10_000)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import sys
+import time
+from typing import Callable, Sequence
+
+import numpy as np
+
+from cfr_solver import evaluate_play_random
+from game_state import Action, Direction, GameState
+
+STORE_VERSION = 1
+_DIRECTIONS = list(Direction)
+_NONE = 255
+_SELECT_CHUNK = 500   # keys per SELECT ... IN (...) query
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollouts (
+    key      BLOB PRIMARY KEY,
+    n        INTEGER NOT NULL,
+    total    REAL NOT NULL,
+    total_sq REAL NOT NULL
+) WITHOUT ROWID
+"""
+_UPSERT = """
+INSERT INTO rollouts (key, n, total, total_sq) VALUES (?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    n = n + excluded.n,
+    total = total + excluded.total,
+    total_sq = total_sq + excluded.total_sq
+"""
+
+
+def policy_id(play_policy: Callable[[GameState], Action] | None) -> str:
+    """
+    Stable identity of a playout policy for store keys: "" for uniform
+    random play, module.qualname for functions, repr() otherwise (so
+    policy objects need a repr that names their parameters, like
+    HeuristicPlayout's).
+    """
+    if play_policy is None:
+        return ""
+    name = getattr(play_policy, "__qualname__", None)
+    if name is not None:
+        return f"{play_policy.__module__}.{name}"
+    return repr(play_policy)
+
+
+def state_key(gs: GameState, policy: str = "") -> bytes:
+    """16-byte identity of a play-phase state (played out by `policy`, a policy_id)."""
+    owner = bytearray([_NONE]) * 52
+    for player, hand in enumerate(gs.hands):
+        for card in hand:
+            owner[card.suit * 13 + card.rank - 2] = player
+    header = bytes([
+        _NONE if gs.declarer is None else gs.declarer,
+        gs.high_bid,
+        _NONE if gs.trump_suit is None else int(gs.trump_suit),
+        _DIRECTIONS.index(gs.direction),
+        gs.current_player % 256,
+        gs.books[0], gs.books[1],
+    ])
+    trick = bytes(x for player, card in gs.current_trick
+                  for x in (player, card.suit * 13 + card.rank - 2))
+    return hashlib.blake2b(bytes(owner) + header + trick + policy.encode(),
+                           digest_size=16).digest()
+
+
+class RolloutStore:
+    """
+    SQLite-backed rollout statistics per play state (see module docstring).
+
+    `play_policy` plays the rollouts (uniform random by default) and is
+    part of every key. `hits` counts states served without new rollouts,
+    `rollouts` the rollouts actually played.
+    """
+
+    def __init__(self, path: str, n_rollouts: int = 1, flush_every: int = 512,
+                 timeout: float = 30.0,
+                 play_policy: Callable[[GameState], Action] | None = None):
+        self.path = path
+        self.n_rollouts = n_rollouts
+        self.play_policy = play_policy
+        self.policy = policy_id(play_policy)
+        self.flush_every = flush_every
+        self._conn = sqlite3.connect(path, timeout=timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            with self._conn:
+                self._conn.execute(_SCHEMA)
+                self._conn.execute(f"PRAGMA user_version={STORE_VERSION}")
+        elif version != STORE_VERSION:
+            self._conn.close()
+            raise ValueError(f"{path}: unsupported rollout store version {version}")
+        self._pending: dict[bytes, list] = {}   # key -> [n, total, total_sq] not yet written
+        self.hits = 0
+        self.misses = 0
+        self.rollouts = 0
+
+    # ── Raw statistics ──
+
+    def lookup(self, keys: Sequence[bytes]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(n, total, total_sq) per key, including unflushed results."""
+        n = np.zeros(len(keys), dtype=np.int64)
+        total = np.zeros(len(keys))
+        total_sq = np.zeros(len(keys))
+        index: dict[bytes, list[int]] = {}
+        for i, key in enumerate(keys):
+            index.setdefault(key, []).append(i)
+        unique = list(index)
+        for start in range(0, len(unique), _SELECT_CHUNK):
+            chunk = unique[start:start + _SELECT_CHUNK]
+            rows = self._conn.execute(
+                "SELECT key, n, total, total_sq FROM rollouts "
+                f"WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, kn, kt, ks in rows:
+                for i in index[key]:
+                    n[i], total[i], total_sq[i] = kn, kt, ks
+        for key, (kn, kt, ks) in self._pending.items():
+            for i in index.get(key, ()):
+                n[i] += kn
+                total[i] += kt
+                total_sq[i] += ks
+        return n, total, total_sq
+
+    def add(self, key: bytes, n: int, total: float, total_sq: float) -> None:
+        """Record `n` new results for `key` (buffered until flush)."""
+        entry = self._pending.get(key)
+        if entry is None:
+            self._pending[key] = [n, total, total_sq]
+        else:
+            entry[0] += n
+            entry[1] += total
+            entry[2] += total_sq
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered results in one transaction."""
+        if not self._pending:
+            return
+        rows = [(key, n, total, total_sq) for key, (n, total, total_sq) in self._pending.items()]
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        self._pending.clear()
+
+    # ── Evaluation ──
+
+    def evaluate_batch(self, states: list[GameState],
+                       n_rollouts: int | None = None) -> np.ndarray:
+        """
+        Team-0 values of play-phase states: every state is topped up to
+        at least `n_rollouts` stored samples (default self.n_rollouts)
+        and valued at the mean of all of them.
+        """
+        target = self.n_rollouts if n_rollouts is None else n_rollouts
+        keys = [state_key(gs, self.policy) for gs in states]
+        n, total, _ = self.lookup(keys)
+        done: dict[bytes, tuple[int, float]] = {}
+        for i, (gs, key) in enumerate(zip(states, keys)):
+            if key in done:
+                n[i], total[i] = done[key]
+                continue
+            missing = target - int(n[i])
+            if missing <= 0:
+                self.hits += 1
+                continue
+            self.misses += 1
+            s = s2 = 0.0
+            for _ in range(missing):
+                v = evaluate_play_random(gs, 1, play_policy=self.play_policy)
+                s += v
+                s2 += v * v
+            self.rollouts += missing
+            self.add(key, missing, s, s2)
+            n[i] += missing
+            total[i] += s
+            done[key] = (int(n[i]), float(total[i]))
+        return total / n
+
+    def __call__(self, states: list[GameState]) -> np.ndarray:
+        return self.evaluate_batch(states)
+
+    def evaluate(self, gs: GameState, n_rollouts: int | None = None) -> float:
+        """Single-state evaluate_batch."""
+        return float(self.evaluate_batch([gs], n_rollouts)[0])
+
+    # ── Bookkeeping ──
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._conn.execute("SELECT COUNT(*) FROM rollouts").fetchone()[0]
+
+    def n_samples(self) -> int:
+        """Total stored rollouts over all states."""
+        self.flush()
+        return self._conn.execute("SELECT COALESCE(SUM(n), 0) FROM rollouts").fetchone()[0]
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate(), "rollouts": self.rollouts}
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> RolloutStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ── Main ──────────────────────────────────────────────────────────────
+
+def main():
+    from value_net import sample_leaf_states
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "rollouts.db"
+    n_states = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    n_rollouts = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    states = sample_leaf_states(n_states, seed=0)
+    with RolloutStore(path, n_rollouts=n_rollouts) as store:
+        for label in ("first pass", "second pass"):
+            t0 = time.time()
+            store.evaluate_batch(states)
+            print(f"  {label:12s} {time.time() - t0:6.2f}s, "
+                  f"{store.hit_rate():.0%} hits, {store.rollouts} rollouts so far")
+            store.hits = store.misses = 0
+        print(f"  {len(store)} states, {store.n_samples()} samples in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Read-only, memory-mapped strategy file for trained CFR solvers.
+
+A trained BidWhistCFR keeps its strategy in a dict of CFRNode objects,
+which means the Python process that trained it has to stay alive (or the
+whole table has to be pickled and unpickled) to use it. This module
+writes the AVERAGE strategy of every node into a flat binary file that
+can be opened with mmap in milliseconds and shared between processes
+(advisor services, sweep workers) through the OS page cache.
+
+File layout (all integers little-endian):
+
+    header       magic "BWSTRAT1", u32 version, u32 n_entries,
+                 u64 key_blob_size, u64 n_probs
+    key_offsets  u64[n_entries + 1]   byte offsets into the key blob
+    prob_offsets u64[n_entries + 1]   element offsets into probs
+    visits       u64[n_entries]       CFRNode.visit_count
+    key_blob     utf-8 keys, sorted bytewise, concatenated
+    (padding to 8 bytes)
+    probs        f64[n_probs]          average strategies, concatenated
+
+Lookup is a binary search over the sorted keys; nothing is deserialized
+on open, the arrays are zero-copy views onto the mapping.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+MAGIC = b"BWSTRAT1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")
+
+
+def _pad8(n: int) -> int:
+    return (-n) % 8
+
+
+# ── Writer ────────────────────────────────────────────────────────────
+
+def export_strategy(nodes: dict, path: str) -> int:
+    """
+    Write the average strategy of every node to `path`.
+
+    Parameters:
+        nodes: mapping of info set key -> CFRNode (BidWhistCFR.nodes)
+        path: output file; written to a temp file and renamed into place
+              so concurrent readers never see a partial file.
+
+    Returns the number of entries written.
+    """
+    items = sorted(((k.encode("utf-8"), node) for k, node in nodes.items()),
+                   key=lambda kv: kv[0])
+    n = len(items)
+
+    key_offsets = np.zeros(n + 1, dtype="<u8")
+    prob_offsets = np.zeros(n + 1, dtype="<u8")
+    visits = np.zeros(n, dtype="<u8")
+    probs = []
+    for i, (kb, node) in enumerate(items):
+        key_offsets[i + 1] = key_offsets[i] + len(kb)
+        avg = node.get_average_strategy()
+        prob_offsets[i + 1] = prob_offsets[i] + len(avg)
+        visits[i] = node.visit_count
+        probs.append(np.asarray(avg, dtype="<f8"))
+
+    key_blob = b"".join(kb for kb, _ in items)
+    prob_arr = np.concatenate(probs) if probs else np.zeros(0, dtype="<f8")
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, n, len(key_blob), len(prob_arr)))
+        f.write(key_offsets.tobytes())
+        f.write(prob_offsets.tobytes())
+        f.write(visits.tobytes())
+        f.write(key_blob)
+        f.write(b"\0" * _pad8(len(key_blob)))
+        f.write(prob_arr.tobytes())
+    os.replace(tmp_path, path)
+    return n
+
+
+# ── Reader ────────────────────────────────────────────────────────────
+
+class StrategyFile:
+    """
+    Memory-mapped, read-only view of an exported strategy.
+
+    Usage:
+        with StrategyFile("strategy.bws") as sf:
+            probs = sf.get(abstract_bid_key(gs, player))
+
+    Returned arrays are read-only views into the mapping; copy them if
+    they must outlive the StrategyFile.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = None
+        try:
+            self._map()
+        except ValueError:
+            # Release the file (and mapping) on every malformed input
+            self.close()
+            raise
+
+    def _map(self) -> None:
+        """Map the file and set up the section views (ValueError if malformed)."""
+        path = self.path
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError(f"{path}: not a strategy file "
+                             f"({size} bytes, shorter than the {_HEADER.size}-byte header)")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n, blob_size, n_probs = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: bad magic {magic!r}")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported version {version}")
+
+        self._n = n
+        off = _HEADER.size
+        self._key_offsets = np.frombuffer(self._mm, dtype="<u8", count=n + 1, offset=off)
+        off += 8 * (n + 1)
+        self._prob_offsets = np.frombuffer(self._mm, dtype="<u8", count=n + 1, offset=off)
+        off += 8 * (n + 1)
+        self._visits = np.frombuffer(self._mm, dtype="<u8", count=n, offset=off)
+        off += 8 * n
+        self._blob_start = off
+        off += blob_size + _pad8(blob_size)
+        self._probs = np.frombuffer(self._mm, dtype="<f8", count=n_probs, offset=off)
+
+    # ── Lookup ──
+
+    def _key_bytes(self, i: int) -> bytes:
+        start = self._blob_start + int(self._key_offsets[i])
+        end = self._blob_start + int(self._key_offsets[i + 1])
+        return self._mm[start:end]
+
+    def _find(self, key: str) -> int:
+        """Binary search for `key`; returns its index or -1."""
+        target = key.encode("utf-8")
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            kb = self._key_bytes(mid)
+            if kb < target:
+                lo = mid + 1
+            elif kb > target:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Average strategy for `key`, or None if the key was never visited."""
+        i = self._find(key)
+        if i < 0:
+            return None
+        return self._probs[int(self._prob_offsets[i]):int(self._prob_offsets[i + 1])]
+
+    def visit_count(self, key: str) -> int:
+        """Training visit count for `key` (0 if absent)."""
+        i = self._find(key)
+        return int(self._visits[i]) if i >= 0 else 0
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def keys(self) -> Iterator[str]:
+        """All keys in sorted order."""
+        for i in range(self._n):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def entries(self) -> Iterator[tuple[str, np.ndarray, int]]:
+        """(key, average strategy, visit count) for every entry, in key order."""
+        for i in range(self._n):
+            probs = self._probs[int(self._prob_offsets[i]):int(self._prob_offsets[i + 1])]
+            yield self._key_bytes(i).decode("utf-8"), probs, int(self._visits[i])
+
+    # ── Lifetime ──
+
+    def close(self) -> None:
+        # Views must be dropped before the mapping can be closed
+        self._key_offsets = self._prob_offsets = self._visits = self._probs = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Caller still holds arrays from get(); the mapping is
+                # released when the last of them is garbage collected.
+                pass
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> StrategyFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,266 @@
+"""
+Columnar view of a trained strategy for analysis.
+
+BidWhistCFR.nodes is a dict keyed by abstract info set strings; asking
+it "what do dealers with two aces bid over a 3?" means scanning every
+key with substring tests and re-parsing bids with split(). With millions
+of nodes each report rescans everything.
+
+A StrategyTable parses every key ONCE into integer columns (seat, dealer
+flag, feature bins, high bid, partner bid, visit count) and stacks the
+average strategies into one matrix per decision type, so analyses become
+NumPy masks and group-bys:
+
+    table = StrategyTable.from_nodes(solver.nodes)
+    bids = table.bid
+    early = bids.select((bids.seat <= 1) & (bids.dealer == 0) & (bids.visits >= 5))
+    hands, counts, means = group_mean(early.hand, early.probs)
+
+Bidding strategies are stored by bid AMOUNT (columns: pass, bid 1..6,
+take) rather than by action index, so rows with different high bids are
+directly comparable. Trump strategies keep the legal_trump_actions()
+order (suit-major, 3 directions per suit).
+
+Tables can be saved to / loaded from .npz, and built from an exported
+strategy file as well as from live nodes. Match-mode keys (score_tag
+suffix) are parsed like plain ones, so their rows pool all scores.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, fields
+from typing import Iterable
+
+import numpy as np
+
+from game_state import Direction, legal_trump_actions
+
+BID_COLUMNS = ["Pass", "Bid 1", "Bid 2", "Bid 3", "Bid 4", "Bid 5", "Bid 6", "Take"]
+TAKE_COLUMN = 7
+
+_TRUMP_ACTIONS = legal_trump_actions()
+TRUMP_COLUMNS = [repr(a.trump) for a in _TRUMP_ACTIONS]
+# (12, 3) one-hot: trump action -> uptown / downtown / no-aces
+TRUMP_DIRECTIONS = np.array([[a.trump.direction == d for d in Direction]
+                             for a in _TRUMP_ACTIONS], dtype=np.float64)
+
+# B|s0|d0|a1ka2dt1ms0hl1|hb0pb0, plus |m01 (match score) in match mode
+_BID_RE = re.compile(r"B\|s(\d)\|d(\d)\|(a(\d)ka(\d)dt(\d)ms(\d)hl(\d))\|hb(\d)pb(\d)(?:\|m\d\d)?$")
+# T|a1hl1ms0|bu2bd3|pb0eb0, plus |m01 (match score) in match mode
+_TRUMP_RE = re.compile(r"T\|(a(\d)hl(\d)ms(\d))\|bu(\d)bd(\d)\|pb(\d)eb(\d)(?:\|m\d\d)?$")
+
+
+# ── Tables ────────────────────────────────────────────────────────────
+
+class _Columns:
+    """Shared row selection / persistence for the column dataclasses."""
+
+    def __len__(self) -> int:
+        return len(self.visits)
+
+    def select(self, rows) -> _Columns:
+        """Sub-table of the rows picked by a boolean mask or index array."""
+        values = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            values[f.name] = value if f.name == "hand_labels" else value[rows]
+        return type(self)(**values)
+
+    def top(self, n: int) -> _Columns:
+        """The `n` most-visited rows, most visited first."""
+        order = np.argsort(-self.visits, kind="stable")[:n]
+        return self.select(order)
+
+    def _arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {f"{prefix}.{f.name}": np.asarray(getattr(self, f.name)) for f in fields(self)}
+
+    @classmethod
+    def _from_arrays(cls, data, prefix: str) -> _Columns:
+        values = {f.name: data[f"{prefix}.{f.name}"] for f in fields(cls)}
+        values["hand_labels"] = [str(s) for s in values["hand_labels"]]
+        return cls(**values)
+
+
+@dataclass
+class BidTable(_Columns):
+    """One row per bidding info set."""
+    keys: np.ndarray          # info set keys (object array), for drill-down
+    seat: np.ndarray          # 0-3 from the first bidder (3 = dealer's turn)
+    dealer: np.ndarray        # 1 if the bidder is the dealer
+    aces: np.ndarray          # hand bins, as in bid_hand_bins
+    king_ace: np.ndarray
+    deuce_trey: np.ndarray
+    max_suit: np.ndarray
+    high_low: np.ndarray
+    high_bid: np.ndarray      # current high bid (0-6)
+    partner_bid: np.ndarray   # partner's bid (0 if none yet)
+    visits: np.ndarray
+    hand: np.ndarray          # index into hand_labels
+    hand_labels: list[str]    # hand feature strings, e.g. "a1ka2dt1ms0hl1"
+    probs: np.ndarray         # (n, 8) average strategy by BID_COLUMNS
+
+
+@dataclass
+class TrumpTable(_Columns):
+    """One row per trump-selection info set."""
+    keys: np.ndarray
+    aces: np.ndarray          # hand bins, as in trump_hand_bins
+    high_low: np.ndarray
+    max_suit: np.ndarray
+    best_up: np.ndarray       # strongest suit uptown / downtown
+    best_down: np.ndarray
+    partner_bid: np.ndarray   # partner's bid, capped at 3
+    enemy_bid: np.ndarray     # opponents' signal bid (1-2, else 0)
+    visits: np.ndarray
+    hand: np.ndarray
+    hand_labels: list[str]    # e.g. "a1hl1ms0"
+    probs: np.ndarray         # (n, 12) average strategy by TRUMP_COLUMNS
+
+    def direction_probs(self) -> np.ndarray:
+        """(n, 3) probability of choosing uptown / downtown / no-aces."""
+        return self.probs @ TRUMP_DIRECTIONS
+
+
+def _bid_amount_columns(high_bid: int, n_actions: int) -> np.ndarray:
+    """BID_COLUMNS index of each action, in legal_bid_amounts order."""
+    cols = [0] + list(range(high_bid + 1, 7))
+    if n_actions > len(cols):
+        cols.append(TAKE_COLUMN)
+    return np.array(cols)
+
+
+def _encode(labels: list[str]) -> tuple[np.ndarray, list[str]]:
+    uniq, codes = np.unique(np.array(labels, dtype=str), return_inverse=True)
+    return codes.astype(np.int32), [str(s) for s in uniq]
+
+
+@dataclass
+class StrategyTable:
+    """Bidding and trump tables of one strategy; `skipped` counts unparsed keys."""
+    bid: BidTable
+    trump: TrumpTable
+    skipped: int = 0
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[tuple[str, np.ndarray, int]]) -> StrategyTable:
+        """Build from (key, average strategy, visit count) triples."""
+        bid_rows, bid_probs, bid_keys, bid_hands = [], [], [], []
+        trump_rows, trump_probs, trump_keys, trump_hands = [], [], [], []
+        amount_cols: dict[tuple[int, int], np.ndarray] = {}
+        skipped = 0
+
+        for key, avg, visits in entries:
+            m = _BID_RE.match(key)
+            if m is not None:
+                g = m.groups()
+                seat, dealer = int(g[0]), int(g[1])
+                bins = [int(x) for x in g[3:8]]
+                high_bid, partner_bid = int(g[8]), int(g[9])
+                row = np.zeros(len(BID_COLUMNS))
+                cols = amount_cols.get((high_bid, len(avg)))
+                if cols is None:
+                    cols = amount_cols[high_bid, len(avg)] = _bid_amount_columns(high_bid, len(avg))
+                row[cols] = avg
+                bid_rows.append((seat, dealer, *bins, high_bid, partner_bid, visits))
+                bid_probs.append(row)
+                bid_keys.append(key)
+                bid_hands.append(g[2])
+                continue
+            m = _TRUMP_RE.match(key)
+            if m is not None:
+                g = m.groups()
+                trump_rows.append((*(int(x) for x in g[1:]), visits))
+                trump_probs.append(np.asarray(avg, dtype=np.float64))
+                trump_keys.append(key)
+                trump_hands.append(g[0])
+                continue
+            skipped += 1
+
+        b = np.array(bid_rows, dtype=np.int64).reshape(-1, 10)
+        hand, labels = _encode(bid_hands)
+        bid = BidTable(
+            keys=np.array(bid_keys, dtype=object),
+            seat=b[:, 0].astype(np.int8), dealer=b[:, 1].astype(np.int8),
+            aces=b[:, 2].astype(np.int8), king_ace=b[:, 3].astype(np.int8),
+            deuce_trey=b[:, 4].astype(np.int8), max_suit=b[:, 5].astype(np.int8),
+            high_low=b[:, 6].astype(np.int8), high_bid=b[:, 7].astype(np.int8),
+            partner_bid=b[:, 8].astype(np.int8), visits=b[:, 9],
+            hand=hand, hand_labels=labels,
+            probs=np.array(bid_probs).reshape(-1, len(BID_COLUMNS)),
+        )
+
+        t = np.array(trump_rows, dtype=np.int64).reshape(-1, 8)
+        hand, labels = _encode(trump_hands)
+        trump = TrumpTable(
+            keys=np.array(trump_keys, dtype=object),
+            aces=t[:, 0].astype(np.int8), high_low=t[:, 1].astype(np.int8),
+            max_suit=t[:, 2].astype(np.int8), best_up=t[:, 3].astype(np.int8),
+            best_down=t[:, 4].astype(np.int8), partner_bid=t[:, 5].astype(np.int8),
+            enemy_bid=t[:, 6].astype(np.int8), visits=t[:, 7],
+            hand=hand, hand_labels=labels,
+            probs=np.array(trump_probs).reshape(-1, len(TRUMP_COLUMNS)),
+        )
+        return cls(bid=bid, trump=trump, skipped=skipped)
+
+    @classmethod
+    def from_nodes(cls, nodes: dict) -> StrategyTable:
+        """Build from BidWhistCFR.nodes (average strategies)."""
+        return cls.from_entries((key, node.get_average_strategy(), node.visit_count)
+                                for key, node in nodes.items())
+
+    @classmethod
+    def from_strategy_file(cls, sf) -> StrategyTable:
+        """Build from an open strategy_file.StrategyFile."""
+        return cls.from_entries(sf.entries())
+
+    # ── Persistence ──
+
+    def save(self, path: str) -> None:
+        """Write all columns to a compressed .npz file."""
+        arrays = {**self.bid._arrays("bid"), **self.trump._arrays("trump"),
+                  "skipped": np.array(self.skipped)}
+        # Keys as fixed-width unicode so the file loads without pickle
+        arrays["bid.keys"] = self.bid.keys.astype(str)
+        arrays["trump.keys"] = self.trump.keys.astype(str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> StrategyTable:
+        with np.load(path) as data:
+            bid = BidTable._from_arrays(data, "bid")
+            trump = TrumpTable._from_arrays(data, "trump")
+            skipped = int(data["skipped"])
+        bid.keys = bid.keys.astype(object)
+        trump.keys = trump.keys.astype(object)
+        return cls(bid=bid, trump=trump, skipped=skipped)
+
+
+# ── Group-by ──────────────────────────────────────────────────────────
+
+def group_mean(codes: np.ndarray, values: np.ndarray,
+               weights: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mean of `values` rows per distinct code.
+
+    Parameters:
+        codes: (n,) integer group of each row
+        values: (n,) or (n, k) values to average
+        weights: optional (n,) row weights (e.g. visits); default equal
+
+    Returns (groups, row counts, means), groups in ascending order.
+    """
+    groups, inverse = np.unique(codes, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(groups))
+    w = np.ones(len(codes)) if weights is None else np.asarray(weights, dtype=np.float64)
+    totals = np.bincount(inverse, weights=w, minlength=len(groups))
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        sums = np.bincount(inverse, weights=w * values, minlength=len(groups))
+    else:
+        sums = np.stack([np.bincount(inverse, weights=w * values[:, j], minlength=len(groups))
+                         for j in range(values.shape[1])], axis=1)
+        totals = totals[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(totals > 0, sums / np.where(totals > 0, totals, 1), 0.0)
+    return groups, counts, means
@@ -0,0 +1,1393 @@
+"""
+Stage 3 tests: CFR solver and the tooling built around it.
+
+Tests cover:
+  - Memory-mapped strategy export / lookup
+  - Regret update schemes (vanilla, CFR+, Linear, DCFR)
+  - Outcome-sampling MCCFR
+  - Regret-based pruning
+  - Leaf value memoization
+  - Batched leaf evaluation
+  - Shared-work evaluation of all 12 trump choices
+  - BidState traversal keys
+  - Iterative (explicit-stack) traversal
+  - In-place regret matching and buffered action sampling
+  - Variance-reduced MCCFR (baselines, heuristic control variate)
+  - Best response / exploitability
+  - Convergence monitoring and early stopping
+  - Training instrumentation (profiling.Profiler)
+  - Micro-benchmark suite (bench.py)
+  - Columnar strategy analytics (strategy_table.StrategyTable)
+  - Neural value network leaf evaluator (value_net; torch tests skip without torch)
+  - Deep CFR memories, features and traversal (deep_cfr)
+  - Empirical equity tables (equity_table)
+  - Dealer-rotation reuse of sampled deals
+  - Match-equity table and score-aware solver mode (match_equity)
+  - Persistent SQLite rollout store (rollout_store)
+  - Adaptive rollout allocation (evaluate_play_random se_target)
+  - Rule-based playout policy (playout_policy)
+"""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from game_engine import deal_hand
+
+from game_state import Action, Phase, legal_actions, legal_trump_actions
+from game_engine import apply_action
+from cfr_solver import (
+    BidWhistCFR, CFRNode, CFR_SCHEMES, ConvergenceMonitor, LeafCache, UniformBuffer,
+    sample_index,
+    evaluate_play_heuristic, evaluate_play_heuristic_batch, heuristic_discard,
+    evaluate_play_random, evaluate_play_random_batch, leaf_importance,
+    evaluate_trump_choices, trump_discards,
+    abstract_bid_key, abstract_trump_key,
+)
+from strategy_file import StrategyFile, export_strategy
+from strategy_table import StrategyTable, BID_COLUMNS, group_mean
+from profiling import Profiler, METHOD_PHASES
+import bench
+import value_net
+import deep_cfr
+import equity_table
+import match_equity
+import rollout_store
+import playout_policy
+import cfr_solver
+from best_response import (
+    build_tree, build_trees, best_response, exploitability, policy_value,
+    profile_value, sample_deals, TRUMP_DEPTH,
+)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────
+
+def trump_states(n: int, seed: int = 0) -> list:
+    """TRUMP_SELECTION states with varied declarers and bids."""
+    random.seed(seed)
+    states = []
+    for i in range(n):
+        gs = deal_hand(dealer=i % 4)
+        gs = apply_action(gs, Action(bid=1 + i % 6))
+        for _ in range(3):
+            gs = apply_action(gs, Action(bid=0))
+        states.append(gs)
+    return states
+
+
+def play_states(n: int, seed: int = 0) -> list:
+    """Play-phase states over a spread of declarers, bids and trumps."""
+    random.seed(seed)
+    trumps = legal_trump_actions()
+    states = []
+    for i in range(n):
+        gs = deal_hand(dealer=i % 4)
+        gs = apply_action(gs, Action(bid=1 + i % 6))
+        for _ in range(3):
+            gs = apply_action(gs, Action(bid=0))
+        gs = apply_action(gs, trumps[i % 12])
+        states.append(apply_action(gs, heuristic_discard(gs)))
+    return states
+
+
+@pytest.fixture(scope="module")
+def trained_solver():
+    """A small heuristic-leaf solver shared by read-only tests."""
+    solver = BidWhistCFR(play_rollouts=0)
+    solver.train(n_iterations=20, seed=7, progress_every=1000)
+    return solver
+
+
+# ── Strategy file tests ───────────────────────────────────────────────
+
+class TestStrategyFile:
+    def test_roundtrip_matches_average_strategy(self, trained_solver, tmp_path):
+        path = str(tmp_path / "strategy.bws")
+        n = trained_solver.export_strategy(path)
+        assert n == len(trained_solver.nodes)
+
+        with StrategyFile(path) as sf:
+            assert len(sf) == n
+            for key, node in trained_solver.nodes.items():
+                np.testing.assert_allclose(sf.get(key), node.get_average_strategy())
+                assert sf.visit_count(key) == node.visit_count
+
+    def test_keys_sorted_and_missing_key(self, trained_solver, tmp_path):
+        path = str(tmp_path / "strategy.bws")
+        export_strategy(trained_solver.nodes, path)
+        with StrategyFile(path) as sf:
+            keys = list(sf.keys())
+            assert keys == sorted(keys, key=lambda k: k.encode("utf-8"))
+            assert sf.get("B|no-such-key") is None
+            assert "B|no-such-key" not in sf
+            assert keys[0] in sf
+
+    def test_empty_table(self, tmp_path):
+        path = str(tmp_path / "empty.bws")
+        assert export_strategy({}, path) == 0
+        with StrategyFile(path) as sf:
+            assert len(sf) == 0
+            assert sf.get("anything") is None
+
+    def test_rejects_foreign_file(self, tmp_path):
+        path = tmp_path / "junk.bin"
+        path.write_bytes(b"not a strategy file at all, just bytes")
+        with pytest.raises(ValueError):
+            StrategyFile(str(path))
+
+    @pytest.mark.parametrize("size", [0, 10, 60])
+    def test_rejects_truncated_file(self, trained_solver, tmp_path, monkeypatch, size):
+        path = tmp_path / "strategy.bws"
+        trained_solver.export_strategy(str(path))
+        path.write_bytes(path.read_bytes()[:size])
+        opened = []
+        real_open = open
+
+        def tracking_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            opened.append(f)
+            return f
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+        with pytest.raises(ValueError):
+            StrategyFile(str(path))
+        monkeypatch.undo()
+        assert opened and all(f.closed for f in opened)
+
+
+# ── Update scheme tests ───────────────────────────────────────────────
+
+class TestUpdateSchemes:
+    def test_unknown_scheme_rejected(self):
+        with pytest.raises(ValueError):
+            BidWhistCFR(scheme="cfr++")
+
+    @pytest.mark.parametrize("scheme", CFR_SCHEMES)
+    def test_scheme_trains_to_valid_strategies(self, scheme):
+        solver = BidWhistCFR(play_rollouts=0, scheme=scheme)
+        solver.train(n_iterations=5, seed=3, progress_every=1000)
+        assert solver.nodes
+        for node in solver.nodes.values():
+            avg = node.get_average_strategy()
+            assert np.all(np.isfinite(node.regret_sum))
+            assert avg.sum() == pytest.approx(1.0)
+
+    def test_cfr_plus_floors_regrets(self):
+        solver = BidWhistCFR(play_rollouts=0, scheme="cfr+")
+        solver.train(n_iterations=5, seed=3, progress_every=1000)
+        for node in solver.nodes.values():
+            assert np.all(node.regret_sum >= 0)
+
+    def test_dcfr_lazy_discount_matches_eager(self):
+        """Lazily applied DCFR discounts equal discounting every iteration."""
+        alpha, beta = 1.5, 0.5
+        solver = BidWhistCFR(scheme="dcfr", alpha=alpha, beta=beta)
+        node = CFRNode(num_actions=3)
+        eager = np.zeros(3)
+        updates = {1: [2.0, -1.0, 0.5], 4: [-3.0, 1.0, 1.0], 9: [1.0, 1.0, -5.0]}
+        for t in range(1, 11):
+            if t in updates:
+                solver.iterations = t - 1
+                solver._accumulate_regret(node, np.array(updates[t]))
+                eager += updates[t]
+            pos, neg = t ** alpha / (t ** alpha + 1), t ** beta / (t ** beta + 1)
+            eager *= np.where(eager > 0, pos, neg)
+        # Materialize pending discounts for iterations 9..10
+        solver.iterations = 10
+        solver._accumulate_regret(node, np.zeros(3))
+        np.testing.assert_allclose(node.regret_sum, eager)
+
+
+# ── Outcome sampling tests ────────────────────────────────────────────
+
+class TestOutcomeSampling:
+    def test_unknown_sampling_rejected(self):
+        with pytest.raises(ValueError):
+            BidWhistCFR(sampling="chance")
+
+    def test_outcome_sampling_trains(self):
+        solver = BidWhistCFR(play_rollouts=0, sampling="outcome")
+        solver.train(n_iterations=50, seed=5, progress_every=1000)
+        assert solver.iterations == 50
+        assert solver.nodes
+        for node in solver.nodes.values():
+            assert np.all(np.isfinite(node.regret_sum))
+            assert node.get_average_strategy().sum() == pytest.approx(1.0)
+
+    def test_outcome_traversal_returns_tail_probability(self):
+        random.seed(11)
+        np.random.seed(11)
+        solver = BidWhistCFR(play_rollouts=0, sampling="outcome")
+        gs = deal_hand(dealer=0)
+        u, tail = solver.cfr_iterate_outcome(gs, updating_team=0)
+        assert np.isfinite(u)
+        assert 0.0 < tail <= 1.0
+
+
+# ── Pruning tests ─────────────────────────────────────────────────────
+
+class TestPruning:
+    def test_disabled_by_default(self):
+        solver = BidWhistCFR(play_rollouts=0)
+        solver.train(n_iterations=3, seed=1, progress_every=1000)
+        assert solver.prune_stats["pruned"] == 0
+
+    def test_revisit_schedule(self):
+        solver = BidWhistCFR(prune_threshold=-1.0, prune_after=10, prune_revisit=5)
+        solver.iterations = 5           # iteration 6: still warming up
+        assert not solver._pruning_active()
+        solver.iterations = 11          # iteration 12: pruning
+        assert solver._pruning_active()
+        solver.iterations = 14          # iteration 15: full revisit
+        assert not solver._pruning_active()
+
+    def test_prunes_negative_actions(self):
+        solver = BidWhistCFR(play_rollouts=0, prune_threshold=-1.0,
+                             prune_after=5, prune_revisit=1000)
+        stats = solver.train(n_iterations=40, seed=2, progress_every=1000)
+        assert stats["prune_stats"]["pruned"] > 0
+        assert stats["prune_stats"]["traversed"] > stats["prune_stats"]["pruned"]
+        for node in solver.nodes.values():
+            assert node.get_average_strategy().sum() == pytest.approx(1.0)
+
+
+# ── Leaf cache tests ──────────────────────────────────────────────────
+
+class TestLeafCache:
+    def test_lru_eviction_and_stats(self):
+        cache = LeafCache(capacity=2)
+        cache.put("a", 1.0)
+        cache.put("b", 2.0)
+        assert cache.get("a") == 1.0      # a is now most recent
+        cache.put("c", 3.0)               # evicts b
+        assert cache.get("b") is None
+        assert cache.get("c") == 3.0
+        assert len(cache) == 2
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+    def test_cached_training_matches_uncached(self):
+        """Heuristic leaves are deterministic, so caching must not change results."""
+        plain = BidWhistCFR(play_rollouts=0)
+        plain.train(n_iterations=8, seed=9, progress_every=1000)
+        cached = BidWhistCFR(play_rollouts=0, leaf_cache_size=10_000)
+        stats = cached.train(n_iterations=8, seed=9, progress_every=1000)
+
+        assert stats["leaf_cache"]["hits"] > 0
+        assert plain.nodes.keys() == cached.nodes.keys()
+        for key, node in plain.nodes.items():
+            np.testing.assert_allclose(cached.nodes[key].regret_sum, node.regret_sum)
+
+
+# ── Batched leaf evaluation tests ─────────────────────────────────────
+
+class TestBatchedLeaves:
+    def test_batch_heuristic_matches_scalar(self):
+        states = play_states(60)
+        expected = [evaluate_play_heuristic(gs) for gs in states]
+        np.testing.assert_allclose(evaluate_play_heuristic_batch(states), expected, atol=1e-12)
+        assert evaluate_play_heuristic_batch([]).shape == (0,)
+
+    def test_batched_traversal_expands_same_tree(self):
+        """Same opponent samples and node visits as the recursive traversal."""
+        solvers = []
+        for batched in (False, True):
+            random.seed(4)
+            np.random.seed(4)
+            solver = BidWhistCFR(play_rollouts=0)
+            gs = deal_hand(dealer=1)
+            traverse = solver.cfr_iterate_batched if batched else solver.cfr_iterate
+            assert np.isfinite(traverse(gs, updating_team=1))
+            solvers.append(solver)
+        plain, batched = solvers
+        assert plain.nodes.keys() == batched.nodes.keys()
+        for key, node in plain.nodes.items():
+            assert batched.nodes[key].visit_count == node.visit_count
+
+    def test_custom_batch_evaluator_called_once_per_traversal(self):
+        calls = []
+
+        def evaluator(states):
+            calls.append(len(states))
+            return np.zeros(len(states))
+
+        solver = BidWhistCFR(batch_leaves=True, leaf_batch_evaluator=evaluator)
+        solver.train(n_iterations=3, seed=8, progress_every=1000)
+        assert len(calls) == 6          # 3 deals x 2 updating teams
+        assert all(n > 0 for n in calls)
+        for node in solver.nodes.values():
+            assert np.all(node.regret_sum == 0)
+
+
+# ── Shared trump evaluation tests ─────────────────────────────────────
+
+class TestTrumpChoices:
+    def test_discards_match_heuristic_discard(self):
+        for gs in trump_states(20, seed=1):
+            discards, keep = trump_discards(gs)
+            assert keep.shape == (12, 16)
+            assert np.all(keep.sum(axis=1) == 12)
+            for action, discard in zip(legal_trump_actions(), discards):
+                assert discard == heuristic_discard(apply_action(gs, action))
+
+    def test_values_match_per_branch_evaluation(self):
+        for gs in trump_states(20, seed=2):
+            _, values = evaluate_trump_choices(gs)
+            for action, value in zip(legal_trump_actions(), values):
+                child = apply_action(gs, action)
+                leaf = apply_action(child, heuristic_discard(child))
+                assert value == pytest.approx(evaluate_play_heuristic(leaf), abs=1e-12)
+
+    def test_trump_values_with_batch_evaluator(self):
+        """Non-heuristic evaluators get the 12 play states in one call."""
+        calls = []
+
+        def evaluator(states):
+            calls.append(len(states))
+            return np.array([evaluate_play_heuristic(gs) for gs in states])
+
+        gs = trump_states(1, seed=3)[0]
+        solver = BidWhistCFR(leaf_batch_evaluator=evaluator)
+        np.testing.assert_allclose(solver._trump_values(gs), evaluate_trump_choices(gs)[1])
+        assert calls == [12]
+
+
+# ── BidState traversal tests ──────────────────────────────────────────
+
+class TestBidStateTraversal:
+    def test_keys_match_full_state_keys(self):
+        """Cached-bin keys along BidState auctions equal the GameState keys."""
+        random.seed(21)
+        solver = BidWhistCFR()
+        for i in range(50):
+            gs = deal_hand(dealer=i % 4)
+            state = solver._begin_traversal(gs)
+            while gs.phase in (Phase.BIDDING, Phase.TRUMP_SELECTION):
+                solver.nodes.clear()
+                player, actions, _ = solver._decision_node(state)
+                expected = (abstract_bid_key(gs, player) if gs.phase == Phase.BIDDING
+                            else abstract_trump_key(gs, player))
+                assert list(solver.nodes) == [expected]
+                j = random.randrange(len(actions))
+                state = solver._child(state, actions[j])
+                gs = apply_action(gs, legal_actions(gs)[j])
+            assert state == gs
+
+
+# ── Iterative traversal tests ─────────────────────────────────────────
+
+def _same_tables(a: BidWhistCFR, b: BidWhistCFR) -> bool:
+    return a.nodes.keys() == b.nodes.keys() and all(
+        np.array_equal(a.nodes[k].regret_sum, b.nodes[k].regret_sum)
+        and np.array_equal(a.nodes[k].strategy_sum, b.nodes[k].strategy_sum)
+        for k in a.nodes)
+
+
+class TestIterativeTraversal:
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"sampling": "outcome"},
+        {"scheme": "dcfr", "prune_threshold": -1.0, "prune_after": 5},
+        {"play_rollouts": 1, "leaf_cache_size": 200},
+    ])
+    def test_matches_recursive(self, kwargs):
+        """Same seed -> identical regrets and strategy sums."""
+        kwargs = {"play_rollouts": 0, **kwargs}
+        solvers = []
+        for iterative in (False, True):
+            solver = BidWhistCFR(iterative=iterative, **kwargs)
+            solver.train(20, seed=11, progress_every=100)
+            solvers.append(solver)
+        assert _same_tables(*solvers)
+
+    def test_stack_frames_reused(self):
+        solver = BidWhistCFR(play_rollouts=0, iterative=True)
+        solver.train(10, seed=2, progress_every=100)
+        depth = len(solver._frames)
+        solver.train(10, seed=3, progress_every=100)
+        assert len(solver._frames) == depth
+
+
+# ── Regret matching / sampling tests ──────────────────────────────────
+
+class TestRegretMatching:
+    def test_in_place_matches_formula(self):
+        node = CFRNode(num_actions=5)
+        node.regret_sum[:] = [3.0, -1.0, 1.0, 0.0, -4.0]
+        strategy = node.current_strategy(2.0)
+        assert strategy is node.strategy
+        np.testing.assert_array_equal(strategy, [0.75, 0.0, 0.25, 0.0, 0.0])
+        np.testing.assert_array_equal(node.strategy_sum, [1.5, 0.0, 0.5, 0.0, 0.0])
+
+        node.regret_sum[:] = -1.0
+        np.testing.assert_array_equal(node.get_strategy(0.0), np.full(5, 0.2))
+        assert node.get_strategy(0.0) is not node.strategy
+
+    def test_zero_weight_skips_strategy_sum(self):
+        node = CFRNode(num_actions=3)
+        node.current_strategy(0.0)
+        assert np.all(node.strategy_sum == 0.0)
+        assert node.visit_count == 1
+
+    def test_sample_index_inverse_cdf(self):
+        probs = np.array([0.0, 0.25, 0.0, 0.75, 0.0])
+        assert sample_index(probs, 0.0) == 1
+        assert sample_index(probs, 0.2499) == 1
+        assert sample_index(probs, 0.25) == 3
+        assert sample_index(probs, 0.999999999) == 3
+        # Rounding shortfall never lands on a zero-probability action
+        assert sample_index(np.array([0.5, 0.4999, 0.0]), 0.99995) == 1
+
+    def test_sampler_frequencies(self):
+        np.random.seed(0)
+        buffer = UniformBuffer(size=256)
+        probs = np.array([0.1, 0.6, 0.3])
+        counts = np.bincount([sample_index(probs, buffer.next()) for _ in range(20000)],
+                             minlength=3)
+        np.testing.assert_allclose(counts / counts.sum(), probs, atol=0.015)
+
+    def test_training_reproducible_under_reseed(self):
+        solver = BidWhistCFR(play_rollouts=0)
+        solver.train(5, seed=7, progress_every=100)
+        first = {k: n.regret_sum.copy() for k, n in solver.nodes.items()}
+        again = BidWhistCFR(play_rollouts=0)
+        again.train(3, seed=1, progress_every=100)   # leaves draws buffered
+        again.nodes.clear()
+        again.train(5, seed=7, progress_every=100)
+        assert first.keys() == again.nodes.keys()
+        for key, regrets in first.items():
+            np.testing.assert_array_equal(again.nodes[key].regret_sum, regrets)
+
+
+# ── Variance reduction tests ──────────────────────────────────────────
+
+class TestVarianceReduction:
+    def test_zero_baseline_matches_outcome_sampling(self):
+        plain = BidWhistCFR(play_rollouts=0, sampling="outcome")
+        plain.train(30, seed=3, progress_every=100)
+        vr = BidWhistCFR(play_rollouts=0, sampling="outcome", baselines=True, baseline_decay=0.0)
+        vr.train(30, seed=3, progress_every=100)
+        assert plain.nodes.keys() == vr.nodes.keys()
+        for key, node in plain.nodes.items():
+            np.testing.assert_allclose(vr.nodes[key].regret_sum, node.regret_sum, atol=1e-9)
+            np.testing.assert_allclose(vr.nodes[key].strategy_sum, node.strategy_sum, atol=1e-9)
+
+    def test_heuristic_control_variate_is_exact_at_opponent_trump(self):
+        gs = trump_states(1, seed=5)[0]
+        solver = BidWhistCFR(play_rollouts=0, control_variate=True)
+        _, actions, node = solver._decision_node(gs)
+        strategy = np.random.dirichlet(np.ones(len(actions)))
+        expected = float(np.dot(strategy, evaluate_trump_choices(gs)[1]))
+        for idx in (0, 5, 11):
+            estimate = solver._opponent_estimate(gs, actions, node, strategy, idx,
+                                                 updating_team=1 - gs.declarer % 2)
+            assert estimate == pytest.approx(expected)
+
+    @pytest.mark.parametrize("sampling", ["external", "outcome"])
+    def test_baselines_learned(self, sampling):
+        solver = BidWhistCFR(play_rollouts=0, sampling=sampling, baselines=True)
+        solver.train(20, seed=4, progress_every=100)
+        learned = [n.baseline for n in solver.nodes.values() if n.baseline is not None]
+        assert learned and any(np.any(b != 0.0) for b in learned)
+        assert all(np.all(np.isfinite(b)) for b in learned)
+
+    def test_sampling_variance_leaves_solver_untouched(self):
+        solver = BidWhistCFR(play_rollouts=0, control_variate=True)
+        solver.train(10, seed=6, progress_every=100)
+        regrets = {k: n.regret_sum.copy() for k, n in solver.nodes.items()}
+        visits = {k: n.visit_count for k, n in solver.nodes.items()}
+        np.random.seed(1)
+        assert solver.sampling_variance(n_deals=3, repeats=4) >= 0.0
+        assert np.random.random() == np.random.RandomState(1).random_sample()
+        assert regrets.keys() == solver.nodes.keys()
+        for key, r in regrets.items():
+            np.testing.assert_array_equal(solver.nodes[key].regret_sum, r)
+            assert solver.nodes[key].visit_count == visits[key]
+        assert not solver._frozen and not solver._probe_views
+
+    def test_track_variance_reported(self):
+        solver = BidWhistCFR(play_rollouts=0, sampling="outcome", track_variance=True)
+        stats = solver.train(4, seed=2, progress_every=2)
+        assert len(stats["sampling_variance"]) == 2
+
+    def test_requires_recursive_traversal(self):
+        with pytest.raises(ValueError):
+            BidWhistCFR(baselines=True, iterative=True)
+
+
+# ── Best response tests ───────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def br_trees():
+    return build_trees(sample_deals(6, seed=1))
+
+
+class TestBestResponse:
+    def test_sample_deals_reproducible(self):
+        a, b = sample_deals(3, seed=4), sample_deals(3, seed=4)
+        assert [g.hands for g in a] == [g.hands for g in b]
+        assert [g.dealer for g in a] == [0, 1, 2]
+
+    def test_tree_matches_solver_keys(self):
+        gs = sample_deals(1, seed=2)[0]
+        tree = build_tree(gs)
+        assert tree.depths[0] == 0
+        for i, kids in enumerate(tree.children):
+            assert all(c > i for c in kids if c >= 0)          # preorder
+            if tree.depths[i] == TRUMP_DEPTH:
+                assert len(tree.trump_values[i]) == 12
+        # Every key is one the solver visits on this deal
+        solver = BidWhistCFR(play_rollouts=0)
+        keys = set(tree.keys)
+        for _ in range(20):
+            solver.cfr_iterate(gs, updating_team=0)
+            solver.cfr_iterate(gs, updating_team=1)
+        assert set(solver.nodes) <= keys
+
+    def test_best_response_value_is_exact(self, br_trees):
+        """The returned value is what the BR policy actually earns."""
+        sizes = {}
+        for tree in br_trees:
+            for i, key in enumerate(tree.keys):
+                sizes[key] = len(tree.children[i]) or 12
+        uniform: dict = {}
+        for team in (0, 1):
+            br, value = best_response(br_trees, uniform, team)
+            br_policy = {k: np.eye(sizes[k])[a] for k, a in br.items()}
+            policies = (br_policy, uniform) if team == 0 else (uniform, br_policy)
+            assert profile_value(br_trees, policies) == pytest.approx(value)
+
+    def test_uniform_strategy_is_exploitable(self, br_trees):
+        result = exploitability({}, trees=br_trees)
+        assert result["value"] == pytest.approx(policy_value(br_trees, {}))
+        assert min(result["gap"]) > 0.0
+        assert result["exploitability"] == pytest.approx(sum(result["gap"]) / 2)
+
+    def test_training_reduces_exploitability(self, br_trees):
+        solver = BidWhistCFR(play_rollouts=0)
+        before = exploitability(solver.nodes, trees=br_trees)["exploitability"]
+        solver.train(200, seed=3, progress_every=1000)
+        after = exploitability(solver.nodes, trees=br_trees)["exploitability"]
+        assert after < before
+
+    def test_train_eval_curve(self):
+        solver = BidWhistCFR(play_rollouts=0)
+        stats = solver.train(4, seed=3, progress_every=1000, eval_every=2, eval_deals=2)
+        assert [it for it, _ in stats["exploitability"]] == [2, 4]
+
+
+# ── Convergence monitor tests ─────────────────────────────────────────
+
+class TestConvergenceMonitor:
+    def test_metrics_over_touched_nodes(self):
+        still, moved = CFRNode(num_actions=2), CFRNode(num_actions=2)
+        for node in (still, moved):
+            node.strategy_sum[:] = [1.0, 1.0]
+            node.visit_count = 4
+        nodes = {"a": still, "b": moved}
+        monitor = ConvergenceMonitor(move_tol=0.05)
+        monitor.start(nodes)
+
+        moved.strategy_sum[:] = [3.0, 1.0]       # average 0.5/0.5 -> 0.75/0.25
+        moved.regret_sum[:] = [4.0, -2.0]
+        moved.visit_count = 6
+        nodes["c"] = CFRNode(num_actions=3)       # new node
+        nodes["c"].visit_count = 2
+        row = monitor.check(nodes, iterations=2, seconds=1.0)
+
+        assert row["touched"] == 2
+        assert row["moving_frac"] == 1.0
+        assert row["mean_l1"] == pytest.approx(2 * 0.5 / 4)   # visit-weighted, new node adds 0
+        assert row["regret_norm"] == pytest.approx(2 * 4.0 / 2 / 4)
+        assert monitor.check(nodes, iterations=3, seconds=2.0)["touched"] == 0
+
+    def test_stops_when_converged(self, tmp_path):
+        curve = tmp_path / "curve.jsonl"
+        monitor = ConvergenceMonitor(check_every=5, l1_target=10.0, moving_target=1.0,
+                                     patience=2, curve_path=str(curve))
+        solver = BidWhistCFR(play_rollouts=0, sampling="outcome")
+        stats = solver.train(1000, seed=1, progress_every=1000, monitor=monitor)
+        assert stats["stopped"] == "converged"
+        assert solver.iterations == 10
+        rows = [json.loads(line) for line in curve.read_text().splitlines()]
+        assert [r["iteration"] for r in rows] == [5, 10]
+        assert rows == stats["convergence"]
+
+    def test_time_budget(self):
+        solver = BidWhistCFR(play_rollouts=0)
+        stats = solver.train(1000, seed=1, progress_every=1000, time_budget=0.0)
+        assert stats["stopped"] == "time_budget"
+        assert solver.iterations == 1
+
+
+# ── Profiler tests ────────────────────────────────────────────────────
+
+class TestProfiler:
+    def test_detach_restores_plain_code(self):
+        solver = BidWhistCFR(play_rollouts=0)
+        original = cfr_solver.evaluate_trump_choices
+        profiler = Profiler().attach(solver)
+        assert cfr_solver.evaluate_trump_choices is not original
+        assert "_traverse" in solver.__dict__
+        profiler.detach()
+        assert cfr_solver.evaluate_trump_choices is original
+        assert not set(METHOD_PHASES) & set(solver.__dict__)
+        assert solver.profiler is None
+
+    def test_only_attached_solver_timed(self):
+        profiled = BidWhistCFR(play_rollouts=0)
+        profiler = Profiler().attach(profiled)
+        try:
+            BidWhistCFR(play_rollouts=0).train(2, seed=1, progress_every=100)
+            cfr_solver.evaluate_trump_choices(value_net.sample_leaf_states(1, seed=2)[0])
+            assert profiler.calls["evaluate_trump_choices"] == 0
+            profiled.train(2, seed=1, progress_every=100)
+            assert profiler.calls["evaluate_trump_choices"] > 0
+        finally:
+            profiler.detach()
+
+    def test_counts_and_snapshots(self, tmp_path):
+        path = tmp_path / "profile.jsonl"
+        solver = BidWhistCFR(play_rollouts=0)
+        profiler = Profiler(path=str(path)).attach(solver)
+        try:
+            solver.train(6, seed=1, progress_every=3)
+        finally:
+            profiler.detach()
+        assert profiler.calls["traversal"] == 12
+        assert profiler.calls["node_lookup"] == profiler.calls["decision_node"] > 0
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r["iteration"] for r in rows] == [3, 6]
+        assert rows[-1]["phases"]["traversal"]["calls"] == 12
+        assert rows[-1]["traversal_self"] >= 0.0
+        assert "trump_values" in profiler.report()
+
+    def test_results_unchanged(self):
+        plain = BidWhistCFR(play_rollouts=0)
+        plain.train(5, seed=2, progress_every=100)
+        profiled = BidWhistCFR(play_rollouts=0)
+        profiler = Profiler().attach(profiled)
+        profiled.train(5, seed=2, progress_every=100)
+        profiled.sampling_variance(n_deals=1, repeats=2)
+        profiler.detach()
+        assert _same_tables(plain, profiled)
+
+
+# ── Benchmark suite tests ─────────────────────────────────────────────
+
+class TestBench:
+    def test_compare_flags_slowdowns_only(self):
+        baseline = {"a": 1000.0, "b": 1000.0, "c": 1000.0}
+        current = {"a": 950.0, "b": 850.0, "c": 2000.0, "new": 1.0}
+        assert bench.compare_results(current, baseline, tolerance=0.10) == ["b"]
+        assert bench.compare_results(current, baseline, tolerance=0.20) == []
+
+    def test_baseline_round_trip(self, tmp_path):
+        path = str(tmp_path / "base.json")
+        results = bench.run_benchmarks(["resolve_trick", "abstract_bid_key"],
+                                       min_time=0.01, repeats=1, verbose=False)
+        assert set(results) == {"resolve_trick", "abstract_bid_key"}
+        assert all(ops > 0 for ops in results.values())
+        bench.save_baseline(results, path)
+        assert bench.load_baseline(path) == results
+        assert bench.main(["--compare", path, "--filter", "resolve_trick",
+                           "--min-time", "0.01", "--repeats", "1",
+                           "--tolerance", "0.99"]) == 0
+
+    def test_fixtures_are_deterministic(self):
+        a = bench.state_in_phase(Phase.PLAY)
+        b = bench.state_in_phase(Phase.PLAY)
+        assert a.hands == b.hands and a.trump_suit == b.trump_suit
+
+
+# ── Strategy table tests ──────────────────────────────────────────────
+
+class TestStrategyTable:
+    def test_columns_match_keys(self, trained_solver):
+        table = trained_solver.strategy_table()
+        nodes = trained_solver.nodes
+        assert len(table.bid) + len(table.trump) == len(nodes)
+        assert table.skipped == 0
+        bids = table.bid
+        for i in range(len(bids)):
+            key = bids.keys[i]
+            assert key == (f"B|s{bids.seat[i]}|d{bids.dealer[i]}|{bids.hand_labels[bids.hand[i]]}"
+                           f"|hb{bids.high_bid[i]}pb{bids.partner_bid[i]}")
+            assert bids.visits[i] == nodes[key].visit_count
+            # Probabilities are stored by bid amount
+            avg = nodes[key].get_average_strategy()
+            assert bids.probs[i, 0] == avg[0]
+            np.testing.assert_allclose(bids.probs[i].sum(), 1.0)
+            assert not bids.probs[i, 1:bids.high_bid[i] + 1].any()
+        trumps = table.trump
+        for i in range(len(trumps)):
+            np.testing.assert_allclose(trumps.probs[i],
+                                       nodes[trumps.keys[i]].get_average_strategy())
+            np.testing.assert_allclose(trumps.direction_probs()[i].sum(), 1.0)
+
+    def test_take_column(self):
+        node = CFRNode(4)   # dealer over a 4: pass, 5, 6, take
+        node.strategy_sum[:] = [1.0, 2.0, 3.0, 4.0]
+        table = StrategyTable.from_nodes({"B|s3|d1|a0ka0dt0ms0hl0|hb4pb0": node,
+                                          "X|unknown": CFRNode(2)})
+        assert table.skipped == 1
+        np.testing.assert_allclose(table.bid.probs[0], [0.1, 0, 0, 0, 0, 0.2, 0.3, 0.4])
+        assert BID_COLUMNS[7] == "Take"
+
+    def test_save_load_and_strategy_file(self, trained_solver, tmp_path):
+        table = trained_solver.strategy_table()
+        table.save(str(tmp_path / "table.npz"))
+        loaded = StrategyTable.load(str(tmp_path / "table.npz"))
+        path = str(tmp_path / "strategy.bws")
+        trained_solver.export_strategy(path)
+        with StrategyFile(path) as sf:
+            from_file = StrategyTable.from_strategy_file(sf)
+        for other in (loaded, from_file):
+            order = np.argsort(other.bid.keys.astype(str))
+            expected = np.argsort(table.bid.keys.astype(str))
+            assert list(other.bid.keys[order]) == list(table.bid.keys[expected])
+            np.testing.assert_allclose(other.bid.probs[order], table.bid.probs[expected])
+            np.testing.assert_array_equal(other.bid.visits[order], table.bid.visits[expected])
+            assert len(other.trump) == len(table.trump)
+
+    def test_group_mean(self):
+        codes = np.array([2, 0, 2, 2])
+        values = np.array([[1.0, 0.0], [0.5, 0.5], [0.0, 1.0], [0.5, 0.5]])
+        groups, counts, means = group_mean(codes, values)
+        assert list(groups) == [0, 2] and list(counts) == [1, 3]
+        np.testing.assert_allclose(means, [[0.5, 0.5], [0.5, 0.5]])
+        _, _, weighted = group_mean(codes, values[:, 0], weights=np.array([1, 1, 3, 0]))
+        np.testing.assert_allclose(weighted, [0.5, 0.25])
+
+    def test_analyses_run(self, trained_solver, capsys):
+        table = trained_solver.strategy_table()
+        trained_solver.analyze_bidding(table)
+        trained_solver.analyze_trump(table)
+        trained_solver.analyze_signal_optimality()
+        out = capsys.readouterr().out
+        assert f"Total bidding info sets: {len(table.bid)}" in out
+        assert "Direction preference by partner bid" in out
+
+
+# ── Value network tests ───────────────────────────────────────────────
+
+class TestValueNet:
+    def test_encoding_is_declarer_relative(self):
+        states = value_net.sample_leaf_states(20, seed=1)
+        x = value_net.encode_states(states)
+        assert x.shape == (20, value_net.FEATURE_SIZE)
+        for gs, row in zip(states, x):
+            hands = row[:208].reshape(4, 4, 13)
+            assert hands[0].sum() == 12                     # declarer block
+            trump_cards = sum(c.suit == gs.trump_suit for c in gs.hands[gs.declarer])
+            assert hands[0, 0].sum() == trump_cards         # trump suit first
+            assert row[208:211].sum() == 1 and row[211 + gs.high_bid - 1] == 1
+
+    def test_rejects_mid_play_states(self):
+        gs = value_net.sample_leaf_states(1, seed=2)[0]
+        gs = apply_action(gs, legal_actions(gs)[0])
+        with pytest.raises(ValueError):
+            value_net.encode_states([gs])
+
+    def test_points_match_hand_payoff(self):
+        """team0_values of a one-hot book distribution is the hand payoff."""
+        from game_engine import hand_payoff, is_terminal
+        random.seed(4)
+        for gs in value_net.sample_leaf_states(30, seed=3):
+            sim = gs
+            while not is_terminal(sim):
+                sim = apply_action(sim, random.choice(legal_actions(sim)))
+            books = sim.books[gs.declarer % 2] + 1
+            onehot = np.eye(value_net.N_BOOKS)[books][None]
+            payoff = hand_payoff(sim)
+            assert value_net.team0_values([gs], onehot)[0] == payoff[0] - payoff[1]
+
+    def test_dataset_independent_of_workers(self):
+        x1, y1 = value_net.generate_dataset(12, n_rollouts=2, seed=5, chunk_size=5, n_workers=1)
+        x2, y2 = value_net.generate_dataset(12, n_rollouts=2, seed=5, chunk_size=5, n_workers=2)
+        np.testing.assert_array_equal(x1, x2)
+        np.testing.assert_array_equal(y1, y2)
+        assert y1.shape == (12, value_net.N_BOOKS)
+        np.testing.assert_allclose(y1.sum(axis=1), 1.0)
+
+    def test_evaluator_used_by_unbatched_traversals(self):
+        calls = []
+
+        def evaluator(states):
+            calls.append(len(states))
+            return evaluate_play_heuristic_batch(states)
+
+        solver = BidWhistCFR(sampling="outcome", leaf_batch_evaluator=evaluator)
+        solver.train(20, seed=3, progress_every=100)
+        assert calls and set(calls) == {1}
+
+    def test_train_and_plug_into_solver(self, tmp_path):
+        pytest.importorskip("torch")
+        x, y = value_net.generate_dataset(200, n_rollouts=2, seed=0)
+        evaluator, history = value_net.train_value_net(x, y, hidden=(32,), epochs=3,
+                                                       verbose=False)
+        assert len(history) == 3 and "val_books_mae" in history[-1]
+        states = value_net.sample_leaf_states(5, seed=9)
+        np.testing.assert_allclose(evaluator.book_distribution(states).sum(axis=1), 1.0)
+
+        path = str(tmp_path / "value_net.pt")
+        evaluator.save(path)
+        loaded = value_net.ValueNetEvaluator.load(path)
+        np.testing.assert_allclose(loaded(states), evaluator(states))
+
+        solver = BidWhistCFR(batch_leaves=True, leaf_batch_evaluator=loaded)
+        solver.train(3, seed=1, progress_every=100)
+        assert solver.nodes
+
+
+# ── Deep CFR tests ────────────────────────────────────────────────────
+
+class TestDeepCFR:
+    def test_reservoir_is_uniform_and_bounded(self):
+        buf = deep_cfr.ReservoirBuffer(100, n_features=3, n_actions=2, seed=0)
+        for i in range(1000):
+            buf.add(np.full(3, i), np.zeros(2), np.ones(2, dtype=bool), iteration=i)
+        assert len(buf) == 100 and buf.seen == 1000
+        kept = buf.arrays()[3]
+        # Uniform over 0..999: mean ~500, and late rows are not favoured
+        assert 350 < kept.mean() < 650
+        assert len(np.unique(kept)) == 100
+
+    def test_reservoir_save_load(self, tmp_path):
+        buf = deep_cfr.ReservoirBuffer(10, n_features=3, n_actions=2)
+        for i in range(4):
+            buf.add(np.full(3, i), np.full(2, -i), np.array([True, False]), iteration=i + 1)
+        buf.save(str(tmp_path / "mem.npz"))
+        loaded = deep_cfr.ReservoirBuffer.load(str(tmp_path / "mem.npz"))
+        for a, b in zip(buf.arrays(), loaded.arrays()):
+            np.testing.assert_array_equal(a, b)
+        assert loaded.seen == 4 and loaded.capacity == 10
+
+    def test_regret_matching(self):
+        mask = np.array([True, False, True, True])
+        np.testing.assert_allclose(deep_cfr.regret_matching(np.array([1.0, 5.0, 3.0, -1.0]), mask),
+                                   [0.25, 0.0, 0.75, 0.0])
+        # No positive advantage: best legal action
+        np.testing.assert_allclose(deep_cfr.regret_matching(np.array([-3.0, 5.0, -1.0, -2.0]), mask),
+                                   [0.0, 0.0, 1.0, 0.0])
+
+    def test_features_encode_raw_cards(self):
+        gs = deal_hand(dealer=1)
+        player = gs.current_bidder
+        x = deep_cfr.bid_features(gs.hands[player], player, gs.dealer, gs.bid_count,
+                                  gs.high_bid, gs.bids)
+        assert x.shape == (deep_cfr.N_FEATURES["bid"],)
+        assert x[:52].sum() == 12
+        other = deep_cfr.bid_features(gs.hands[player], player, gs.dealer, 1, 3,
+                                      [((player + 3) % 4, 3)])
+        assert not np.array_equal(x, other)
+
+    def test_traversal_fills_memories_without_networks(self):
+        random.seed(6)
+        solver = deep_cfr.DeepCFR(capacity=1000)
+        for i in range(6):
+            solver.traverse(deal_hand(dealer=i % 4), team=i % 2)
+        for phase in deep_cfr.PHASES:
+            feats, targets, masks, iters = solver.advantage_memory[phase].arrays()
+            assert len(feats) > 0
+            assert not targets[~masks].any()          # regrets only on legal actions
+            assert (iters == 1).all()
+        feats, targets, masks, _ = solver.strategy_memory["bid"].arrays()
+        np.testing.assert_allclose(targets.sum(axis=1), 1.0)
+
+    def test_train_and_policy(self, tmp_path):
+        pytest.importorskip("torch")
+        solver = deep_cfr.DeepCFR(capacity=2000, hidden=(32,), traversals=4,
+                                  train_steps=5, policy_steps=5, batch_size=64)
+        stats = solver.train(2, seed=1, verbose=False)
+        assert len(stats["advantage_loss"]) == 2 and set(stats["policy_loss"]) == set(deep_cfr.PHASES)
+        gs = deal_hand(dealer=0)
+        actions, probs = solver.strategy(gs)
+        assert len(actions) == len(probs) and probs.sum() == pytest.approx(1.0)
+
+        path = str(tmp_path / "policy.pt")
+        solver.save_policy(path)
+        other = deep_cfr.DeepCFR(capacity=10, hidden=(32,))
+        other.load_policy(path)
+        np.testing.assert_allclose(other.strategy(gs)[1], probs)
+
+
+# ── Equity table tests ────────────────────────────────────────────────
+
+class TestEquityTable:
+    def test_playout_tricks_and_buckets(self):
+        states = value_net.sample_leaf_states(10, seed=4)
+        buckets, trump_counts, dir_idx = equity_table.hand_buckets(states)
+        assert buckets.shape == (10, 4) and (buckets < equity_table.N_BUCKETS).all()
+        rng = random.Random(0)
+        for i, gs in enumerate(states):
+            assert trump_counts[i, 0] == min(
+                sum(c.suit == gs.trump_suit for c in gs.hands[gs.declarer]), 6)
+            assert equity_table.tricks_by_seat(gs, rng).sum() == 12
+
+    def test_cell_statistics_and_backoff(self):
+        table = equity_table.EquityTable(min_count=3)
+        buckets = np.array([[5, 5, 5, 5]] * 4)
+        tricks = np.array([[1.0, 2, 3, 6], [3.0, 2, 3, 4], [5.0, 2, 3, 2], [3.0, 2, 3, 4]])
+        table.add(buckets, np.zeros(4, dtype=np.int64), tricks)
+        assert table.n_samples == 4
+        assert table.mean[0, 0, 5] == 3.0
+        assert table.var[0, 0, 5] == pytest.approx(np.var([1, 3, 5, 3], ddof=1))
+        # An empty cell with the same trump count backs off to the margin
+        # (seat 3, whose mean differs from the 12 / 4 prior)
+        assert table.mean[3, 0, 5] == table.mean[3, 0, 6] == 4.0
+        assert table.var[3, 0, 6] == pytest.approx(np.var([6, 4, 2, 4], ddof=1))
+        # A cell with no data at all in its margin gets the prior
+        assert table.mean[3, 0, equity_table.N_BUCKETS - 1] == 3.0
+
+    def test_team_statistics(self):
+        """Partners' anti-correlated tricks give the team a smaller spread than the seat sum."""
+        states = value_net.sample_leaf_states(1, seed=3)
+        buckets, _, dir_idx = equity_table.hand_buckets(states)
+        table = equity_table.EquityTable(min_count=1)
+        tricks = np.array([[1.0, 3, 5, 3], [5.0, 3, 1, 3], [2.0, 4, 4, 2], [4.0, 2, 2, 4]])
+        table.add(np.repeat(buckets, 4, axis=0), np.repeat(dir_idx, 4), tricks)
+        team = (dir_idx[0], buckets[0, 0], buckets[0, 2])
+        assert table.team_count[team] == 4
+        assert table.team_mean[team] == 6.0
+        assert table.team_var[team] == 0.0
+        assert table.var[0, dir_idx[0], buckets[0, 0]] + table.var[2, dir_idx[0], buckets[0, 2]] > 4
+        mean, var = table.books(states)
+        np.testing.assert_allclose(mean, [7.0])
+        np.testing.assert_allclose(var, [0.0])
+        # Without team data the seat variances are scaled with the means
+        table.team_count[:] = 0
+        table.team_total[:] = 0
+        table.team_total_sq[:] = 0
+        table._finalize()
+        seat_var = table.var[0, dir_idx[0], buckets[0, 0]] + table.var[2, dir_idx[0], buckets[0, 2]]
+        table.mean = table.mean * 0.5
+        mean, var = table.books(states)
+        np.testing.assert_allclose(mean, [7.0])
+        np.testing.assert_allclose(var, [seat_var * 4])
+
+    def test_evaluator_uses_payoff_table(self):
+        """A deterministic table (zero variance) scores exactly like hand_payoff."""
+        states = value_net.sample_leaf_states(20, seed=8)
+        table = equity_table.EquityTable(min_count=1)
+        table.mean = np.broadcast_to(np.array([4.0, 2.0, 3.0, 3.0])[:, None, None],
+                                     table.count.shape)
+        table.var = np.zeros(table.count.shape)
+        onehot = np.eye(value_net.N_BOOKS)[np.full(len(states), 8)]   # 4 + 3 + kitty
+        np.testing.assert_allclose(table(states), value_net.team0_values(states, onehot),
+                                   atol=1e-6)
+
+    def test_build_save_load(self, tmp_path):
+        table = equity_table.build_table(30, playouts=2, seed=1, chunk_size=10)
+        assert table.n_samples == 60
+        assert table.count.sum() == 4 * 60
+        assert table.total.sum() == pytest.approx(12 * 60)
+        assert table.team_count.sum() == 60
+        table.save(str(tmp_path / "equity.npz"))
+        loaded = equity_table.EquityTable.load(str(tmp_path / "equity.npz"))
+        states = value_net.sample_leaf_states(5, seed=2)
+        np.testing.assert_allclose(loaded(states), table(states))
+        solver = BidWhistCFR(batch_leaves=True, leaf_batch_evaluator=loaded)
+        solver.train(3, seed=1, progress_every=100)
+        assert solver.nodes
+
+
+# ── Dealer rotation tests ─────────────────────────────────────────────
+
+class TestDealerRotation:
+    def test_rotated_deals_share_abstract_keys(self):
+        """Keys are seat-relative: a seat rotation reaches the same info sets."""
+        from game_engine import rotate_seats
+        gs = sample_deals(1, seed=5)[0]
+        tree = build_tree(gs)
+        for k in (1, 2, 3):
+            rotated = build_tree(rotate_seats(gs, k))
+            assert rotated.keys == tree.keys
+            flip = k % 2
+            assert rotated.teams == [t ^ flip for t in tree.teams]
+            for i, values in tree.trump_values.items():
+                np.testing.assert_allclose(rotated.trump_values[i], values if not flip else -values)
+
+    def test_cards_reused_for_four_dealers(self, monkeypatch):
+        deals = []
+        original = cfr_solver.deal_hand
+
+        def counting_deal(*args, **kwargs):
+            deals.append(kwargs.get("dealer"))
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(cfr_solver, "deal_hand", counting_deal)
+        solver = BidWhistCFR(play_rollouts=0, rotate_dealer=True)
+        solver.train(8, seed=3, progress_every=100)
+        assert deals == [0, 0]
+        assert solver._deal_work is None and solver.nodes
+
+    def test_trump_values_shared_per_deal(self):
+        gs = trump_states(1, seed=4)[0]
+        solver = BidWhistCFR(play_rollouts=0)
+        solver._deal_work = {}
+        first = solver._trump_values(gs, skip=np.arange(12) < 6)
+        second = solver._trump_values(gs)
+        assert len(solver._deal_work["trump_values"]) == 1
+        np.testing.assert_allclose(second, evaluate_trump_choices(gs)[1])
+        assert not first[:6].any()
+
+
+# ── Match equity tests ────────────────────────────────────────────────
+
+def toy_outcomes() -> np.ndarray:
+    """Dealer's team scores 4 or 6 points, the other team 5 or 8."""
+    outcomes = np.zeros((2, match_equity.MAX_POINTS + 1))
+    outcomes[0, [4, 6]] = [0.25, 0.15]
+    outcomes[1, [5, 8]] = [0.4, 0.2]
+    return outcomes
+
+
+class TestMatchEquity:
+    def test_game_winner_follows_score_hand(self):
+        assert match_equity.game_winner(20, 20) == -1
+        assert match_equity.game_winner(21, 5) == 0
+        assert match_equity.game_winner(3, 23) == 1
+        assert match_equity.game_winner(11, 0) == 0
+        assert match_equity.game_winner(0, 10) == -1
+        assert match_equity.game_winner(11, 1) == -1
+
+    def test_dp_is_consistent(self):
+        eq = match_equity.MatchEquity(toy_outcomes())
+        # Swapping the teams is the same as passing the deal one seat on
+        for a, b, d in ((0, 0, 0), (7, 12, 1), (19, 3, 2)):
+            assert eq.equity[a, b, d] == pytest.approx(1 - eq.equity[b, a, (d + 1) % 4])
+        # One-step expectation at a live state (dealer 1: team 1 deals)
+        w = eq.win_probability
+        expected = (0.25 * w((10, 16), 2) + 0.15 * w((10, 18), 2)
+                    + 0.4 * w((15, 12), 2) + 0.2 * w((18, 12), 2))
+        assert w((10, 12), 1) == pytest.approx(expected)
+        # Team 0 (not dealing) wins outright with 5 or 8 points from 16
+        assert w((16, 12), 3) == pytest.approx(
+            0.6 + 0.25 * w((16, 16), 0) + 0.15 * w((16, 18), 0))
+
+    def test_hand_values_and_interpolation(self):
+        eq = match_equity.MatchEquity(toy_outcomes())
+        row = eq.values_row((17, 9), 0)
+        assert row[match_equity.MAX_POINTS + 4] == 1.0
+        assert row[match_equity.MAX_POINTS - 2] == pytest.approx(
+            2 * eq.win_probability((17, 11), 1) - 1)
+        assert match_equity.hand_utility(row, 2.5) == pytest.approx(
+            0.5 * (row[match_equity.MAX_POINTS + 2] + row[match_equity.MAX_POINTS + 3]))
+        deltas = np.array([-30.0, -1.25, 0.0, 3.5])
+        np.testing.assert_allclose(match_equity.hand_utility(row, deltas),
+                                   [match_equity.hand_utility(row, x) for x in deltas])
+        assert eq.redeal_value((17, 9), 0) == pytest.approx(2 * eq.equity[17, 9, 0] - 1)
+
+    def test_reach_sampling_and_save_load(self, tmp_path):
+        eq = match_equity.MatchEquity(toy_outcomes())
+        assert eq.reach[0, 0, 0] == 1.0 and eq.reach[0, 0, 1:].sum() == 0.0
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            s0, s1 = eq.sample_scores(rng.random())
+            assert match_equity.game_winner(s0, s1) == -1 and eq.reach[s0, s1].sum() > 0
+        eq.save(str(tmp_path / "match.npz"))
+        loaded = match_equity.MatchEquity.load(str(tmp_path / "match.npz"))
+        np.testing.assert_allclose(loaded.equity, eq.equity)
+        np.testing.assert_allclose(loaded.hand_values, eq.hand_values)
+
+    def test_simulated_outcomes(self):
+        outcomes = match_equity.simulate_outcomes(20, seed=3, chunk_size=8)
+        assert outcomes.shape == (2, match_equity.MAX_POINTS + 1)
+        assert outcomes.sum() == pytest.approx(1.0) and outcomes[:, 0].sum() == 0.0
+
+    def test_solver_match_mode(self):
+        eq = match_equity.MatchEquity(toy_outcomes())
+        solver = BidWhistCFR(play_rollouts=0, batch_leaves=True, match_equity=eq)
+        solver.train(6, seed=2, progress_every=100)
+        assert solver.nodes and all("|m" in key for key in solver.nodes)
+        assert solver.strategy_table().skipped == 0
+        # Leaves are converted through the root state's hand_values row
+        gs = deal_hand(dealer=1, team_scores=(14, 6))
+        solver._begin_traversal(gs)
+        np.testing.assert_allclose(solver._utility(np.array([-3.0, 0.0, 7.0])),
+                                   eq.values_row((14, 6), 1)[[18, 21, 28]])
+        with pytest.raises(ValueError):
+            solver.train(4, eval_every=2)
+
+    def test_rollout_leaves_average_utilities(self):
+        eq = match_equity.MatchEquity(toy_outcomes())
+        solver = BidWhistCFR(play_rollouts=4, match_equity=eq)
+        solver._begin_traversal(deal_hand(dealer=2, team_scores=(17, 9)))
+        row = eq.values_row((17, 9), 2)
+        leaf = value_net.sample_leaf_states(1, seed=10)[0]
+        random.seed(5)
+        deltas = [evaluate_play_random(leaf, 1) for _ in range(4)]
+        random.seed(5)
+        value = solver._play_value(leaf)
+        assert value == pytest.approx(np.mean([match_equity.hand_utility(row, d) for d in deltas]))
+        assert solver._leaf_utility(value) == value
+        # Leaf-cached utilities are per dealer, since each dealer has its own row
+        solver = BidWhistCFR(play_rollouts=1, match_equity=eq, leaf_cache_size=1000,
+                             rotate_dealer=True)
+        solver.train(4, seed=3, progress_every=100)
+        assert solver.nodes
+
+
+# ── Rollout store tests ───────────────────────────────────────────────
+
+class TestRolloutStore:
+    def test_state_key(self):
+        states = value_net.sample_leaf_states(4, seed=6)
+        keys = [rollout_store.state_key(gs) for gs in states]
+        assert len(set(keys)) == 4 and all(len(k) == 16 for k in keys)
+        assert rollout_store.state_key(states[0].copy()) == keys[0]
+        actions = legal_actions(states[0])
+        assert rollout_store.state_key(apply_action(states[0], actions[0])) != keys[0]
+
+    def test_reuse_and_refine_across_runs(self, tmp_path):
+        path = str(tmp_path / "rollouts.db")
+        states = value_net.sample_leaf_states(6, seed=7)
+        random.seed(0)
+        with rollout_store.RolloutStore(path, n_rollouts=2) as store:
+            first = store(states + states[:2])   # duplicates share samples
+            assert store.rollouts == 12
+            np.testing.assert_allclose(first[6:], first[:2])
+        with rollout_store.RolloutStore(path, n_rollouts=2) as store:
+            np.testing.assert_allclose(store(states), first[:6])
+            assert store.rollouts == 0 and store.hit_rate() == 1.0
+        with rollout_store.RolloutStore(path, n_rollouts=5) as store:
+            refined = store(states)
+            assert store.rollouts == 18 and store.n_samples() == 30
+            n, total, total_sq = store.lookup([rollout_store.state_key(gs) for gs in states])
+            assert (n == 5).all()
+            np.testing.assert_allclose(refined, total / n)
+            assert (total_sq >= total ** 2 / n - 1e-9).all()
+
+    def test_concurrent_writers_merge(self, tmp_path):
+        path = str(tmp_path / "rollouts.db")
+        key = rollout_store.state_key(value_net.sample_leaf_states(1, seed=8)[0])
+        a = rollout_store.RolloutStore(path)
+        b = rollout_store.RolloutStore(path)
+        a.add(key, 2, 4.0, 10.0)
+        b.add(key, 3, -1.0, 5.0)
+        assert a.lookup([key])[0][0] == 2     # unflushed results are visible locally
+        a.flush()
+        b.flush()
+        n, total, total_sq = a.lookup([key])
+        assert (n[0], total[0], total_sq[0]) == (5, 3.0, 15.0)
+        a.close()
+        b.close()
+
+    def test_solver_leaf_evaluator(self, tmp_path):
+        with rollout_store.RolloutStore(str(tmp_path / "rollouts.db")) as store:
+            solver = BidWhistCFR(batch_leaves=True, leaf_batch_evaluator=store)
+            solver.train(3, seed=1, progress_every=100)
+            assert solver.nodes and len(store) == store.rollouts > 0
+
+    def test_variance_probe_shares_store(self, tmp_path):
+        # Regression: the probe used to deepcopy the solver, and the
+        # SQLite connection cannot be copied
+        with rollout_store.RolloutStore(str(tmp_path / "rollouts.db")) as store:
+            solver = BidWhistCFR(leaf_batch_evaluator=store, track_variance=True)
+            solver.train(1, seed=1, progress_every=100)
+            assert solver.sampling_variance(n_deals=1, repeats=2) >= 0.0
+            assert solver.leaf_batch_evaluator is store
+
+
+# ── Adaptive rollout tests ────────────────────────────────────────────
+
+class TestAdaptiveRollouts:
+    def test_fixed_count_unchanged(self):
+        gs = value_net.sample_leaf_states(1, seed=9)[0]
+        random.seed(4)
+        singles = [evaluate_play_random(gs, 1) for _ in range(6)]
+        random.seed(4)
+        stats = {}
+        assert evaluate_play_random(gs, 6, stats=stats) == pytest.approx(np.mean(singles))
+        assert stats == {"leaves": 1, "budget": 6, "rollouts": 6}
+
+    def test_stopping_rules(self):
+        states = value_net.sample_leaf_states(20, seed=10)
+        random.seed(5)
+        loose, tight = {}, {}
+        for gs in states:
+            evaluate_play_random(gs, 16, se_target=100.0, stats=loose)
+            evaluate_play_random(gs, 16, se_target=0.0, batch_size=4, stats=tight)
+        assert loose["rollouts"] == 4 * 20    # the first batch of 4 already meets the target
+        # With a zero target only the cap or a decided contract ends a leaf
+        assert 8 * 20 <= tight["rollouts"] <= 16 * 20
+
+    def test_importance_weights(self):
+        strategy = np.array([0.7, 0.3, 0.0, 0.0])
+        weights = leaf_importance(strategy)
+        assert weights.mean() == pytest.approx(1.0) and weights[0] > weights[1] > weights[2]
+        gs = value_net.sample_leaf_states(1, seed=11)[0]
+        counts = []
+        for w in (1e-4, 1e4):
+            stats = {}
+            random.seed(6)
+            evaluate_play_random_batch([gs] * 3, 32, np.full(3, w), se_target=0.5, stats=stats)
+            counts.append(stats["rollouts"])
+        assert counts[0] == 3 * 4 and counts[1] > counts[0]
+
+    def test_solver_reports_savings(self):
+        solver = BidWhistCFR(play_rollouts=16, rollout_se=1.0, batch_leaves=True)
+        stats = solver.train(2, seed=3, progress_every=100)
+        saved = stats["rollout_stats"]
+        assert saved["budget"] == 16 * saved["leaves"]
+        assert 0.0 < saved["saved"] == pytest.approx(1 - saved["rollouts"] / saved["budget"])
+
+    def test_requires_rollout_leaves(self):
+        with pytest.raises(ValueError):
+            BidWhistCFR(play_rollouts=0, rollout_se=1.0)
+        with pytest.raises(ValueError):
+            BidWhistCFR(play_rollouts=4, rollout_se=1.0,
+                        leaf_batch_evaluator=evaluate_play_heuristic_batch)
+
+
+# ── Playout policy tests ──────────────────────────────────────────────
+
+class TestPlayoutPolicy:
+    def test_rules_hold_along_playouts(self):
+        from game_state import card_strength
+        policy = playout_policy.HeuristicPlayout(epsilon=0.0)
+        checked = {"duck": 0, "no_ruff": 0, "cheap_win": 0, "draw_trump": 0}
+        for gs in value_net.sample_leaf_states(15, seed=12):
+            while gs.phase == Phase.PLAY:
+                player = gs.current_player
+                legal = [a.card for a in legal_actions(gs)]
+                card = policy(gs).card
+                assert card in legal
+                trick, trump, direction = gs.current_trick, gs.trump_suit, gs.direction
+                strength = lambda c: card_strength(c, trump, direction)[1]
+                if trick:
+                    lead = trick[0][1].suit
+                    power = lambda c: (c.suit == trump, c.suit == lead, strength(c))
+                    winner = max(trick, key=lambda pc: power(pc[1]))
+                    partner_winning = winner[0] == (player + 2) % 4
+                    following = legal[0].suit == lead and all(c.suit == lead for c in legal)
+                    if partner_winning and following:
+                        assert strength(card) == min(strength(c) for c in legal)
+                        checked["duck"] += 1
+                    elif partner_winning and any(c.suit != trump for c in legal):
+                        assert card.suit != trump
+                        checked["no_ruff"] += 1
+                    elif len(trick) == 3 and following:
+                        beats = [c for c in legal if power(c) > power(winner[1])]
+                        if beats:
+                            assert card == min(beats, key=strength)
+                            checked["cheap_win"] += 1
+                elif player % 2 == gs.declarer % 2 and gs.tricks_played == 0:
+                    if any(c.suit == trump for c in gs.hands[player]):
+                        assert card.suit == trump
+                        checked["draw_trump"] += 1
+                gs = apply_action(gs, Action(card=card))
+        assert all(checked.values()), checked
+
+    def test_partner_signals(self):
+        from game_state import Card, Direction, GameState, Suit
+
+        def state(player: int, hand: str, history: list[str] = (), trick: str = "") -> GameState:
+            cards = lambda text: [Card.from_str(x) for x in text.split()]
+            tricks = [list(enumerate(cards(t))) for t in history]
+            trick_cards = [(i, card) for i, card in enumerate(cards(trick))]
+            hands = [[], [], [], []]
+            hands[player] = cards(hand)
+            gs = GameState(hands=hands, kitty=[], dealer=3, phase=Phase.PLAY, current_bidder=0,
+                           declarer=0, trump_suit=Suit.SPADES, direction=Direction.UPTOWN,
+                           tricks_history=tricks, current_trick=trick_cards,
+                           played_cards=[c for t in tricks for _, c in t]
+                           + [c for _, c in trick_cards])
+            gs.current_player = player
+            return gs
+
+        policy = playout_policy.HeuristicPlayout(epsilon=0.0)
+        c = Card.from_str
+        # First discard: a spare high card under a boss encourages, else low denies
+        assert policy.choose(state(1, "AH QH 3H 4C 5C", trick="2D"), 1) == c("QH")
+        assert policy.choose(state(1, "KH 3H 4C 5C", trick="2D"), 1) == c("4C")
+        # Later discards are plain low discards
+        played = ["2D QH 3D 4D"]
+        assert policy.choose(state(1, "AH JH 3H 4C 5C", played, trick="5D"), 1) == c("4C")
+        # The partner leads low in an encouraged suit ...
+        assert policy.choose(state(3, "JH 5H 9C 8C 7C", played), 3) == c("5H")
+        # ... and away from a denied one
+        denied = ["2D 3H 3D 4D"]
+        assert policy.choose(state(3, "JH 5H 6H 9C 8C", denied), 3) == c("8C")
+        assert policy.choose(state(3, "JH 5H 6H 9C 8C"), 3) == c("5H")
+
+    def test_uses_only_visible_cards(self):
+        policy = playout_policy.HeuristicPlayout(epsilon=0.0)
+        # Leads never depend on how the hidden cards are split
+        for gs in value_net.sample_leaf_states(30, seed=15):
+            while gs.phase == Phase.PLAY:
+                if not gs.current_trick:
+                    player = gs.current_player
+                    swapped = gs.copy()
+                    a, b = (player + 1) % 4, (player + 2) % 4
+                    swapped.hands[a], swapped.hands[b] = swapped.hands[b], swapped.hands[a]
+                    assert policy(swapped) == policy(gs)
+                gs = apply_action(gs, policy(gs))
+
+    def test_pluggable_rollouts(self):
+        from game_engine import random_rollout
+        random.seed(7)
+        for _ in range(3):
+            gs = random_rollout(play_policy=playout_policy.heuristic_play)
+            assert sum(gs.books) == 12
+        leaf = value_net.sample_leaf_states(1, seed=13)[0]
+        exact = playout_policy.HeuristicPlayout(epsilon=0.0)
+        assert (evaluate_play_random(leaf, 3, play_policy=exact)
+                == evaluate_play_random(leaf, 1, play_policy=exact))
+        solver = BidWhistCFR(play_rollouts=1, play_policy=playout_policy.heuristic_play)
+        solver.train(2, seed=1, progress_every=100)
+        assert solver.nodes
+
+    def test_requires_rollout_leaves(self):
+        with pytest.raises(ValueError):
+            BidWhistCFR(play_rollouts=0, play_policy=playout_policy.heuristic_play)
+        with pytest.raises(ValueError):
+            BidWhistCFR(play_rollouts=2, play_policy=playout_policy.heuristic_play,
+                        leaf_batch_evaluator=evaluate_play_heuristic_batch)
+
+    def test_seeded_builds_reproducible(self):
+        # The default policy's epsilon draws come from the builders' rng
+        policy = playout_policy.heuristic_play
+        runs = []
+        for reseed in (1, 999):
+            random.seed(reseed)
+            runs.append((value_net.generate_dataset(12, 4, seed=3, play_policy=policy),
+                         equity_table.build_table(12, playouts=2, seed=3, play_policy=policy)))
+        (x1, y1), t1 = runs[0]
+        (x2, y2), t2 = runs[1]
+        np.testing.assert_array_equal(x1, x2)
+        np.testing.assert_array_equal(y1, y2)
+        np.testing.assert_array_equal(t1.total, t2.total)
+        np.testing.assert_array_equal(t1.total_sq, t2.total_sq)
+        assert policy.rng is None
+
+    def test_policy_reaches_builders(self, tmp_path):
+        from game_engine import play_out
+        import equity_table
+        exact = playout_policy.HeuristicPlayout(epsilon=0.0)
+        leaf = value_net.sample_leaf_states(1, seed=14)[0]
+        end = play_out(leaf, exact)
+        assert play_out(leaf, exact).books == end.books
+        books = value_net.rollout_books(leaf, 3, random.Random(0), exact)
+        assert books[end.books[leaf.declarer % 2] + 1] == 1.0
+        tricks = equity_table.tricks_by_seat(leaf, random.Random(0), exact)
+        assert tricks.sum() == 12
+        assert (equity_table.tricks_by_seat(leaf, random.Random(1), exact) == tricks).all()
+        # The store keys samples by policy and plays them with it
+        path = str(tmp_path / "rollouts.db")
+        assert rollout_store.policy_id(exact) == "HeuristicPlayout(epsilon=0.0)"
+        assert rollout_store.policy_id(None) == ""
+        with rollout_store.RolloutStore(path, n_rollouts=2) as store:
+            store([leaf])
+        with rollout_store.RolloutStore(path, n_rollouts=2, play_policy=exact) as store:
+            value = store.evaluate(leaf)
+            assert store.rollouts == 2 and len(store) == 2
+            assert value == evaluate_play_random(leaf, 1, play_policy=exact)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
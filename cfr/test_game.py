@@ -10,22 +10,26 @@ Tests cover:
   - Kitty mechanics
   - Discard mechanics
   - Full hand flow (deal → score)
+  - Lightweight BidState auctions
+  - Card-equivalence merging of play actions
 """
 
 import pytest
 import random
 from game_state import (
     Card, Suit, Rank, Direction, Phase,
-    GameState, Action, TrumpChoice, InfoSet,
+    GameState, Action, TrumpChoice, InfoSet, BidState,
     BID_PASS, BID_TAKE,
     card_strength, make_deck,
     legal_bid_actions, legal_play_actions, legal_trump_actions,
-    legal_actions, acting_player,
+    legal_actions, acting_player, legal_bid_amounts,
+    play_equivalence_classes, reduced_play_actions, equivalent_play_actions,
 )
 from game_engine import (
     deal_hand, apply_action, resolve_trick,
     hand_payoff, is_terminal, needs_redeal,
     random_rollout, play_random_game,
+    apply_bid, complete_auction,
 )
 
 
@@ -562,6 +566,51 @@ class TestFullGame:
                 f"Game {i} ended in phase {gs.phase}"
 
 
+# ── BidState tests ────────────────────────────────────────────────────
+
+class TestBidState:
+    def test_legal_amounts_match_actions(self):
+        random.seed(5)
+        for dealer in range(4):
+            gs = deal_hand(dealer=dealer)
+            bs = BidState.from_game_state(gs)
+            while gs.phase == Phase.BIDDING:
+                assert legal_bid_amounts(bs) == [a.bid for a in legal_bid_actions(gs)]
+                amount = random.choice(legal_bid_amounts(bs))
+                gs = apply_action(gs, Action(bid=amount))
+                bs = apply_bid(bs, amount)
+
+    def test_complete_auction_matches_apply_action(self):
+        """Random auctions via BidState rebuild exactly the engine's state."""
+        random.seed(17)
+        for i in range(200):
+            root = deal_hand(dealer=i % 4)
+            gs, bs = root, BidState.from_game_state(root)
+            while bs.bid_count < 4:
+                amount = random.choice(legal_bid_amounts(bs))
+                gs = apply_action(gs, Action(bid=amount))
+                bs = apply_bid(bs, amount)
+            assert complete_auction(root, bs) == gs
+
+    def test_complete_auction_does_not_mutate_root(self):
+        root = deal_hand(dealer=0, deck=make_deck())
+        bs = BidState.from_game_state(root)
+        for amount in (4, BID_PASS, BID_PASS, BID_PASS):
+            bs = apply_bid(bs, amount)
+        gs = complete_auction(root, bs)
+        assert gs.phase == Phase.TRUMP_SELECTION
+        assert len(gs.hands[gs.declarer]) == 16
+        assert all(len(h) == 12 for h in root.hands)
+        assert root.bids == []
+
+    def test_all_pass_is_redeal(self):
+        root = deal_hand(dealer=2)
+        bs = BidState.from_game_state(root)
+        for _ in range(4):
+            bs = apply_bid(bs, BID_PASS)
+        assert needs_redeal(complete_auction(root, bs))
+
+
 # ── Info set tests ──────────────��─────────────────────────────────────
 
 class TestInfoSet:
@@ -585,5 +634,84 @@ class TestInfoSet:
         assert info0.key() != info1.key()  # different hands
 
 
+# ── Card equivalence tests ────────────────────────────────────────────
+
+def play_state(hand: str, played: str = "", direction: Direction = Direction.UPTOWN,
+               trick: str = "", discards: str = "") -> GameState:
+    """Player 0 to act in PLAY with the given hand, history and trick."""
+    cards = lambda text: [c(x) for x in text.split()]
+    trick_cards = cards(trick)
+    gs = GameState(hands=[cards(hand), [], [], []], kitty=[], dealer=3,
+                   phase=Phase.PLAY, current_bidder=0, declarer=0,
+                   trump_suit=Suit.SPADES, direction=direction,
+                   played_cards=cards(played) + trick_cards, discards=cards(discards),
+                   current_trick=[((1 + i) % 4, card) for i, card in enumerate(trick_cards)])
+    gs.current_player = 0
+    return gs
+
+
+class TestCardEquivalence:
+    def test_touching_ranks_merge(self):
+        gs = play_state("KH QH TH 4C")
+        assert play_equivalence_classes(gs, 0) == [[c("4C")], [c("KH"), c("QH")], [c("TH")]]
+        # Once the jack is gone, the ten joins the sequence
+        gs = play_state("KH QH TH 4C", played="JH 2D")
+        assert play_equivalence_classes(gs, 0) == [[c("4C")], [c("KH"), c("QH"), c("TH")]]
+
+    def test_direction_changes_sequences(self):
+        hand = "AD 2D 3D"
+        assert play_equivalence_classes(play_state(hand), 0) == [[c("AD")], [c("3D"), c("2D")]]
+        down = play_state(hand, direction=Direction.DOWNTOWN)
+        assert play_equivalence_classes(down, 0) == [[c("AD"), c("2D"), c("3D")]]
+        no_aces = play_state(hand, direction=Direction.DOWNTOWN_NOACES)
+        assert play_equivalence_classes(no_aces, 0) == [[c("2D"), c("3D")], [c("AD")]]
+
+    def test_discards_are_out_of_play(self):
+        gs = play_state("AS QS 9S", discards="KS")
+        assert play_equivalence_classes(gs, 0) == [[c("AS"), c("QS")], [c("9S")]]
+        # Cards of completed tricks are out of play too
+        gs = play_state("QC TC 5H", played="JC 4D 5D 6D")
+        assert play_equivalence_classes(gs, 0) == [[c("QC"), c("TC")], [c("5H")]]
+
+    def test_current_trick_cards_split_sequences(self):
+        # With JC led, QC wins the trick and TC does not
+        gs = play_state("QC TC 5H", trick="JC 2C 3C")
+        assert play_equivalence_classes(gs, 0) == [[c("QC")], [c("TC")]]
+        for card, winner in ((c("QC"), 0), (c("TC"), 1)):
+            trick = gs.current_trick + [(0, card)]
+            assert resolve_trick(trick, gs.trump_suit, gs.direction) == winner
+
+    def test_reduce_and_expand(self):
+        gs = play_state("KH QH TH 9H 4C 3C", played="JH")
+        reduced = reduced_play_actions(gs, 0)
+        assert [a.card for a in reduced] == [c("4C"), c("KH")]
+        expanded = [a for r in reduced for a in equivalent_play_actions(gs, 0, r)]
+        assert sorted(a.card for a in expanded) == sorted(a.card for a in legal_play_actions(gs, 0))
+        assert equivalent_play_actions(gs, 0, Action(card=c("3C"))) == [Action(card=c("4C")),
+                                                                       Action(card=c("3C"))]
+        with pytest.raises(ValueError):
+            equivalent_play_actions(gs, 0, Action(card=c("AS")))
+
+    def test_branching_shrinks_along_playouts(self):
+        random.seed(3)
+        full = reduced = 0
+        for _ in range(5):
+            gs = deal_hand(dealer=0)
+            while not is_terminal(gs):
+                player = acting_player(gs)
+                if gs.phase == Phase.PLAY:
+                    legal = legal_play_actions(gs, player)
+                    classes = play_equivalence_classes(gs, player)
+                    assert sorted(x for cls in classes for x in cls) == sorted(a.card for a in legal)
+                    full += len(legal)
+                    reduced += len(classes)
+                if gs.phase == Phase.DISCARDING:
+                    action = Action(discard=frozenset(gs.hands[gs.declarer][:4]))
+                else:
+                    action = random.choice(legal_actions(gs))
+                gs = apply_action(gs, action)
+        assert reduced < full
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])